@@ -0,0 +1,191 @@
+# benchmarks/load.py
+"""
+Teste de carga reprodutível dos endpoints de produtos.
+
+Semeia N produtos (tests/factories.make_products), dispara create/get/update/
+list/delete com a concorrência pedida e reporta vazão e latência p50/p95/p99
+por endpoint.
+
+Alvos:
+- padrão: a aplicação em processo (ASGI, sem rede) sobre um substituto do
+  Mongo em memória (mongomock-motor);
+- --engine memory: a aplicação em processo com STORAGE_ENGINE=memory;
+- --mongo-url: a aplicação em processo sobre um mongod local;
+- --base-url: um servidor já rodando (ex.: python -m store.serve).
+
+Uso:
+    python -m benchmarks.load --products 5000 --requests 2000 --concurrency 64
+    python -m benchmarks.load --save-baseline
+    python -m benchmarks.load --max-regression 0.2   # falha se p95/vazão piorarem >20% ou sem baseline
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASELINE = Path(__file__).with_name("load_baseline.json")
+ENDPOINTS = ("create", "get", "update", "list", "delete")
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """Vazão (req/s) e percentis em ms de uma lista de latências em segundos."""
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        "requests": len(ordered),
+        "throughput": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+
+async def _in_process_client(mongo_url: str | None):
+    import httpx
+    from store.db.mongo import db_client
+    from store.main import app
+
+    if os.environ.get("STORAGE_ENGINE") != "memory":
+        if mongo_url is None:
+            try:
+                from mongomock_motor import AsyncMongoMockClient
+            except ImportError:
+                raise SystemExit("Sem --mongo-url/--base-url é preciso instalar 'mongomock-motor'")
+            db_client.client = AsyncMongoMockClient("mongodb://localhost:27017/store_bench")
+            db_client._pid = os.getpid()
+        else:
+            db_client.connect()
+        # Sem lifespan: o banco de benchmark começa vazio a cada rodada
+        await db_client.collection("products").delete_many({})
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+async def _run_endpoint(name, make_request, total, concurrency) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def run(args) -> dict:
+    from tests.factories import make_products
+
+    if args.base_url:
+        import httpx
+
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = await _in_process_client(args.mongo_url)
+
+    rng = random.Random(args.seed)
+    async with client:
+        seed = make_products(args.products, seed=args.seed)
+        ids = []
+        for start in range(0, len(seed), 1000):
+            response = await client.post("/products/bulk", json=seed[start:start + 1000])
+            response.raise_for_status()
+            ids.extend(item["id"] for item in response.json()["results"] if item["ok"])
+
+        new_products = make_products(args.requests, seed=args.seed + 1)
+        created = []
+
+        async def create(i):
+            response = await client.post("/products/", json=new_products[i])
+            if response.status_code < 400:
+                created.append(response.json()["id"])
+            return response
+
+        async def get(i):
+            return await client.get(f"/products/{rng.choice(ids)}")
+
+        async def update(i):
+            return await client.put(f"/products/{rng.choice(ids)}", json={"quantity": i})
+
+        async def list_(i):
+            low = rng.uniform(1, 15_000)
+            return await client.get(
+                "/products/",
+                params={"preco_minimo": low, "preco_maximo": low + 2_000, "status": bool(i % 2), "limit": 50},
+            )
+
+        async def delete(i):
+            return await client.delete(f"/products/{created[i]}")
+
+        calls = {"create": create, "get": get, "update": update, "list": list_, "delete": delete}
+        report = {"config": {k: getattr(args, k) for k in ("products", "requests", "concurrency", "seed")}}
+        for name in ENDPOINTS:
+            report[name] = await _run_endpoint(name, calls[name], args.requests, args.concurrency)
+    return report
+
+
+def regressions(report: dict, baseline: dict, threshold: float) -> list[str]:
+    problems = []
+    for name in ENDPOINTS:
+        if name not in baseline:
+            continue
+        if report[name]["p95_ms"] > baseline[name]["p95_ms"] * (1 + threshold):
+            problems.append(f"{name}: p95 {report[name]['p95_ms']}ms (baseline {baseline[name]['p95_ms']}ms)")
+        if report[name]["throughput"] < baseline[name]["throughput"] * (1 - threshold):
+            problems.append(f"{name}: {report[name]['throughput']} req/s (baseline {baseline[name]['throughput']})")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Teste de carga dos endpoints de produtos")
+    parser.add_argument("--products", type=int, default=5_000, help="Produtos semeados antes da carga")
+    parser.add_argument("--requests", type=int, default=1_000, help="Requisições por endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["mongo", "memory"], default="mongo")
+    parser.add_argument("--mongo-url", default=None, help="mongod local em vez do substituto em memória")
+    parser.add_argument("--base-url", default=None, help="Servidor já rodando em vez da app em processo")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=None, help="Ex.: 0.2 = 20%%")
+    args = parser.parse_args()
+
+    # Antes de qualquer import da app: get_settings() guarda a primeira leitura
+    if args.mongo_url:
+        os.environ["DATABASE_URL"] = args.mongo_url
+    os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017/store_bench")
+    if args.engine == "memory":
+        os.environ["STORAGE_ENGINE"] = "memory"
+    os.environ.setdefault("CACHE_BACKEND", "none")  # Mede o caminho até o banco
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(report, indent=2) + "\n")
+    elif args.max_regression is not None:
+        if not BASELINE.exists():
+            # Sem referência o gate não pode passar em silêncio
+            print(f"Sem baseline em {BASELINE}: rode com --save-baseline", file=sys.stderr)
+            return 2
+        problems = regressions(report, json.loads(BASELINE.read_text()), args.max_regression)
+        for problem in problems:
+            print(f"REGRESSÃO: {problem}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+# benchmarks/reserve.py
+"""
+Benchmark de contenção da reserva de estoque.
+
+Semeia poucos produtos com estoque pequeno e dispara muito mais pedidos de
+1 unidade do que há em estoque, todos concorrentes e concentrados nesses
+produtos. Compara dois caminhos:
+
+- reserve: POST /products/{id}/reserve ($inc condicional, uma ida ao banco);
+- read-modify-write: GET + PUT com quantity - 1, como o checkout fazia.
+
+Para cada um confere se os totais batem: reservas aceitas == estoque inicial
+- estoque final, e estoque nunca negativo. O read-modify-write aceita mais
+pedidos do que havia em estoque (atualizações perdidas); o reserve não.
+
+Alvos: os mesmos do benchmarks.load (--engine memory, --mongo-url,
+--base-url ou, por padrão, mongomock-motor em processo).
+
+Uso:
+    python -m benchmarks.reserve --products 10 --stock 100 --requests 5000 --concurrency 128
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from benchmarks.load import _in_process_client, summarize
+
+MODES = ("reserve", "read-modify-write")
+
+
+async def _seed(client, products: int, stock: int) -> list[str]:
+    payload = [
+        {"name": f"Reserva {i}", "quantity": stock, "price": "10.00", "status": True}
+        for i in range(products)
+    ]
+    response = await client.post("/products/bulk", json=payload)
+    response.raise_for_status()
+    return [item["id"] for item in response.json()["results"] if item["ok"]]
+
+
+async def _run_mode(client, mode: str, args) -> dict:
+    ids = await _seed(client, args.products, args.stock)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, accepted = [], {id: 0 for id in ids}
+    rejected = errors = 0
+
+    async def reserve(id: str) -> bool:
+        response = await client.post(f"/products/{id}/reserve", json={"quantity": 1})
+        if response.status_code == 409:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def read_modify_write(id: str) -> bool:
+        response = await client.get(f"/products/{id}")
+        response.raise_for_status()
+        quantity = response.json()["quantity"]
+        if quantity < 1:
+            return False
+        response = await client.put(f"/products/{id}", json={"quantity": quantity - 1})
+        response.raise_for_status()
+        return True
+
+    call = reserve if mode == "reserve" else read_modify_write
+
+    async def one(i: int) -> None:
+        nonlocal rejected, errors
+        id = ids[i % len(ids)]
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if await call(id):
+                    accepted[id] += 1
+                else:
+                    rejected += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    report = summarize(latencies, time.perf_counter() - start)
+
+    final = {}
+    for id in ids:
+        response = await client.get(f"/products/{id}")
+        response.raise_for_status()
+        final[id] = response.json()["quantity"]
+    # Cada reserva aceita precisa ter saído do estoque, nem mais nem menos
+    lost = sum(accepted[id] - (args.stock - final[id]) for id in ids)
+    report.update({
+        "accepted": sum(accepted.values()),
+        "rejected": rejected,
+        "errors": errors,
+        "stock_before": args.stock * len(ids),
+        "stock_after": sum(final.values()),
+        "lost_updates": lost,
+        "negative_stock": sum(1 for quantity in final.values() if quantity < 0),
+        "consistent": lost == 0 and errors == 0 and all(quantity >= 0 for quantity in final.values()),
+    })
+    return report
+
+
+async def run(args) -> dict:
+    if args.base_url:
+        import httpx
+
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = await _in_process_client(args.mongo_url)
+
+    report = {"config": {k: getattr(args, k) for k in ("products", "stock", "requests", "concurrency")}}
+    async with client:
+        for mode in args.modes:
+            report[mode] = await _run_mode(client, mode, args)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de contenção da reserva de estoque")
+    parser.add_argument("--products", type=int, default=10, help="Produtos disputados")
+    parser.add_argument("--stock", type=int, default=100, help="Estoque inicial de cada produto")
+    parser.add_argument("--requests", type=int, default=5_000, help="Pedidos de 1 unidade por modo")
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--engine", choices=["mongo", "memory"], default="mongo")
+    parser.add_argument("--mongo-url", default=None, help="mongod local em vez do substituto em memória")
+    parser.add_argument("--base-url", default=None, help="Servidor já rodando em vez da app em processo")
+    args = parser.parse_args()
+
+    # Antes de qualquer import da app: get_settings() guarda a primeira leitura
+    if args.mongo_url:
+        os.environ["DATABASE_URL"] = args.mongo_url
+    os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017/store_bench")
+    if args.engine == "memory":
+        os.environ["STORAGE_ENGINE"] = "memory"
+    os.environ.setdefault("CACHE_BACKEND", "none")  # O GET do read-modify-write vai ao banco
+    os.environ.setdefault("ADMISSION_ENABLED", "false")  # A disputa é no banco, sem fila na frente
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    # Só o caminho atômico precisa fechar a conta
+    return 0 if report.get("reserve", {"consistent": True})["consistent"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,103 @@
+# benchmarks/startup.py
+"""
+Mede o custo de cold start da aplicação:
+
+- import: soma do "python -X importtime -c 'import store.main'" e os módulos
+  mais pesados;
+- primeira requisição: do início do processo até a resposta de
+  GET /products/cache/stats (rota sem banco), com warm-up e sync de índices
+  desligados para não medir a rede.
+
+Uso:
+    python -m benchmarks.startup                  # mede e imprime JSON
+    python -m benchmarks.startup --save-baseline  # grava benchmarks/startup_baseline.json
+    python -m benchmarks.startup --max-regression 0.2  # falha se piorar >20% ou sem baseline
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BASELINE = Path(__file__).with_name("startup_baseline.json")
+
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+from fastapi.testclient import TestClient
+from store.main import app
+with TestClient(app) as client:
+    client.get("/products/cache/stats").raise_for_status()
+print(time.perf_counter() - start)
+"""
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "mongodb://localhost:27017/store")
+    env["MONGO_WARMUP"] = "false"
+    env["SYNC_INDEXES_ON_STARTUP"] = "false"
+    return env
+
+
+def measure_imports(top: int = 10) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import store.main"],
+        capture_output=True, text=True, env=_env(), check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    total_us = sum(self_us for _, self_us, _ in modules)
+    heaviest = sorted(modules, key=lambda module: module[2], reverse=True)[:top]
+    return {
+        "import_total_ms": round(total_us / 1000, 1),
+        "heaviest": [{"module": name, "cumulative_ms": round(cum / 1000, 1)} for name, _, cum in heaviest],
+    }
+
+
+def measure_first_request(runs: int = 5) -> float:
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", FIRST_REQUEST],
+            capture_output=True, text=True, env=_env(), check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return round(sorted(timings)[len(timings) // 2] * 1000, 1)  # Mediana
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de cold start da Store API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=None, help="Ex.: 0.2 = 20%%")
+    args = parser.parse_args()
+
+    report = measure_imports()
+    report["first_request_ms"] = measure_first_request(args.runs)
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(report, indent=2) + "\n")
+        return 0
+    if args.max_regression is not None:
+        if not BASELINE.exists():
+            # Sem referência o gate não pode passar em silêncio
+            print(f"Sem baseline em {BASELINE}: rode com --save-baseline", file=sys.stderr)
+            return 2
+        baseline = json.loads(BASELINE.read_text())
+        for key in ("import_total_ms", "first_request_ms"):
+            limit = baseline[key] * (1 + args.max_regression)
+            if report[key] > limit:
+                print(f"REGRESSÃO: {key} {report[key]}ms > {limit:.1f}ms", file=sys.stderr)
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,390 @@
+# store\catalog.py
+"""
+Importação e exportação do catálogo em massa, fora da API:
+
+    python -m store.catalog import fornecedor.csv [--workers 8] [--writers 4]
+    python -m store.catalog export catalogo.ndjson [--status true]
+
+Importação: o arquivo (CSV com cabeçalho ou NDJSON) é lido em streaming e
+dividido em lotes. Cada lote é validado com ProductIn em um pool de
+processos e gravado com insert_many por threads que dividem o pool de
+conexões do ProductUsecaseSync. Só alguns lotes ficam em memória por vez.
+
+Retomada: depois de cada lote gravado (e de todos os anteriores), o número
+de registros concluídos vai para um checkpoint ao lado do arquivo. O _id de
+cada produto é derivado de um prefixo aleatório da importação (guardado no
+checkpoint) e da posição do registro, então reprocessar um lote que já tinha sido gravado só gera _id duplicado,
+que é ignorado: nenhum produto entra duas vezes.
+
+Exportação: percorre o cursor em lotes (batch_size) e escreve um produto por
+vez, no mesmo formato da rota GET /products/export.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import secrets
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import IO, Callable, Iterator
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from pydantic import BaseModel, Field, ValidationError
+from store.db.repository import now
+from store.schemas.base import to_storage
+from store.schemas.product import EXPORT_FIELDS, ProductIn, ProductOut
+
+FORMATS = ("csv", "ndjson")
+MAX_ERRORS = 20  # Erros guardados no relatório; todos vão para --rejects
+PROGRESS_SECONDS = 5.0
+
+
+class Checkpoint(BaseModel):
+    source: str = Field(..., description="Absolute path of the imported file")
+    size: int = Field(..., description="File size when the import started")
+    run: str = Field(..., description="Random per-import prefix (hex); part of every _id")
+    rows: int = Field(0, description="Records done, counted from the start of the file")
+    inserted: int = Field(0, description="Products inserted so far")
+    invalid: int = Field(0, description="Records rejected so far")
+
+
+class ImportReport(BaseModel):
+    rows: int = Field(0, description="Records read in this run")
+    inserted: int = Field(0, description="Products inserted (all runs)")
+    skipped: int = Field(0, description="Records already inserted by an earlier run")
+    invalid: int = Field(0, description="Records rejected (all runs)")
+    resumed_from: int = Field(0, description="Records skipped thanks to the checkpoint")
+    seconds: float = Field(0.0, description="Duration of this run")
+    rows_per_second: float = Field(0.0, description="Records per second in this run")
+    errors: list[str] = Field(default_factory=list, description=f"First {MAX_ERRORS} rejections")
+
+
+class ExportReport(BaseModel):
+    rows: int = Field(0, description="Products written")
+    seconds: float = Field(0.0, description="Duration of the export")
+    rows_per_second: float = Field(0.0, description="Products per second")
+
+
+def detect_format(path: str, format: str = None) -> str:
+    if format:
+        return format
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def read_rows(file: IO[str], format: str) -> Iterator:
+    """
+    Registros do arquivo, em ordem. Linhas NDJSON saem como texto: o parse
+    fica para o pool de processos, junto da validação.
+    """
+    if format == "csv":
+        yield from csv.DictReader(file)
+    else:
+        yield from (line for line in file if line.strip())
+
+
+def batches(rows: Iterator, size: int, skip: int = 0) -> Iterator[tuple[int, list]]:
+    """(posição do primeiro registro, registros) em lotes de "size", depois dos "skip" primeiros."""
+    batch, start = [], skip
+    for index, row in enumerate(rows):
+        if index < skip:
+            continue
+        batch.append(row)
+        if len(batch) == size:
+            yield start, batch
+            batch, start = [], index + 1
+    if batch:
+        yield start, batch
+
+
+def new_run() -> str:
+    """
+    Prefixo dos _id de uma importação: instante de início (como num ObjectId
+    comum) + 4 bytes aleatórios, para que duas importações no mesmo segundo
+    não gerem os mesmos _id.
+    """
+    return (int(time.time()).to_bytes(4, "big") + secrets.token_bytes(4)).hex()
+
+
+def row_id(run: str, index: int) -> ObjectId:
+    """_id determinístico: prefixo da importação (new_run) + posição do registro (até 2**32)."""
+    return ObjectId(bytes.fromhex(run) + index.to_bytes(4, "big"))
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, item['loc'])) or 'registro'}: {item['msg']}" for item in error.errors()
+        )
+    return str(error)
+
+
+def validate_batch(run: str, start: int, rows: list) -> tuple[list, list, list]:
+    """
+    Roda nos processos do pool. Devolve (posições, documentos já em BSON,
+    [(posição, erro)]). Bytes voltam do processo bem mais barato que dicts
+    com ObjectId e datetime, e o insert_many não precisa codificar de novo.
+    As datas ficam para stamp(), na hora da gravação.
+    """
+    indexes, documents, errors = [], [], []
+    for index, row in enumerate(rows, start):
+        try:
+            if isinstance(row, str):
+                row = json.loads(row)
+            product = ProductIn.model_validate(row)
+        except (ValueError, TypeError) as e:  # ValidationError e JSONDecodeError são ValueError
+            errors.append((index, _error_message(e)))
+            continue
+        document = to_storage(product.model_dump())
+        document["_id"] = row_id(run, index)
+        document["version"] = 1
+        indexes.append(index)
+        documents.append(bson.encode(document))
+    return indexes, documents, errors
+
+
+def stamp(document: bytes, fields: bytes) -> bytes:
+    """Acrescenta elementos já codificados ao fim de um documento BSON, sem decodificá-lo."""
+    body = document[4:-1] + fields
+    return (len(body) + 5).to_bytes(4, "little") + body + b"\x00"
+
+
+def _insert(usecase, documents: list[bytes]) -> tuple[int, dict[int, str]]:
+    # Data de cada lote na hora em que é gravado: uma data única para a
+    # importação inteira deixaria os últimos lotes "no passado" e fora do
+    # que /products/changes entrega a quem já leu depois dela
+    timestamp = now()
+    fields = bson.encode({"created_at": timestamp, "updated_at": timestamp})[4:-1]
+    return usecase.insert_many_sync([RawBSONDocument(stamp(document, fields)) for document in documents])
+
+
+class _InlineExecutor:
+    """Executor sem paralelismo (workers=0): arquivos pequenos e testes."""
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+def _load_checkpoint(path: str, source: str, size: int) -> Checkpoint | None:
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        checkpoint = Checkpoint.model_validate_json(file.read())
+    if checkpoint.source != source or checkpoint.size != size:
+        raise ValueError(f"O checkpoint {path} é de outro arquivo (ou o arquivo mudou); apague-o para recomeçar")
+    return checkpoint
+
+
+def _save_checkpoint(path: str, checkpoint: Checkpoint) -> None:
+    # Escreve ao lado e troca: uma interrupção nunca deixa o checkpoint pela metade
+    with open(path + ".tmp", "w") as file:
+        file.write(checkpoint.model_dump_json())
+    os.replace(path + ".tmp", path)
+
+
+def import_catalog(
+    usecase,
+    path: str,
+    format: str = None,
+    batch_size: int = 1000,
+    workers: int = None,
+    writers: int = 4,
+    checkpoint_path: str = None,
+    rejects: IO[str] = None,
+    progress: Callable[[int, float], None] = None,
+) -> ImportReport:
+    """
+    Importa o arquivo pelo "usecase" (ProductUsecaseSync ou qualquer objeto
+    com insert_many_sync), retomando do checkpoint se existir.
+
+    Até 2 lotes por processo esperam validação e até "writers" esperam o
+    banco; o checkpoint só avança quando um lote e todos os anteriores foram
+    gravados.
+    """
+    format = detect_format(path, format)
+    source = os.path.abspath(path)
+    size = os.path.getsize(path)
+    checkpoint_path = checkpoint_path or path + ".checkpoint.json"
+    checkpoint = _load_checkpoint(checkpoint_path, source, size) or Checkpoint(
+        source=source, size=size, run=new_run()
+    )
+    report = ImportReport(resumed_from=checkpoint.rows)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    started = last_progress = time.perf_counter()
+
+    def reject(index: int, error: str) -> None:
+        checkpoint.invalid += 1
+        if len(report.errors) < MAX_ERRORS:
+            report.errors.append(f"registro {index + 1}: {error}")
+        if rejects is not None:
+            rejects.write(json.dumps({"row": index + 1, "error": error}, ensure_ascii=False) + "\n")
+
+    validating: deque = deque()  # (início, quantidade, futuro da validação)
+    writing: deque = deque()     # (início, quantidade, posições, erros de validação, futuro do insert)
+
+    def finish_write() -> None:
+        nonlocal last_progress
+        start, count, indexes, errors, future = writing.popleft()
+        inserted, failed = future.result()
+        for index, error in errors:
+            reject(index, error)
+        for position, error in failed.items():
+            reject(indexes[position], error)
+        checkpoint.inserted += inserted
+        report.skipped += len(indexes) - len(failed) - inserted
+        checkpoint.rows = start + count
+        report.rows += count
+        _save_checkpoint(checkpoint_path, checkpoint)
+        if progress is not None and time.perf_counter() - last_progress >= PROGRESS_SECONDS:
+            last_progress = time.perf_counter()
+            progress(checkpoint.rows, report.rows / (last_progress - started))
+
+    def start_write() -> None:
+        start, count, future = validating.popleft()
+        indexes, documents, errors = future.result()
+        writing.append((start, count, indexes, errors, writer.submit(_insert, usecase, documents)))
+        if len(writing) >= writers:
+            finish_write()
+
+    # spawn: os processos não herdam o cliente do Mongo nem as threads de escrita
+    validator = (
+        ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        if workers else _InlineExecutor()
+    )
+    with open(path, newline="" if format == "csv" else None, encoding="utf-8") as file, \
+            validator, ThreadPoolExecutor(max(1, writers), thread_name_prefix="catalog-writer") as writer:
+        for start, rows in batches(read_rows(file, format), batch_size, skip=checkpoint.rows):
+            future = validator.submit(validate_batch, checkpoint.run, start, rows)
+            validating.append((start, len(rows), future))
+            if len(validating) >= 2 * max(1, workers):
+                start_write()
+        while validating:
+            start_write()
+        while writing:
+            finish_write()
+
+    # Terminou: o próximo import do mesmo arquivo começa do zero
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    report.inserted, report.invalid = checkpoint.inserted, checkpoint.invalid
+    report.seconds = round(time.perf_counter() - started, 3)
+    report.rows_per_second = round(report.rows / report.seconds, 1) if report.seconds else 0.0
+    return report
+
+
+def export_catalog(
+    usecase,
+    output: IO[str],
+    format: str = "ndjson",
+    min_price: float = None,
+    max_price: float = None,
+    status: bool = None,
+    batch_size: int = 1000,
+) -> ExportReport:
+    """Escreve os produtos filtrados conforme saem do cursor, sem montar a lista."""
+    started = time.perf_counter()
+    report = ExportReport()
+    writer = None
+    if format == "csv":
+        writer = csv.DictWriter(output, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+    for document in usecase.iterate_sync(min_price, max_price, status, batch_size=batch_size):
+        product = ProductOut.from_document(document)
+        if writer is not None:
+            writer.writerow(product.model_dump(mode="json", include=set(EXPORT_FIELDS)))
+        else:
+            output.write(product.model_dump_json() + "\n")
+        report.rows += 1
+    report.seconds = round(time.perf_counter() - started, 3)
+    report.rows_per_second = round(report.rows / report.seconds, 1) if report.seconds else 0.0
+    return report
+
+
+def _print_progress(rows: int, rate: float) -> None:
+    print(f"{rows} registros ({rate:.0f}/s)", file=sys.stderr, flush=True)
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "sim")
+
+
+def main() -> int:
+    from store.core.config import get_settings
+    from store.usecases.product_sync import ProductUsecaseSync
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Importação e exportação do catálogo em massa")
+    parser.add_argument("--uri", default=None, help="URI do Mongo (padrão DATABASE_URL)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Importa um arquivo CSV/NDJSON de fornecedor")
+    importer.add_argument("path")
+    importer.add_argument("--format", choices=FORMATS, default=None, help="Padrão: pela extensão")
+    importer.add_argument("--batch-size", type=int, default=settings.BULK_CHUNK_SIZE)
+    importer.add_argument("--workers", type=int, default=None, help="Processos de validação (0 = sem pool)")
+    importer.add_argument("--writers", type=int, default=4, help="insert_many simultâneos")
+    importer.add_argument("--checkpoint", default=None, help="Padrão: <arquivo>.checkpoint.json")
+    importer.add_argument("--rejects", default=None, help="NDJSON com todos os registros rejeitados")
+
+    exporter = commands.add_parser("export", help="Exporta o catálogo (\"-\" = saída padrão)")
+    exporter.add_argument("path")
+    exporter.add_argument("--format", choices=FORMATS, default=None, help="Padrão: pela extensão")
+    exporter.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    exporter.add_argument("--min-price", type=float, default=None)
+    exporter.add_argument("--max-price", type=float, default=None)
+    exporter.add_argument("--status", type=_parse_bool, default=None)
+    args = parser.parse_args()
+
+    usecase = ProductUsecaseSync(args.uri)
+    try:
+        if args.command == "import":
+            rejects = open(args.rejects, "a", encoding="utf-8") if args.rejects else None
+            try:
+                report = import_catalog(
+                    usecase, args.path, args.format, args.batch_size, args.workers, args.writers,
+                    args.checkpoint, rejects, progress=_print_progress
+                )
+                # Importação em massa: mais barato recalcular o resumo do /stats do que mantê-lo
+                usecase.drop_stats_summary_sync()
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 2
+            finally:
+                if rejects is not None:
+                    rejects.close()
+        else:
+            format = detect_format(args.path, args.format)
+            if args.path == "-":
+                report = export_catalog(
+                    usecase, sys.stdout, format, args.min_price, args.max_price, args.status, args.batch_size
+                )
+            else:
+                with open(args.path, "w", newline="" if format == "csv" else None, encoding="utf-8") as output:
+                    report = export_catalog(
+                        usecase, output, format, args.min_price, args.max_price, args.status, args.batch_size
+                    )
+    finally:
+        usecase.close()
+    # Relatório no stderr: no export para "-" o stdout é o próprio catálogo
+    print(report.model_dump_json(indent=2), file=sys.stderr)
+    # Código de saída 1 se algum registro foi rejeitado
+    return 1 if getattr(report, "invalid", 0) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,17 @@
+# \store\controllers\metrics.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from store.core.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metricas():
+    """
+    Métricas do worker no formato texto do Prometheus.
+    
+    Returns:
+        Latência por rota e status, requisições em andamento, duração dos
+        comandos do Mongo e espera por conexão do pool
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
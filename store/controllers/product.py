@@ -1,15 +1,62 @@
 # \store\controllers\product.py
-from fastapi import APIRouter, HTTPException, status
-from store.schemas.product import ProductIn, ProductOut, ProductUpdate
-from store.usecases.product import product_usecase
+import csv
+import functools
+import io
+from typing import AsyncIterator, Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+from store.core.config import get_settings
+from store.core.deadline import DeadlineExceeded, expired
+from store.schemas.product import (
+    EXPORT_FIELDS,
+    BulkResult,
+    ProductBulkUpdate,
+    ProductChanges,
+    ProductIn,
+    ProductLookup,
+    ProductOut,
+    ProductPage,
+    ProductStats,
+    ProductUpdate,
+    Reservation,
+    ReservationIn,
+    ReservationItemIn,
+    ReservationResult,
+)
+from store.usecases.product import ProductUsecase, get_product_usecase, parse_fields, parse_ids
 
 def handle_usecase_exceptions(func):
     """
     Envelope que captura exceções dos usecases e converte para HTTPException.
     """
+    @functools.wraps(func)  # Preserva a assinatura para o FastAPI ler os parâmetros
     async def envelope(*args, **kwargs):
         try:
             return await func(*args, **kwargs)
+        except HTTPException:
+            raise  # Já traz o status correto definido no usecase
+        except DeadlineExceeded:
+            # Esperava uma leitura compartilhada com outras requisições
+            raise HTTPException(
+                status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                detail="Prazo da requisição esgotado"
+            )
+        except (ConnectionFailure, ExecutionTimeout):
+            if expired():
+                # O maxTimeMS (ou a espera por conexão) esgotou o prazo da requisição
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail="Prazo da requisição esgotado"
+                )
+            # Banco lento ou fora (pool esgotado, seleção de servidor, timeout de rede
+            # ou de consulta): condição passageira, não erro da aplicação
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Banco de dados indisponível: tente de novo em instantes",
+                headers={"Retry-After": str(get_settings().ADMISSION_RETRY_AFTER_S)}
+            )
         except Exception as e:
             if "not found" in str(e).lower():
                 raise HTTPException(
@@ -22,11 +69,84 @@ def handle_usecase_exceptions(func):
             )
     return envelope
 
+def _json_response(model: BaseModel, status_code: int = status.HTTP_200_OK, headers: dict = None) -> Response:
+    """
+    Serializa direto pelo pydantic-core. Devolver um Response evita que o
+    FastAPI revalide e reserialize o modelo pelo response_model, que continua
+    declarado só para a documentação.
+    """
+    return Response(
+        content=model.model_dump_json(),
+        media_type="application/json",
+        status_code=status_code,
+        headers=headers
+    )
+
+def _product_etag(id: str, version: int, fields: tuple = None) -> str:
+    """ETag forte de um produto: id e versão (e os campos, se a resposta for parcial)."""
+    tag = f"{id}-{version}"
+    if fields is not None:
+        tag += "-" + "+".join(fields)
+    return f'"{tag}"'
+
+def _etags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+def _not_modified(if_none_match: str | None, etag: str) -> Response | None:
+    """
+    304 sem corpo quando o cliente já tem esta representação. O If-None-Match
+    usa comparação fraca: W/"x" casa com "x".
+    """
+    if if_none_match is None:
+        return None
+    tags = _etags(if_none_match)
+    if "*" in tags or etag in (tag.removeprefix("W/") for tag in tags):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+def _expected_version(if_match: str | None, id: str) -> int | None:
+    """
+    Versão exigida pelo If-Match para uma escrita. "*" só exige que o produto
+    exista. ETags fracos, de outro produto ou que não saíram desta API nunca
+    casam (comparação forte): 412.
+    """
+    if if_match is None:
+        return None
+    tags = _etags(if_match)
+    if "*" in tags:
+        return None
+    for tag in tags:
+        parts = tag[1:-1].split("-") if len(tag) > 1 and tag[0] == tag[-1] == '"' else []
+        if len(parts) >= 2 and parts[0] == id and parts[1].isdigit():
+            return int(parts[1])
+    raise HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail="If-Match não corresponde a este produto"
+    )
+
+
+async def _ndjson_lines(products: AsyncIterator[ProductOut]) -> AsyncIterator[str]:
+    async for product in products:
+        yield product.model_dump_json() + "\n"
+
+
+async def _csv_lines(products: AsyncIterator[ProductOut]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for product in products:
+        writer.writerow(product.model_dump(mode="json", include=set(EXPORT_FIELDS)))
+        yield buffer.getvalue()
+        # Reaproveita o mesmo buffer: só a linha atual fica em memória
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
 router = APIRouter(prefix="/products", tags=["Products"])
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=ProductOut)
 @handle_usecase_exceptions
-async def criar_produto(product_in: ProductIn):
+async def criar_produto(product_in: ProductIn, usecase: ProductUsecase = Depends(get_product_usecase)):
     """
     Cria um novo produto.
     
@@ -34,74 +154,337 @@ async def criar_produto(product_in: ProductIn):
         product_in: Dados do produto validados pelo schema ProductIn
         
     Returns:
-        ProductOut: Produto criado com ID e datas geradas
+        ProductOut: Produto criado com ID e datas geradas (ETag no cabeçalho)
+    """
+    resultado = await usecase.create(product_in)
+    # Com o ETag o cliente já pode mandar If-Match no primeiro PUT, sem um GET antes
+    headers = {"ETag": _product_etag(resultado.id, resultado.version)}
+    return _json_response(resultado, status.HTTP_201_CREATED, headers)
+
+@router.get("/export")
+@handle_usecase_exceptions
+async def exportar_produtos(
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    preco_minimo: float = Query(None, allow_inf_nan=False),
+    preco_maximo: float = Query(None, allow_inf_nan=False),
+    status: bool = None,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Exporta o catálogo em streaming (NDJSON ou CSV).
+    
+    Cada documento é serializado assim que chega do cursor, então o uso de
+    memória não cresce com o número de produtos.
+    
+    Args:
+        formato: "ndjson" (padrão) ou "csv"
+        preco_minimo: Filtro de preço mínimo (parâmetro de query)
+        preco_maximo: Filtro de preço máximo (parâmetro de query)
+        status: Filtro de status (parâmetro de query)
+    """
+    products = usecase.export(
+        min_price=preco_minimo,
+        max_price=preco_maximo,
+        status=status
+    )
+    if formato == "csv":
+        return StreamingResponse(
+            _csv_lines(products),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="products.csv"'}
+        )
+    return StreamingResponse(_ndjson_lines(products), media_type="application/x-ndjson")
+
+@router.get("/changes", response_model=ProductChanges)
+@handle_usecase_exceptions
+async def alteracoes_produtos(
+    since: str = None,
+    limit: int = Query(None, ge=1),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Feed de alterações para réplicas e caches: só o que mudou desde o token.
+    
+    Args:
+        since: "next_token" da chamada anterior (vazio = desde o início)
+        limit: Alterações por chamada (limitado por PAGE_SIZE_MAX)
+        
+    Returns:
+        ProductChanges: Alterações e exclusões em ordem de updated_at e o
+        token da próxima chamada
     """
-    resultado = await product_usecase.create(product_in)
-    return resultado
+    resultado = await usecase.changes(since=since, limit=limit)
+    return _json_response(resultado)
+
+@router.get("/stats", response_model=ProductStats)
+@handle_usecase_exceptions
+async def estatisticas_produtos(
+    status: bool = None,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Facetas do catálogo para filtros da vitrine, em uma única consulta.
+    
+    Args:
+        status: Filtro de status (os contadores active/inactive o ignoram)
+        
+    Returns:
+        ProductStats: Contagem por status, faixas de preço para os filtros
+        preco_minimo/preco_maximo, menor/maior preço e valor do estoque
+    """
+    resultado = await usecase.stats(status=status)
+    return _json_response(resultado)
+
+@router.get("/cache/stats")
+async def estatisticas_cache(usecase: ProductUsecase = Depends(get_product_usecase)):
+    """
+    Contadores do cache de leitura do GET /products/{id}.
+    
+    Returns:
+        dict: Backend em uso, acertos (hits) e faltas (misses)
+    """
+    return usecase.cache.stats()
+
+@router.post("/bulk", response_model=BulkResult)
+@handle_usecase_exceptions
+async def criar_produtos_em_lote(
+    products: list[ProductIn],
+    ordered: bool = True,
+    chunk_size: int = Query(None, ge=1),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Cria vários produtos com bulk_write.
+    
+    Args:
+        products: Lista de produtos a criar
+        ordered: Se verdadeiro, para no primeiro erro (padrão)
+        chunk_size: Operações por bulk_write (padrão BULK_CHUNK_SIZE)
+        
+    Returns:
+        BulkResult: Resultado por item, na ordem do pedido
+    """
+    resultado = await usecase.bulk_create(products, ordered=ordered, chunk_size=chunk_size)
+    return _json_response(resultado)
+
+@router.put("/bulk", response_model=BulkResult)
+@handle_usecase_exceptions
+async def atualizar_produtos_em_lote(
+    products: list[ProductBulkUpdate],
+    ordered: bool = True,
+    chunk_size: int = Query(None, ge=1),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Atualiza vários produtos com bulk_write.
+    
+    Args:
+        products: Lista de atualizações parciais, cada uma com seu "id"
+        ordered: Se verdadeiro, para no primeiro erro (padrão)
+        chunk_size: Operações por bulk_write (padrão BULK_CHUNK_SIZE)
+        
+    Returns:
+        BulkResult: Resultado por item, na ordem do pedido
+    """
+    resultado = await usecase.bulk_update(products, ordered=ordered, chunk_size=chunk_size)
+    return _json_response(resultado)
+
+@router.post("/bulk/delete", response_model=BulkResult)
+@handle_usecase_exceptions
+async def deletar_produtos_em_lote(
+    ids: list[str],
+    ordered: bool = True,
+    chunk_size: int = Query(None, ge=1),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Remove vários produtos com bulk_write.
+    
+    Args:
+        ids: Lista de IDs a remover
+        ordered: Se verdadeiro, para no primeiro erro (padrão)
+        chunk_size: Operações por bulk_write (padrão BULK_CHUNK_SIZE)
+        
+    Returns:
+        BulkResult: Resultado por item, na ordem do pedido
+    """
+    resultado = await usecase.bulk_delete(ids, ordered=ordered, chunk_size=chunk_size)
+    return _json_response(resultado)
+
+@router.post("/lookup", response_model=ProductLookup)
+@handle_usecase_exceptions
+async def buscar_produtos_por_ids(
+    ids: list[str],
+    fields: str = None,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Busca vários produtos pelo ID em uma única consulta. Mesmo que
+    GET /products?ids=, para listas que não cabem na URL.
+    
+    Args:
+        ids: Lista de IDs (até LOOKUP_MAX_IDS)
+        fields: Campos de cada item separados por vírgula (ex.: "name,price")
+        
+    Returns:
+        ProductLookup: Produtos na ordem pedida e os IDs não encontrados
+    """
+    resultado = await usecase.lookup(parse_ids(ids), fields=parse_fields(fields))
+    return _json_response(resultado)
+
+@router.post("/reserve", response_model=ReservationResult)
+@handle_usecase_exceptions
+async def reservar_estoque_em_lote(
+    items: list[ReservationItemIn],
+    all_or_nothing: bool = True,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Reserva estoque de vários produtos (ex.: um carrinho) de uma vez.
+    
+    Args:
+        items: Produtos e quantidades a reservar
+        all_or_nothing: Se verdadeiro (padrão), uma falha devolve ao estoque
+            o que já tinha sido reservado
+        
+    Returns:
+        ReservationResult: Resultado por produto; status 409 se algum falhou
+    """
+    resultado = await usecase.reserve_many(items, all_or_nothing=all_or_nothing)
+    return _json_response(resultado, status.HTTP_200_OK if resultado.ok else status.HTTP_409_CONFLICT)
+
+@router.post("/{id}/reserve", response_model=Reservation)
+@handle_usecase_exceptions
+async def reservar_estoque(
+    id: str,
+    reservation: ReservationIn,
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
+    """
+    Reserva estoque de um produto com um decremento atômico, em vez de
+    ler, subtrair e gravar com PUT.
+    
+    Args:
+        id: ID do produto
+        reservation: Quantidade a reservar
+        
+    Returns:
+        Reservation: Estoque restante; 409 se não houver o suficiente
+    """
+    resultado = await usecase.reserve(id, reservation.quantity)
+    return _json_response(resultado)
 
 @router.get("/{id}", response_model=ProductOut)
 @handle_usecase_exceptions
-async def buscar_produto(id: str):
+async def buscar_produto(
+    id: str,
+    fields: str = None,
+    if_none_match: str = Header(None),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
     """
     Busca um produto pelo ID.
     
     Args:
         id: ID do produto (string do MongoDB)
+        fields: Campos da resposta separados por vírgula (ex.: "name,price")
+        if_none_match: ETag já conhecido pelo cliente (header If-None-Match)
         
     Returns:
-        ProductOut: Dados completos do produto
+        ProductOut: Dados do produto (só os campos pedidos, se houver "fields"),
+        ou 304 sem corpo se o ETag não mudou
     """
-    resultado = await product_usecase.get(id)
-    return resultado
+    campos = parse_fields(fields)
+    resultado, versao = await usecase.get_versioned(id, fields=campos)
+    etag = _product_etag(id, versao, campos)
+    return _not_modified(if_none_match, etag) or _json_response(resultado, headers={"ETag": etag})
 
 @router.put("/{id}", response_model=ProductOut)
 @handle_usecase_exceptions
-async def atualizar_produto(id: str, product_update: ProductUpdate):
+async def atualizar_produto(
+    id: str,
+    product_update: ProductUpdate,
+    if_match: str = Header(None),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
     """
     Atualiza um produto existente.
     
     Args:
         id: ID do produto a ser atualizado
         product_update: Campos a serem atualizados (parciais)
+        if_match: ETag lido antes (header If-Match); se o produto mudou
+            desde então, nada é gravado e a resposta é 412
         
     Returns:
-        ProductOut: Produto atualizado
+        ProductOut: Produto atualizado, com o novo ETag no header
     """
-    resultado = await product_usecase.update(id, product_update)
-    return resultado
+    resultado = await usecase.update(id, product_update, _expected_version(if_match, id))
+    return _json_response(resultado, headers={"ETag": _product_etag(id, resultado.version)})
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
 @handle_usecase_exceptions
-async def deletar_produto(id: str):
+async def deletar_produto(
+    id: str,
+    if_match: str = Header(None),
+    usecase: ProductUsecase = Depends(get_product_usecase)
+):
     """
     Remove um produto pelo ID.
     
     Args:
         id: ID do produto a ser removido
+        if_match: ETag lido antes (header If-Match); se o produto mudou
+            desde então, nada é removido e a resposta é 412
     """
-    await product_usecase.delete(id)
+    await usecase.delete(id, _expected_version(if_match, id))
 
-@router.get("/", response_model=list[ProductOut])
+@router.get("/", response_model=ProductPage)
 @handle_usecase_exceptions
 async def listar_produtos(
-    preco_minimo: float = None,
-    preco_maximo: float = None,
-    status: bool = None
+    preco_minimo: float = Query(None, allow_inf_nan=False),
+    preco_maximo: float = Query(None, allow_inf_nan=False),
+    status: bool = None,
+    limit: int = Query(None, ge=1),
+    cursor: str = None,
+    fields: str = None,
+    ids: str = None,
+    if_none_match: str = Header(None),
+    usecase: ProductUsecase = Depends(get_product_usecase)
 ):
     """
-    Lista produtos com filtros opcionais.
+    Lista produtos com filtros opcionais, paginados por cursor, ou busca
+    os produtos de uma lista de IDs.
     
     Args:
         preco_minimo: Filtro de preço mínimo (parâmetro de query)
         preco_maximo: Filtro de preço máximo (parâmetro de query) 
         status: Filtro de status (parâmetro de query)
+        limit: Tamanho da página (limitado por PAGE_SIZE_MAX)
+        cursor: Token "next_cursor" devolvido pela página anterior
+        fields: Campos de cada item separados por vírgula (ex.: "name,price")
+        ids: IDs separados por vírgula; com eles, os demais filtros são
+            ignorados e a resposta é a de POST /products/lookup
+        if_none_match: ETag já conhecido pelo cliente (header If-None-Match)
         
     Returns:
-        list[ProductOut]: Lista de produtos que atendem aos filtros
+        ProductPage: Produtos da página e o cursor da próxima, ou 304 sem
+        corpo (e sem consultar a página) se nada mudou na collection
     """
-    resultado = await product_usecase.list(
+    if ids is not None:
+        resultado = await usecase.lookup(parse_ids(ids), fields=parse_fields(fields))
+        return _json_response(resultado)
+    filtros = dict(
         min_price=preco_minimo,
         max_price=preco_maximo,
-        status=status
+        status=status,
+        limit=limit,
+        cursor=cursor,
+        fields=parse_fields(fields)
     )
-    return resultado
\ No newline at end of file
+    etag = await usecase.list_etag(**filtros)
+    nao_modificado = _not_modified(if_none_match, etag)
+    if nao_modificado is not None:
+        return nao_modificado
+    resultado = await usecase.list_page(**filtros)
+    return _json_response(resultado, headers={"ETag": etag})
\ No newline at end of file
@@ -0,0 +1,164 @@
+# store\core\admission.py
+import asyncio
+import time
+from collections import deque
+from starlette.responses import JSONResponse
+from store.core.config import get_settings
+from store.core.metrics import (
+    ADMISSION_ACTIVE,
+    ADMISSION_QUEUE_WAIT,
+    ADMISSION_QUEUED,
+    ADMISSION_REJECTED,
+    route_name,
+)
+
+# Rotas fora do controle de admissão: observabilidade precisa responder justamente na sobrecarga
+EXEMPT_ROUTES = {"/metrics", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"}
+# POSTs que só leem (o corpo carrega a lista de ids)
+READ_ROUTES = {("POST", "/products/lookup")}
+
+
+class Overloaded(Exception):
+    """Sem vaga para a requisição: fila cheia ("queue_full") ou espera esgotada ("timeout")."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """
+    Limita as requisições simultâneas de uma classe de rotas. Acima de
+    "limit", a requisição espera vaga em uma fila FIFO de até "queue_size";
+    com a fila cheia, ou depois de "queue_timeout" segundos esperando, é
+    recusada na hora em vez de se acumular à espera do pool do Mongo.
+
+    Quem sai passa a vaga direto para o primeiro da fila, então uma
+    requisição nova não fura a fila de quem já esperava.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float = None) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout or None
+        self.active = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self._waiters: deque[asyncio.Future] = deque()
+        # Séries zeradas desde o início: o painel mostra a classe antes da primeira fila
+        ADMISSION_ACTIVE.set(0, name)
+        ADMISSION_QUEUED.set(0, name)
+
+    async def acquire(self) -> None:
+        """Ocupa uma vaga (esperando na fila se preciso) ou levanta Overloaded."""
+        if self.active < self.limit and not self._waiters:
+            self._admit()
+            return
+        if len(self._waiters) >= self.queue_size:
+            self._reject("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        ADMISSION_QUEUED.set(len(self._waiters), self.name)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as error:
+            if future.done() and not future.cancelled():
+                self.release()  # A vaga chegou junto com o cancelamento: repassa adiante
+            elif future in self._waiters:
+                self._waiters.remove(future)
+            ADMISSION_QUEUED.set(len(self._waiters), self.name)
+            if isinstance(error, asyncio.TimeoutError):
+                self._reject("timeout")
+            raise
+        finally:
+            ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - start, self.name)
+        # release() já contou a vaga repassada em "active"
+        self.admitted += 1
+
+    def release(self) -> None:
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                ADMISSION_QUEUED.set(len(self._waiters), self.name)
+                return
+        self.active -= 1
+        ADMISSION_ACTIVE.set(self.active, self.name)
+
+    def _admit(self) -> None:
+        self.active += 1
+        self.admitted += 1
+        ADMISSION_ACTIVE.set(self.active, self.name)
+
+    def _reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc(self.name, reason)
+        raise Overloaded(reason) from None
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+def build_limiters() -> dict[str, AdmissionLimiter]:
+    settings = get_settings()
+    timeout = settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000
+    return {
+        "read": AdmissionLimiter("read", settings.ADMISSION_READ_LIMIT, settings.ADMISSION_READ_QUEUE, timeout),
+        "write": AdmissionLimiter("write", settings.ADMISSION_WRITE_LIMIT, settings.ADMISSION_WRITE_QUEUE, timeout),
+    }
+
+
+def route_class(method: str, route: str) -> str:
+    if method in ("GET", "HEAD", "OPTIONS") or (method, route) in READ_ROUTES:
+        return "read"
+    return "write"
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI: controle de admissão por classe de rota (leituras e
+    escritas têm limites e filas próprias, para que uma rajada de uma não
+    trave a outra). Recusas viram 503 com Retry-After.
+
+    Os limites valem por worker; a vaga fica ocupada até a resposta terminar
+    de ser enviada, inclusive nas exportações em streaming.
+    """
+
+    def __init__(self, app, limiters: dict[str, AdmissionLimiter] = None) -> None:
+        self.app = app
+        self.limiters = build_limiters() if limiters is None else limiters
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_name(scope)
+        if route in EXEMPT_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class(scope["method"], route)]
+        try:
+            await limiter.acquire()
+        except Overloaded:
+            response = JSONResponse(
+                {"detail": "Servidor sobrecarregado: tente de novo em instantes"},
+                status_code=503,
+                headers={"Retry-After": str(get_settings().ADMISSION_RETRY_AFTER_S)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
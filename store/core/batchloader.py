@@ -0,0 +1,103 @@
+# store\core\batchloader.py
+from __future__ import annotations
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+from store.core.deadline import detached, within_deadline
+
+
+class BatchLoader:
+    """
+    Junta as chamadas de load() feitas no mesmo ciclo do event loop em uma
+    única chamada de "fetch" com todas as chaves (o padrão DataLoader): N
+    GET /products/{id} concorrentes viram um só find com $in.
+
+    "fetch" recebe a lista de chaves, sem repetição, e devolve {chave: valor};
+    chaves ausentes do resultado resolvem para None. Com "max_batch_size", um
+    lote cheio é despachado na hora, sem esperar o fim do ciclo.
+
+    Como no SingleFlight, o lote roda em uma task própria, sem o prazo da
+    requisição que o disparou: cancelar quem esperava uma chave, ou esgotar
+    o prazo dela, não derruba as demais; só quando todos os que esperavam o
+    lote desistem ele é cancelado. Nada é guardado depois que o
+    lote termina: não é um cache.
+    """
+
+    def __init__(self, fetch: Callable[[list], Awaitable[dict]], max_batch_size: int = None) -> None:
+        self._fetch = fetch
+        self.max_batch_size = max_batch_size
+        self._pending = _Batch()
+        # O event loop só guarda referência fraca às tasks: sem isto um lote
+        # em andamento poderia ser coletado e deixar quem espera pendurado
+        self._running: set[asyncio.Task] = set()
+        self.loads = 0
+        self.batches = 0
+
+    async def load(self, key: Hashable) -> Any:
+        self.loads += 1
+        batch = self._pending
+        batch.waiting += 1  # Antes do despacho: um lote cheio sai na hora
+        try:
+            future = batch.futures.get(key)
+            if future is None:
+                loop = asyncio.get_running_loop()
+                future = loop.create_future()
+                future.add_done_callback(_consume)
+                batch.futures[key] = future
+                if len(batch.futures) == 1:
+                    # Roda depois das tarefas já prontas neste ciclo, que podem pedir mais chaves
+                    loop.call_soon(self._dispatch, batch)
+                elif self.max_batch_size and len(batch.futures) >= self.max_batch_size:
+                    self._dispatch(batch)
+            return await within_deadline(asyncio.shield(future))
+        finally:
+            batch.waiting -= 1
+            if not batch.waiting and batch.task is not None:
+                batch.task.cancel()  # Ninguém mais espera o lote; sem efeito se já terminou
+
+    def _dispatch(self, batch: _Batch) -> None:
+        if batch is not self._pending:
+            return  # Já despachado por ter enchido
+        self._pending = _Batch()
+        if not batch.waiting:
+            for future in batch.futures.values():
+                future.cancel()  # Todos desistiram antes do despacho
+            return
+        self.batches += 1
+        batch.task = detached(lambda: self._run(batch.futures))
+        self._running.add(batch.task)
+        batch.task.add_done_callback(self._running.discard)
+
+    async def _run(self, pending: dict[Hashable, asyncio.Future]) -> None:
+        try:
+            found = await self._fetch(list(pending))
+        except asyncio.CancelledError:
+            for future in pending.values():
+                future.cancel()
+            raise
+        except Exception as error:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+    def stats(self) -> dict:
+        return {"loads": self.loads, "batches": self.batches, "pending": len(self._pending.futures)}
+
+
+class _Batch:
+    """Chaves de um lote, quantos ainda esperam por ele e a task que o busca."""
+
+    __slots__ = ("futures", "waiting", "task")
+
+    def __init__(self) -> None:
+        self.futures: dict[Hashable, asyncio.Future] = {}
+        self.waiting = 0
+        self.task: asyncio.Task | None = None
+
+
+def _consume(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()  # Evita o aviso de exceção não lida quando ninguém mais espera
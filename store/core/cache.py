@@ -0,0 +1,239 @@
+# store\core\cache.py
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from store.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Versão das marcas de invalidate() sem versão: nenhum set() passa por cima até o TTL
+ANY_VERSION = 2 ** 62
+
+
+class Cache(ABC):
+    """
+    Interface do cache de leitura. Todas as operações são assíncronas para que
+    um backend em rede (Redis) e o LRU local sejam intercambiáveis.
+
+    Cada valor é guardado com a versão do documento e só é substituído por
+    uma versão mais nova. Assim, uma leitura lenta que termina depois de uma
+    escrita (no mesmo worker ou em outro) não devolve ao cache o valor antigo.
+    """
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, version: int) -> None:
+        """Grava "value" só se "version" for maior que a já guardada na chave."""
+
+    @abstractmethod
+    async def invalidate(self, key: str, version: int = None) -> None:
+        """
+        Descarta o valor e deixa uma marca que recusa set() de versões
+        anteriores a "version" (de qualquer versão, sem ela) até o TTL.
+        """
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[Any]:
+        ...
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses}
+
+
+def _mark_version(version: int | None) -> int:
+    return ANY_VERSION if version is None else version - 1
+
+
+class NullCache(Cache):
+    """Cache desligado: toda leitura é um miss."""
+
+    async def _get(self, key: str) -> Optional[Any]:
+        return None
+
+    async def set(self, key: str, value: Any, version: int) -> None:
+        pass
+
+    async def invalidate(self, key: str, version: int = None) -> None:
+        pass
+
+
+class LRUCache(Cache):
+    """
+    LRU em processo com limite de tamanho e TTL por entrada. Escritas feitas
+    por outros workers não chegam aqui: só serve com um worker (ver build_cache).
+    """
+
+    def __init__(self, max_size: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    def _live(self, key: str) -> tuple[float, int, Any] | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._entries[key]
+            return None
+        return entry
+
+    async def _get(self, key: str) -> Optional[Any]:
+        entry = self._live(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _put(self, key: str, value: Any, version: int) -> None:
+        self._entries[key] = (self.clock() + self.ttl, version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def set(self, key: str, value: Any, version: int) -> None:
+        entry = self._live(key)
+        if entry is None or entry[1] < version:
+            self._put(key, value, version)
+
+    async def invalidate(self, key: str, version: int = None) -> None:
+        entry = self._live(key)
+        self._put(key, None, max(_mark_version(version), entry[1] if entry else -1))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "size": len(self._entries), "max_size": self.max_size}
+
+
+class SharedCache(Cache):
+    """
+    Cache compartilhado entre workers. O cliente expõe get(chave),
+    set_if_newer(chave, texto, versão, ex=segundos) e
+    invalidate(chave, versão, ex=segundos), com a comparação de versão feita
+    atomicamente no servidor (RedisSharedClient). Os valores
+    trafegam como texto, então é preciso informar como serializar e
+    desserializar.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl: float,
+        dumps: Callable[[Any], str],
+        loads: Callable[[str], Any],
+        prefix: str = "product:",
+    ) -> None:
+        super().__init__()
+        self.client = client
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.prefix = prefix
+
+    async def _get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self.prefix + key)
+        return self.loads(raw) if raw else None  # "" é a marca de invalidate()
+
+    async def set(self, key: str, value: Any, version: int) -> None:
+        await self.client.set_if_newer(self.prefix + key, self.dumps(value), version, ex=max(1, int(self.ttl)))
+
+    async def invalidate(self, key: str, version: int = None) -> None:
+        await self.client.invalidate(self.prefix + key, _mark_version(version), ex=max(1, int(self.ttl)))
+
+
+class RedisSharedClient:
+    """Operações do SharedCache sobre o redis.asyncio: um hash {v, d} por chave."""
+
+    # Compara e grava em um passo no servidor: dois workers nunca se sobrepõem.
+    # Com ARGV[4] = "1" (invalidate) sempre grava, sem baixar a versão guardada.
+    SET_IF_NEWER = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'v'))
+local version = tonumber(ARGV[1])
+if current and current >= version then
+    if ARGV[4] ~= '1' then
+        return 0
+    end
+    version = current
+end
+redis.call('HSET', KEYS[1], 'v', version, 'd', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+    def __init__(self, redis) -> None:
+        self.redis = redis
+        self._set_if_newer = redis.register_script(self.SET_IF_NEWER)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.redis.hget(key, "d")
+
+    async def set_if_newer(self, key: str, value: str, version: int, ex: int) -> bool:
+        return bool(await self._set_if_newer(keys=[key], args=[version, value, ex, 0]))
+
+    async def invalidate(self, key: str, version: int, ex: int) -> None:
+        await self._set_if_newer(keys=[key], args=[version, "", ex, 1])
+
+
+class LocalSharedClient:
+    """Substituto local do RedisSharedClient para testes e desenvolvimento."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self._data: dict[str, tuple[float, int, str]] = {}
+
+    def _live(self, key: str) -> tuple[float, int, str] | None:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._data[key]
+            return None
+        return entry
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._live(key)
+        return None if entry is None else entry[2]
+
+    async def set_if_newer(self, key: str, value: str, version: int, ex: int) -> bool:
+        entry = self._live(key)
+        if entry is not None and entry[1] >= version:
+            return False
+        self._data[key] = (self.clock() + ex, version, value)
+        return True
+
+    async def invalidate(self, key: str, version: int, ex: int) -> None:
+        entry = self._live(key)
+        self._data[key] = (self.clock() + ex, max(version, entry[1] if entry else -1), "")
+
+
+def build_cache(dumps: Callable[[Any], str], loads: Callable[[str], Any]) -> Cache:
+    """Cria o backend configurado em CACHE_BACKEND."""
+    settings = get_settings()
+    if settings.CACHE_BACKEND == "lru":
+        if settings.WORKERS > 1:
+            # Cada worker teria o seu LRU e não veria as escritas dos outros
+            logger.warning("CACHE_BACKEND=lru com %s workers: cache desligado (use redis)", settings.WORKERS)
+            return NullCache()
+        return LRUCache(settings.CACHE_MAX_SIZE, settings.CACHE_TTL_SECONDS)
+    if settings.CACHE_BACKEND == "redis":
+        try:
+            from redis.asyncio import Redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis exige o pacote 'redis'") from e
+        if not settings.CACHE_REDIS_URL:
+            raise RuntimeError("CACHE_BACKEND=redis exige CACHE_REDIS_URL")
+        client = RedisSharedClient(Redis.from_url(settings.CACHE_REDIS_URL, decode_responses=True))
+        return SharedCache(client, settings.CACHE_TTL_SECONDS, dumps, loads)
+    return NullCache()
@@ -1,3 +1,5 @@
+from functools import lru_cache
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
@@ -5,8 +7,87 @@ class Settings(BaseSettings):
     ROOT_PATH: str = "/"
 
     DATABASE_URL: str
+    STORAGE_ENGINE: Literal["mongo", "memory"] = "mongo"  # "memory": catálogo em processo, sem banco
+
+    # Servidor (python -m store.serve)
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 0                       # 0 = um worker por núcleo (os.cpu_count())
+    SERVER: Literal["uvicorn", "gunicorn"] = "uvicorn"
+    LIMIT_CONCURRENCY: Optional[int] = None  # Conexões simultâneas por worker antes de responder 503
+    BACKLOG: int = 2048                    # Fila de conexões TCP pendentes no socket
+    TIMEOUT_KEEP_ALIVE: int = 5
+
+    # Prazo por requisição: vira maxTimeMS nos comandos do Mongo; esgotado = 504
+    REQUEST_DEADLINE_MS: int = 10_000       # Prazo padrão (0 = sem prazo)
+    REQUEST_DEADLINE_MAX_MS: int = 60_000   # Teto para o prazo pedido pelo cliente no header
+    REQUEST_DEADLINE_HEADER: str = "X-Request-Timeout-Ms"  # Prazo que o cliente vai esperar, em ms
+
+    # Pool de conexões do Mongo (mesmos nomes das opções do PyMongo/Motor)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None          # None = conexões ociosas não expiram
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None     # Espera máxima por uma conexão livre
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30_000
+    MONGO_CONNECT_TIMEOUT_MS: int = 20_000
+    MONGO_WARMUP: bool = True  # Abre MONGO_MIN_POOL_SIZE conexões antes de aceitar requisições
+
+    # Controle de admissão, por worker: acima do limite a requisição espera na fila; fila cheia = 503
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_READ_LIMIT: int = 100        # Leituras simultâneas (GET e POST /products/lookup)
+    ADMISSION_READ_QUEUE: int = 200        # Leituras esperando vaga antes de recusar
+    ADMISSION_WRITE_LIMIT: int = 50        # Escritas simultâneas
+    ADMISSION_WRITE_QUEUE: int = 100       # Escritas esperando vaga antes de recusar
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 1000  # Espera máxima na fila (0 = sem limite)
+    ADMISSION_RETRY_AFTER_S: int = 1       # Header Retry-After das respostas 503
+
+    PAGE_SIZE_DEFAULT: int = 50   # Itens por página quando o cliente não informa "limit"
+    PAGE_SIZE_MAX: int = 500      # Teto aplicado no servidor, independente do "limit" pedido
+    EXPORT_BATCH_SIZE: int = 1000  # Documentos por lote do cursor na exportação em streaming
+    BULK_CHUNK_SIZE: int = 1000    # Operações por chamada de bulk_write nos endpoints /bulk
+    LOOKUP_MAX_IDS: int = 500      # Ids por chamada de GET /products?ids= e POST /products/lookup
+    GET_BATCH_MAX_SIZE: int = 500  # Ids por $in ao agrupar GET /products/{id} simultâneos
+
+    CHANGES_LAG_MS: int = 1000          # /products/changes só entrega alterações mais velhas que isto
+    TOMBSTONE_RETENTION_DAYS: int = 30  # Lápides de exclusão expiram (TTL); tokens mais antigos recebem 410
+
+    STATS_PRICE_BUCKETS: list[float] = [0, 10, 25, 50, 100, 250, 500, 1000]  # Limites das faixas de preço do /products/stats
+    STATS_SUMMARY_ENABLED: bool = False    # Resumo materializado, mantido a cada escrita: /stats sem varrer o catálogo
+    STATS_SUMMARY_MAX_AGE_S: int = 3600    # Resumo mais velho que isto é recalculado na próxima leitura
+
+    PRODUCT_NAME_UNIQUE: bool = False     # Cria índice único em "name" (falha se já houver duplicados)
+    SYNC_INDEXES_ON_STARTUP: bool = True  # Cria índices ausentes ao subir com store.serve (uma vez, antes dos workers)
+
+    # Cache de leitura do GET /products/{id}. "lru" é por processo: desligado com WORKERS > 1 (use "redis")
+    CACHE_BACKEND: Literal["none", "lru", "redis"] = "lru"
+    CACHE_MAX_SIZE: int = 10_000         # Entradas no LRU em processo
+    CACHE_TTL_SECONDS: float = 30.0      # Tempo de vida de cada entrada
+    CACHE_REDIS_URL: Optional[str] = None  # Obrigatório quando CACHE_BACKEND="redis"
+
+    METRICS_ENABLED: bool = True   # GET /metrics (Prometheus) + eventos de comando/pool do driver
+    SLOW_QUERY_MS: int = 200       # Comandos do Mongo acima disto vão para o log (0 = desliga)
+    SLOW_QUERY_EXPLAIN: bool = True  # Inclui no log o plano do explain() da consulta lenta
+
+    PROFILING_ENABLED: bool = False        # Instala o middleware de profiling (desligado = custo zero)
+    PROFILING_HEADER: str = "X-Profile"    # "X-Profile: 1" perfila a requisição
+    PROFILING_SAMPLE_RATE: float = 0.0     # Fração das requisições perfiladas sem o header
+    PROFILING_MODE: Literal["sampling", "cprofile"] = "sampling"  # .folded (flame graph) ou .prof
+    PROFILING_INTERVAL_MS: float = 1.0     # Intervalo entre amostras no modo "sampling"
+    PROFILING_DIR: str = "profiles"        # Diretório local dos perfis gravados
 
     model_config = SettingsConfigDict(
         env_file=('.env.local', '.env')  # Tenta carregar .env.local primeiro, depois .env
     )                                    # Medida tomada para evitar vazamento da senha no gitHub
-settings = Settings()
\ No newline at end of file
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Lê o ambiente/.env só no primeiro uso, não no import."""
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Compatibilidade com "from store.core.config import settings"
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
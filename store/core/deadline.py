@@ -0,0 +1,166 @@
+# store\core\deadline.py
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from typing import Any, Awaitable, Callable, Iterator
+import pymongo
+from store.core.config import get_settings
+from store.core.metrics import REQUESTS_DISCONNECTED, route_name
+
+# Rotas sem prazo: a exportação em streaming pode durar o que o catálogo pedir
+# (e o StreamingResponse já a interrompe quando o cliente desconecta)
+NO_DEADLINE_ROUTES = {"/products/export"}
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """
+    Prazo para o que rodar dentro do bloco (e nas tasks criadas nele). Também
+    abre um pymongo.timeout: cada comando do Mongo sai com o que resta do
+    prazo como maxTimeMS, inclusive updates e deletes, e a espera por conexão
+    do pool e a seleção de servidor ficam limitadas ao mesmo prazo.
+    """
+    if seconds is None:
+        yield
+        return
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        with pymongo.timeout(seconds):
+            yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Segundos até o prazo da requisição atual (negativo se já passou); None sem prazo."""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+class DeadlineExceeded(Exception):
+    """O prazo da requisição esgotou enquanto ela esperava uma task compartilhada."""
+
+
+def detached(fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """
+    Task compartilhada por várias requisições (SingleFlight, BatchLoader).
+    Roda em um contexto vazio, sem o prazo nem o pymongo.timeout de quem a
+    criou: as outras que esperam por ela podem ter mais tempo. Cada uma
+    espera só até o próprio prazo (within_deadline) e, quando a última
+    desiste, quem a criou a cancela; o prazo dela, REQUEST_DEADLINE_MAX_MS
+    (o maior que uma requisição pode ter), só limita o que já foi ao banco.
+    """
+    seconds = None if remaining() is None else get_settings().REQUEST_DEADLINE_MAX_MS / 1000
+
+    async def run() -> Any:
+        with deadline(seconds):
+            return await fn()
+
+    return asyncio.get_running_loop().create_task(run(), context=Context())
+
+
+async def within_deadline(awaitable: Awaitable[Any]) -> Any:
+    """Espera "awaitable" até o prazo da requisição atual; esgotado, levanta DeadlineExceeded."""
+    left = remaining()
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(left, 0))
+    except asyncio.TimeoutError:
+        if not expired():
+            raise  # Timeout da própria operação, não do prazo
+        raise DeadlineExceeded() from None
+
+
+def request_timeout(headers: list[tuple[bytes, bytes]]) -> float | None:
+    """
+    Prazo da requisição em segundos: o do header REQUEST_DEADLINE_HEADER (em ms,
+    limitado a REQUEST_DEADLINE_MAX_MS) ou REQUEST_DEADLINE_MS. None sem prazo.
+    """
+    settings = get_settings()
+    name = settings.REQUEST_DEADLINE_HEADER.lower().encode()
+    milliseconds = settings.REQUEST_DEADLINE_MS
+    for key, value in headers:
+        if key == name:
+            try:
+                requested = int(value)
+            except ValueError:
+                break  # Header inválido: vale o padrão
+            if requested > 0:
+                milliseconds = min(requested, settings.REQUEST_DEADLINE_MAX_MS)
+            break
+    return milliseconds / 1000 if milliseconds > 0 else None
+
+
+class DeadlineMiddleware:
+    """
+    Middleware ASGI: prazo por requisição (ver deadline()) e cancelamento
+    quando o cliente desconecta. Uma task lê o canal da conexão durante toda
+    a requisição e repassa as mensagens à aplicação; ao ver http.disconnect,
+    cancela o handler, o que interrompe as consultas em andamento e fecha
+    seus cursores em vez de deixá-las ocupando o pool e a CPU do banco.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = route_name(scope)
+        if route in NO_DEADLINE_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = responded = False
+
+        async def queued_receive() -> dict:
+            if disconnected and messages.empty():
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def tracked_send(message: dict) -> None:
+            nonlocal responded
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                responded = True
+
+        async def handle() -> None:
+            with deadline(request_timeout(scope["headers"])):
+                await self.app(scope, queued_receive, tracked_send)
+
+        handler = asyncio.ensure_future(handle())
+
+        async def watch() -> None:
+            nonlocal disconnected
+            while True:
+                message = await receive()
+                messages.put_nowait(message)
+                if message["type"] == "http.disconnect":
+                    # Depois da resposta completa, o servidor também avisa http.disconnect
+                    if not responded:
+                        disconnected = True
+                        handler.cancel()
+                    return
+
+        watcher = asyncio.ensure_future(watch())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            REQUESTS_DISCONNECTED.inc(scope["method"], route)  # Ninguém para receber a resposta
+        finally:
+            watcher.cancel()
+            if not handler.done():
+                handler.cancel()
@@ -0,0 +1,148 @@
+# store\core\profiling.py
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from store.core.config import get_settings
+from store.core.metrics import route_name
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """
+    Profiler por amostragem: outra thread lê a pilha da thread do event loop a
+    cada "interval" segundos. Cada amostra vira uma linha no formato "folded"
+    (func1;func2;func3 contagem), lido pelo flamegraph.pl e pelo speedscope.
+
+    Enquanto o loop espera o Mongo, a pilha amostrada é a do próprio loop
+    (select), então o tempo de banco aparece como espera e o de CPU
+    (validação, serialização) aparece nas funções que o gastaram.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _slug(route: str) -> str:
+    return route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+
+
+class ProfilingMiddleware:
+    """
+    Perfila requisições individuais quando o cliente envia PROFILING_HEADER
+    ou por sorteio (PROFILING_SAMPLE_RATE). Só é instalado com
+    PROFILING_ENABLED: desligado, não existe no caminho da requisição.
+
+    Uma requisição perfilada por vez no worker. As que chegam nesse meio-tempo
+    rodam sem profiling, mas dividem o mesmo event loop, então seu trabalho
+    aparece no perfil da que está sendo medida.
+    """
+
+    def __init__(self, app) -> None:
+        settings = get_settings()
+        self.app = app
+        self.header = settings.PROFILING_HEADER.lower().encode()
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.mode = settings.PROFILING_MODE
+        self.interval = settings.PROFILING_INTERVAL_MS / 1000
+        self.directory = settings.PROFILING_DIR
+        self._busy = False
+
+    def _wanted(self, scope: dict) -> bool:
+        for name, value in scope["headers"]:
+            if name == self.header:
+                return value.lower() in (b"1", b"true", b"yes")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or self._busy or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self._busy = True
+        if self.mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), self.interval)
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.mode == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+            self._busy = False
+            await asyncio.to_thread(self._write, profiler, scope, status, elapsed)
+
+    def _write(self, profiler, scope: dict, status: int, elapsed: float) -> None:
+        route = route_name(scope)
+        os.makedirs(self.directory, exist_ok=True)
+        name = "{}-{}-{}-{:.0f}ms".format(
+            datetime.now().strftime("%Y%m%dT%H%M%S%f"), scope["method"], _slug(route), elapsed * 1000
+        )
+        base = os.path.join(self.directory, name)
+        if self.mode == "cprofile":
+            # .prof do pstats: snakeviz, flameprof ou "python -m pstats"
+            profiler.dump_stats(base + ".prof")
+            profile = base + ".prof"
+        else:
+            with open(base + ".folded", "w") as file:
+                file.write(profiler.folded())
+            profile = base + ".folded"
+        with open(base + ".json", "w") as file:
+            json.dump({
+                "method": scope["method"],
+                "route": route,
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "mode": self.mode,
+                "profile": os.path.basename(profile),
+            }, file, indent=2)
+        logger.info("Perfil de %s %s (%.1f ms) gravado em %s", scope["method"], route, elapsed * 1000, profile)
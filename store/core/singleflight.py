@@ -0,0 +1,59 @@
+# store\core\singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+from store.core.deadline import detached, within_deadline
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas idênticas em andamento: enquanto a primeira chamada de uma
+    chave não termina, as seguintes aguardam o mesmo resultado em vez de
+    disparar outra consulta.
+
+    A chamada roda em uma task própria, então o cancelamento de quem a iniciou
+    (cliente que desconectou) não derruba quem está esperando; só quando todos
+    os que esperavam desistem ela é cancelada, para não ocupar o banco à toa.
+    Pelo mesmo motivo ela não herda o prazo de quem a iniciou (ver
+    deadline.detached): cada chamada espera só até o próprio prazo.
+    Nada é guardado depois que a chamada termina: não é um cache.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Task] = {}
+        self._waiting: dict[asyncio.Task, int] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = detached(fn)
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+        self._waiting[task] = self._waiting.get(task, 0) + 1
+        try:
+            return await within_deadline(asyncio.shield(task))
+        finally:
+            self._waiting[task] -= 1
+            if not self._waiting[task]:
+                del self._waiting[task]
+                task.cancel()  # Sem efeito se já terminou
+
+    def forget(self, key: Hashable) -> None:
+        """Faz a próxima chamada da chave ir ao banco, mesmo com outra em andamento."""
+        self._calls.pop(key, None)
+
+    def forget_all(self) -> None:
+        self._calls.clear()
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Evita o aviso de exceção não lida quando ninguém mais espera
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
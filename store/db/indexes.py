@@ -0,0 +1,115 @@
+# store\db\indexes.py
+import argparse
+import asyncio
+import logging
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+from store.schemas.indexes import product_indexes, tombstone_indexes
+
+logger = logging.getLogger(__name__)
+
+# Código do Mongo para usuário sem o privilégio pedido (listIndexes, createIndex, indexStats)
+UNAUTHORIZED = 13
+
+
+class IndexReport(BaseModel):
+    created: list[str] = Field(default_factory=list, description="Declared indexes created now")
+    missing: list[str] = Field(default_factory=list, description="Declared indexes absent (check only)")
+    divergent: list[str] = Field(default_factory=list, description="Same name, different keys/options")
+    undeclared: list[str] = Field(default_factory=list, description="Indexes in the database but not in the registry")
+    unused: list[str] = Field(default_factory=list, description="Indexes with zero ops in $indexStats")
+
+
+def _same_spec(declared: IndexModel, existing: dict) -> bool:
+    spec = declared.document
+    return (
+        list(spec["key"].items()) == list(existing["key"])
+        and spec.get("unique", False) == existing.get("unique", False)
+        and spec.get("expireAfterSeconds") == existing.get("expireAfterSeconds")
+    )
+
+
+async def sync_indexes(collection, indexes: list[IndexModel] = None, check_only: bool = False) -> IndexReport:
+    """
+    Compara os índices declarados com os existentes e cria os que faltam.
+
+    É idempotente: índices já presentes com a mesma definição não são tocados.
+    Índices divergentes ou não declarados são apenas reportados, nunca removidos.
+    """
+    declared = {index.document["name"]: index for index in (indexes or product_indexes())}
+    existing = await collection.index_information()
+    report = IndexReport()
+
+    for name, index in declared.items():
+        if name not in existing:
+            report.missing.append(name)
+        elif not _same_spec(index, existing[name]):
+            report.divergent.append(name)
+    report.undeclared = [name for name in existing if name != "_id_" and name not in declared]
+
+    if report.missing and not check_only:
+        await collection.create_indexes([declared[name] for name in report.missing])
+        report.created, report.missing = report.missing, []
+
+    try:
+        async for stats in collection.aggregate([{"$indexStats": {}}]):
+            if stats["name"] != "_id_" and stats["accesses"]["ops"] == 0:
+                report.unused.append(stats["name"])
+    except OperationFailure as error:
+        if error.code != UNAUTHORIZED:
+            raise
+        # $indexStats pede clusterMonitor; sem ele só não há relatório de índices sem uso
+        logger.warning("Sem permissão para $indexStats em %s: %s", collection.name, error)
+
+    return report
+
+
+async def _sync_all(check_only: bool = False) -> dict[str, IndexReport]:
+    from store.db.mongo import TOMBSTONES, db_client
+
+    try:
+        return {
+            "products": await sync_indexes(db_client.collection("products"), check_only=check_only),
+            TOMBSTONES: await sync_indexes(
+                db_client.collection(TOMBSTONES), tombstone_indexes(), check_only=check_only
+            ),
+        }
+    finally:
+        db_client.close()
+
+
+async def sync_startup_indexes() -> None:
+    """
+    Sync de SYNC_INDEXES_ON_STARTUP: roda uma vez, no processo principal do
+    python -m store.serve, antes de subir os workers. Usuário sem permissão
+    para listar/criar índices só gera um aviso; a aplicação sobe mesmo assim
+    e os índices ficam para o "make indexes" com um usuário administrativo.
+    """
+    try:
+        reports = await _sync_all()
+    except OperationFailure as error:
+        if error.code != UNAUTHORIZED:
+            raise
+        logger.warning("Sem permissão para sincronizar os índices (rode 'make indexes'): %s", error)
+        return
+    for name, report in reports.items():
+        if report.created:
+            logger.info("Índices criados em %s: %s", name, report.created)
+        if report.divergent or report.undeclared or report.unused:
+            logger.warning(
+                "Drift de índices em %s - divergentes: %s, não declarados: %s, sem uso: %s",
+                name, report.divergent, report.undeclared, report.unused
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sincroniza os índices da collection products")
+    parser.add_argument("--check", action="store_true", help="Só reporta, não cria nada")
+    args = parser.parse_args()
+
+    reports = asyncio.run(_sync_all(args.check))
+    for name, report in reports.items():
+        print(f"{name}: {report.model_dump_json(indent=2)}")
+    # Código de saída 1 quando há drift, para uso em CI
+    raise SystemExit(1 if any(r.missing or r.divergent for r in reports.values()) else 0)
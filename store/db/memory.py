@@ -0,0 +1,288 @@
+# store\db\memory.py
+from __future__ import annotations
+import copy
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import AsyncIterator, Iterator
+from bson import ObjectId
+from store.core.config import get_settings
+from store.db.repository import VERSION, ProductRepository, WriteOp, is_price_sorted, now
+
+# Campos guardados em posição fixa na tupla de cada produto; o status fica em
+# um dict à parte e qualquer outro campo vai para um dict de extras (normalmente vazio).
+FIELDS = ("name", "quantity", "price_cents", "created_at", "updated_at", "version")
+QUANTITY = FIELDS.index("quantity")
+PRICE = FIELDS.index("price_cents")
+UPDATED_AT = FIELDS.index("updated_at")
+_VERSION = FIELDS.index(VERSION)
+
+
+class InMemoryProductRepository(ProductRepository):
+    """
+    Motor em processo para catálogos pequenos (réplicas de leitura na borda,
+    testes herméticos e benchmarks).
+
+    - Cada produto é uma tupla (FIELDS..., extras) indexada por _id.
+    - status fica em um dict por _id; as contagens por status saem do
+      tamanho dos índices abaixo, sem percorrer nada.
+    - Índices ordenados por status: _id e (price_cents, _id). Uma listagem localiza
+      o início e o fim da faixa com busca binária, O(log n), e depois só
+      percorre o que vai devolver. Sem filtro de status, as duas faixas são
+      intercaladas (heapq.merge) sem materializar nada.
+    - Feed de alterações: (updated_at, _id) de todos os produtos e
+      (deleted_at, _id) das lápides, também ordenados.
+    """
+
+    def __init__(self) -> None:
+        self._rows: dict[ObjectId, tuple] = {}
+        self._statuses: dict[ObjectId, bool] = {}
+        self._ids: dict[bool, list[ObjectId]] = {True: [], False: []}
+        self._prices: dict[bool, list[tuple]] = {True: [], False: []}
+        self._updated: list[tuple] = []
+        self._tombstones: list[tuple] = []
+        self._summary: dict | None = None
+        self._epoch = ObjectId()
+        self._writes = 0  # Versão das listagens; ver list_version
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def count(self, status: bool = None) -> int:
+        if status is None:
+            return len(self._rows)
+        return len(self._ids[bool(status)])
+
+    # --- armazenamento -----------------------------------------------------
+
+    def _status(self, id: ObjectId) -> bool:
+        return self._statuses[id]
+
+    def _document(self, id: ObjectId) -> dict:
+        row = self._rows[id]
+        document = {"_id": id, **dict(zip(FIELDS, row)), "status": self._status(id)}
+        if row[_VERSION] is None:
+            del document[VERSION]  # Como no Mongo: documento antigo, sem o campo
+        if row[-1]:
+            document.update(row[-1])
+        return document
+
+    def _store(self, document: dict) -> None:
+        id = document["_id"]
+        status = bool(document.get("status"))
+        extras = {k: v for k, v in document.items() if k not in FIELDS and k not in ("_id", "status")}
+        row = tuple(document.get(field) for field in FIELDS) + (extras or None,)
+        self._rows[id] = row
+        self._statuses[id] = status
+
+        insort(self._ids[status], id)
+        insort(self._prices[status], (row[PRICE], id))
+        if row[UPDATED_AT] is not None:
+            insort(self._updated, (row[UPDATED_AT], id))
+        self._writes += 1
+
+    def _unindex(self, id: ObjectId) -> None:
+        status = self._status(id)
+        price = self._rows[id][PRICE]
+        ids = self._ids[status]
+        del ids[bisect_left(ids, id)]
+        prices = self._prices[status]
+        del prices[bisect_left(prices, (price, id))]
+        updated_at = self._rows[id][UPDATED_AT]
+        if updated_at is not None:
+            del self._updated[bisect_left(self._updated, (updated_at, id))]
+
+    @staticmethod
+    def _project(document: dict, projection: dict | None) -> dict:
+        """Aplica uma projeção de inclusão no formato do Mongo."""
+        if not projection:
+            return document
+        keep = {key for key, value in projection.items() if value}
+        if projection.get("_id", 1):
+            keep.add("_id")
+        return {key: value for key, value in document.items() if key in keep}
+
+    # --- consultas ---------------------------------------------------------
+
+    def _range(self, status: bool, min_price, max_price, after: tuple, by_price: bool) -> Iterator[tuple]:
+        """Chaves de ordenação da faixa pedida em um status, em ordem crescente."""
+        if by_price:
+            keys = self._prices[status]
+            start = 0 if min_price is None else bisect_left(keys, min_price, key=lambda k: k[0])
+            end = len(keys) if max_price is None else bisect_right(keys, max_price, key=lambda k: k[0])
+            if after is not None:
+                start = max(start, bisect_right(keys, tuple(after)))
+            return (keys[i] for i in range(start, end))
+        keys = self._ids[status]
+        start = 0 if after is None else bisect_right(keys, after[0])
+        return ((keys[i],) for i in range(start, len(keys)))
+
+    def _matching(self, min_price, max_price, status, after=None) -> Iterator[ObjectId]:
+        by_price = is_price_sorted(min_price, max_price)
+        statuses = (True, False) if status is None else (status,)
+        ranges = [self._range(s, min_price, max_price, after, by_price) for s in statuses]
+        keys = ranges[0] if len(ranges) == 1 else heapq.merge(*ranges)
+        return (key[-1] for key in keys)
+
+    # --- interface ---------------------------------------------------------
+
+    async def insert(self, document: dict) -> None:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._rows:
+            raise KeyError(f"duplicate key: {document['_id']}")
+        self._store(document)
+
+    async def get(self, id: ObjectId, projection: dict = None) -> dict | None:
+        return self._project(self._document(id), projection) if id in self._rows else None
+
+    async def get_many(self, ids: list[ObjectId], projection: dict = None) -> list[dict]:
+        return [self._project(self._document(id), projection) for id in dict.fromkeys(ids) if id in self._rows]
+
+    def _version_matches(self, id: ObjectId, expected_version: int | None) -> bool:
+        if id not in self._rows:
+            return False
+        return expected_version is None or (self._rows[id][_VERSION] or 0) == expected_version
+
+    async def update(
+        self, id: ObjectId, fields: dict, expected_version: int = None, return_before: bool = False
+    ) -> dict | None:
+        if not self._version_matches(id, expected_version):
+            return None
+        document = self._document(id)
+        before = dict(document)
+        self._unindex(id)
+        document.update(fields)
+        document[VERSION] = document.get(VERSION, 0) + 1
+        self._store(document)
+        return before if return_before else self._document(id)
+
+    async def reserve(self, id: ObjectId, quantity: int, updated_at: datetime) -> dict | None:
+        # Sem await entre a checagem e a escrita: atômico no event loop
+        if id not in self._rows or (self._rows[id][QUANTITY] or 0) < quantity:
+            return None
+        return await self.update(id, {"quantity": self._rows[id][QUANTITY] - quantity, "updated_at": updated_at})
+
+    async def release(self, id: ObjectId, quantity: int, updated_at: datetime) -> dict | None:
+        if id not in self._rows:
+            return None
+        return await self.update(id, {"quantity": (self._rows[id][QUANTITY] or 0) + quantity, "updated_at": updated_at})
+
+    async def delete(self, id: ObjectId, expected_version: int = None, return_before: bool = False) -> bool | dict | None:
+        if not self._version_matches(id, expected_version):
+            return None if return_before else False
+        before = self._document(id)
+        self._unindex(id)
+        del self._statuses[id]
+        del self._rows[id]
+        self._writes += 1
+        insort(self._tombstones, (now(), id))
+        # Equivalente ao índice TTL das lápides no Mongo
+        horizon = now() - timedelta(days=get_settings().TOMBSTONE_RETENTION_DAYS)
+        del self._tombstones[:bisect_left(self._tombstones, (horizon,))]
+        return before if return_before else True
+
+    async def changes(self, after: tuple = None, until: datetime = None, limit: int = None) -> list[dict]:
+        def window(keys: list[tuple]) -> Iterator[tuple]:
+            start = 0 if after is None else bisect_right(keys, tuple(after))
+            end = len(keys) if until is None else bisect_right(keys, until, key=lambda k: k[0])
+            return (keys[i] + (keys is self._tombstones,) for i in range(start, end))
+
+        changes = []
+        for at, id, deleted in islice(heapq.merge(window(self._updated), window(self._tombstones)), limit):
+            changes.append({"_id": id, "deleted_at": at} if deleted else self._document(id))
+        return changes
+
+    async def list_version(self) -> tuple:
+        return (self._epoch, self._writes)
+
+    async def stats(self, boundaries: tuple[int, ...]) -> dict[bool, dict]:
+        result = {}
+        for status in (True, False):
+            prices = self._prices[status]
+            buckets = []
+            # Contagem por faixa com busca binária no índice (price_cents, _id)
+            for low, high in zip(boundaries, boundaries[1:]):
+                buckets.append(
+                    bisect_left(prices, high, key=lambda k: k[0]) - bisect_left(prices, low, key=lambda k: k[0])
+                )
+            buckets.append(len(prices) - sum(buckets))
+            units = value = 0
+            for _, id in prices:
+                row = self._rows[id]
+                units += row[QUANTITY] or 0
+                value += (row[QUANTITY] or 0) * (row[PRICE] or 0)
+            result[status] = {
+                "count": len(prices), "units": units, "value_cents": value,
+                "min_cents": prices[0][0] if prices else None,
+                "max_cents": prices[-1][0] if prices else None,
+                "buckets": buckets,
+            }
+        return result
+
+    async def load_summary(self) -> dict | None:
+        return copy.deepcopy(self._summary)
+
+    async def save_summary(self, summary: dict | None) -> None:
+        self._summary = copy.deepcopy(summary)
+
+    async def inc_summary(self, increments: dict[str, int]) -> None:
+        if self._summary is None:
+            return
+        for path, amount in increments.items():
+            # Caminhos no formato do $inc: "true.count", "true.buckets.3"
+            *parents, last = path.split(".")
+            target = self._summary
+            for key in parents:
+                target = target[int(key)] if isinstance(target, list) else target[key]
+            key = int(last) if isinstance(target, list) else last
+            target[key] += amount
+
+    async def price_bounds(self, status: bool = None) -> tuple[int | None, int | None]:
+        statuses = (True, False) if status is None else (status,)
+        ends = [(prices[0][0], prices[-1][0]) for prices in (self._prices[s] for s in statuses) if prices]
+        if not ends:
+            return (None, None)
+        return (min(low for low, _ in ends), max(high for _, high in ends))
+
+    async def list(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        after: tuple = None,
+        limit: int = None,
+        projection: dict = None,
+    ) -> list[dict]:
+        ids = islice(self._matching(min_price, max_price, status, after), limit)
+        return [self._project(self._document(id), projection) for id in ids]
+
+    async def iterate(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        batch_size: int = None,
+    ) -> AsyncIterator[dict]:
+        for id in list(self._matching(min_price, max_price, status)):
+            if id in self._rows:  # Pode ter sido removido durante a iteração
+                yield self._document(id)
+
+    async def existing_ids(self, ids: list[ObjectId]) -> set[ObjectId]:
+        return {id for id in ids if id in self._rows}
+
+    async def bulk_write(self, operations: list[WriteOp], ordered: bool = True) -> dict[int, str]:
+        errors = {}
+        for position, operation in enumerate(operations):
+            try:
+                if operation[0] == "insert":
+                    await self.insert(operation[1])
+                elif operation[0] == "update":
+                    await self.update(operation[1], operation[2])
+                else:
+                    await self.delete(operation[1])
+            except KeyError as e:
+                errors[position] = str(e.args[0])
+                if ordered:
+                    break
+        return errors
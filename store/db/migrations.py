@@ -0,0 +1,164 @@
+# store\db\migrations.py
+import argparse
+import asyncio
+from decimal import InvalidOperation
+from pydantic import BaseModel, Field
+from pymongo import UpdateOne
+from store.db.mongo import STATS, WRITES_ID, count_write
+from store.schemas.base import to_cents
+
+# Documentos ainda com o preço no formato antigo (double ou Decimal128 em "price")
+LEGACY_PRICE = {"price": {"$exists": True}}
+# Documentos gravados antes de created_at/updated_at serem persistidos
+MISSING_TIMESTAMPS = {"updated_at": {"$exists": False}}
+
+
+class MigrationReport(BaseModel):
+    scanned: int = Field(0, description="Legacy documents read")
+    migrated: int = Field(0, description="Documents rewritten")
+    skipped: int = Field(0, description="Documents changed concurrently; picked up by the next run")
+    invalid: list[str] = Field(default_factory=list, description="Ids whose price could not be converted")
+    remaining: int = Field(0, description="Legacy documents left after the run")
+
+
+def _price_update(document: dict) -> UpdateOne:
+    if "price_cents" in document:
+        # A aplicação já regravou o preço em centavos: só sobra o campo antigo
+        return UpdateOne({"_id": document["_id"]}, {"$unset": {"price": ""}})
+    # Só converte se a aplicação não gravou price_cents entre a leitura e a escrita
+    return UpdateOne(
+        {"_id": document["_id"], "price_cents": {"$exists": False}},
+        {"$set": {"price_cents": to_cents(document["price"])}, "$unset": {"price": ""}},
+    )
+
+
+async def _migrate(
+    collection,
+    legacy: dict,
+    projection: dict,
+    to_update,
+    batch_size: int,
+    pause: float,
+    check_only: bool,
+    stats=None,
+) -> MigrationReport:
+    """
+    Percorre os documentos que casam com "legacy" por _id, um lote por
+    bulk_write. "to_update" monta o UpdateOne de cada documento e deve
+    repetir a condição no filtro, para não sobrescrever escritas feitas pela
+    aplicação entre a leitura e a escrita.
+
+    Com "stats", cada lote que alterou documentos conta uma escrita, como as
+    da aplicação: muda a versão das listagens e os ETags já entregues.
+    """
+    report = MigrationReport()
+    last_id = None
+    while not check_only:
+        query = legacy if last_id is None else {**legacy, "_id": {"$gt": last_id}}
+        cursor = collection.find(query, projection).sort("_id", 1).limit(batch_size)
+        batch = await cursor.to_list(length=batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        report.scanned += len(batch)
+
+        operations = []
+        for document in batch:
+            try:
+                operations.append(to_update(document))
+            except (InvalidOperation, ValueError, TypeError):
+                report.invalid.append(str(document["_id"]))
+        if operations:
+            result = await collection.bulk_write(operations, ordered=False)
+            report.migrated += result.modified_count
+            report.skipped += len(operations) - result.modified_count
+            if result.modified_count and stats is not None:
+                await stats.update_one({"_id": WRITES_ID}, count_write(), upsert=True)
+        if pause:
+            await asyncio.sleep(pause)  # Alivia o banco entre lotes
+
+    report.remaining = await collection.count_documents(legacy)
+    return report
+
+
+async def migrate_prices(
+    collection,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    check_only: bool = False,
+) -> MigrationReport:
+    """
+    Converte "price" (double/Decimal128) para "price_cents" (inteiro) em lotes.
+
+    Roda com a aplicação no ar: cada update só vale se o documento ainda não
+    tiver price_cents. É idempotente; documentos pulados ou que falharam
+    ficam com "price" e são retomados em uma nova execução.
+    """
+    return await _migrate(
+        collection, LEGACY_PRICE, {"price": 1, "price_cents": 1}, _price_update,
+        batch_size, pause, check_only
+    )
+
+
+def _timestamps_update(document: dict) -> UpdateOne:
+    # Sem created_at, a melhor estimativa é o instante embutido no ObjectId
+    created_at = document.get("created_at")
+    if created_at is None:
+        created_at = document["_id"].generation_time.astimezone().replace(tzinfo=None)
+    return UpdateOne(
+        {"_id": document["_id"], **MISSING_TIMESTAMPS},
+        {"$set": {"created_at": created_at, "updated_at": created_at}, "$inc": {"version": 1}},
+    )
+
+
+async def backfill_timestamps(
+    collection,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    check_only: bool = False,
+    stats=None,
+) -> MigrationReport:
+    """
+    Grava created_at/updated_at em documentos antigos que não os têm, para
+    que entrem no feed /products/changes (que filtra e ordena por updated_at).
+
+    As datas aparecem nas respostas: cada documento ganha versão nova e cada
+    lote conta uma escrita em "stats" (por padrão product_stats do mesmo
+    banco), para que ETags de itens e de listagens mudem.
+    """
+    if stats is None:
+        stats = collection.database[STATS]
+    return await _migrate(
+        collection, MISSING_TIMESTAMPS, {"created_at": 1}, _timestamps_update,
+        batch_size, pause, check_only, stats
+    )
+
+
+MIGRATIONS = {"prices": migrate_prices, "timestamps": backfill_timestamps}
+
+
+async def _main(name: str, batch_size: int, pause: float, check_only: bool) -> MigrationReport:
+    from store.db.mongo import db_client
+
+    try:
+        return await MIGRATIONS[name](
+            db_client.collection("products"), batch_size, pause, check_only
+        )
+    finally:
+        db_client.close()
+
+
+if __name__ == "__main__":
+    from store.core.config import get_settings
+
+    parser = argparse.ArgumentParser(description="Migrações em lote da collection products")
+    parser.add_argument("migration", nargs="?", choices=sorted(MIGRATIONS), default="prices")
+    parser.add_argument("--batch-size", type=int, default=get_settings().BULK_CHUNK_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0, help="Segundos de espera entre lotes")
+    parser.add_argument("--check", action="store_true", help="Só conta os documentos pendentes")
+    args = parser.parse_args()
+
+    report = asyncio.run(_main(args.migration, args.batch_size, args.pause, args.check))
+    print(report.model_dump_json(indent=2))
+    # Código de saída 1 enquanto houver documentos no formato antigo
+    raise SystemExit(1 if report.remaining else 0)
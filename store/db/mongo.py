@@ -1,12 +1,421 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-from store.core.config import settings
+from __future__ import annotations
+import asyncio
+import heapq
+import os
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from store.core.config import get_settings
+from store.db.monitoring import event_listeners, slow_queries
+from store.db.repository import STATS_FIELDS, VERSION, ProductRepository, WriteOp, is_price_sorted, now
+
+TOMBSTONES = "product_tombstones"
+STATS = "product_stats"
+SUMMARY_ID = "summary"
+WRITES_ID = "writes"  # Contador de escritas em STATS: a versão das listagens
+DUPLICATE_KEY = 11000
+
+
+def count_write() -> dict:
+    """
+    Update do contador de escritas. "epoch" nasce com o documento: se ele
+    for apagado, a contagem recomeça sem repetir ETags já entregues.
+    """
+    return {"$inc": {"count": 1}, "$setOnInsert": {"epoch": ObjectId()}}
+
+
+def client_options() -> dict:
+    """Opções de pool comuns aos clientes assíncrono (Motor) e síncrono (PyMongo)."""
+    settings = get_settings()
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+    }
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.METRICS_ENABLED:
+        options["event_listeners"] = event_listeners()
+    return options
 
 
 class MongoClient:
+    """
+    Dono do AsyncIOMotorClient do processo.
+
+    O cliente só é criado no primeiro uso (ou no connect() do lifespan), nunca
+    no import, e é recriado se o processo atual não for o que o criou: um
+    cliente herdado de um fork não pode ser reaproveitado.
+    """
+
     def __init__(self) -> None:
-        self.client: AsyncIOMotorClient = AsyncIOMotorClient(settings.DATABASE_URL)
+        self.client: AsyncIOMotorClient | None = None
+        self._pid: int | None = None
+        self._collections: dict[str, AsyncIOMotorCollection] = {}
 
-    def get(self) -> AsyncIOMotorClient:
+    def connect(self) -> AsyncIOMotorClient:
+        if self.client is None or self._pid != os.getpid():
+            self.client = AsyncIOMotorClient(get_settings().DATABASE_URL, **client_options())
+            self._pid = os.getpid()
+            self._collections = {}
+            # O explain do log de consultas lentas usa o cliente síncrono por baixo do Motor
+            slow_queries.client = getattr(self.client, "delegate", None)
         return self.client
-    
-db_client = MongoClient()
\ No newline at end of file
+
+    def get(self) -> AsyncIOMotorClient:
+        return self.connect()
+
+    def collection(self, name: str) -> AsyncIOMotorCollection:
+        client = self.connect()
+        if name not in self._collections:
+            self._collections[name] = client.get_database().get_collection(name)
+        return self._collections[name]
+
+    async def warm_up(self) -> None:
+        """Pings simultâneos para abrir o pool mínimo antes da primeira requisição."""
+        client = self.connect()
+        await asyncio.gather(
+            *(client.admin.command("ping") for _ in range(max(1, get_settings().MONGO_MIN_POOL_SIZE)))
+        )
+
+    def close(self) -> None:
+        if self.client is not None and self._pid == os.getpid():
+            self.client.close()
+        slow_queries.client = None
+        self.client = None
+        self._pid = None
+        self._collections = {}
+
+db_client = MongoClient()
+
+
+async def to_list(cursor, length: int = None) -> list[dict]:
+    """
+    cursor.to_list() que fecha o cursor no servidor se a leitura falhar ou
+    for cancelada (cliente desconectou, ver DeadlineMiddleware), em vez de
+    deixá-lo aberto até o timeout de cursores ociosos.
+    """
+    try:
+        return await cursor.to_list(length=length)
+    except BaseException:
+        await cursor.close()
+        raise
+
+
+class MongoProductRepository(ProductRepository):
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection = None,
+        client: MongoClient = None,
+        tombstones: AsyncIOMotorCollection = None,
+        stats: AsyncIOMotorCollection = None,
+    ) -> None:
+        self._collection = collection
+        self._client = client or db_client
+        self._tombstones = tombstones
+        self._stats = stats
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        # Resolvida a cada uso: o cliente é criado no lifespan de cada worker
+        if self._collection is not None:
+            return self._collection
+        return self._client.collection("products")
+
+    @property
+    def tombstones(self) -> AsyncIOMotorCollection:
+        return self._sibling(self._tombstones, TOMBSTONES)
+
+    @property
+    def stats_collection(self) -> AsyncIOMotorCollection:
+        return self._sibling(self._stats, STATS)
+
+    def _sibling(self, injected: AsyncIOMotorCollection | None, name: str) -> AsyncIOMotorCollection:
+        """Collection auxiliar: a injetada, a do mesmo banco da collection injetada ou a do cliente."""
+        if injected is not None:
+            return injected
+        if self._collection is not None:
+            return self._collection.database.get_collection(name)
+        return self._client.collection(name)
+
+    @staticmethod
+    def build_query(min_price: float = None, max_price: float = None, status: bool = None) -> dict:
+        query = {}
+        
+        if min_price is not None or max_price is not None:
+            query["price_cents"] = {}
+            if min_price is not None:
+                query["price_cents"]["$gte"] = min_price
+            if max_price is not None:
+                query["price_cents"]["$lte"] = max_price
+        
+        if status is not None:
+            query["status"] = status
+        
+        return query
+
+    @staticmethod
+    def changed_query(field: str, after: tuple | None, until: datetime | None) -> dict:
+        """Keyset em (field, _id): depois de "after", até "until"."""
+        query = {}
+        if until is not None:
+            query[field] = {"$lte": until}
+        if after is not None:
+            last_at, last_id = after
+            query["$or"] = [
+                {field: {"$gt": last_at}},
+                {field: last_at, "_id": {"$gt": last_id}},
+            ]
+        return query
+
+    @staticmethod
+    def version_query(id: ObjectId, expected_version: int | None) -> dict:
+        query = {"_id": id}
+        if expected_version is not None:
+            # {"$in": [0, None]} também casa documentos sem o campo
+            query[VERSION] = expected_version or {"$in": [0, None]}
+        return query
+
+    @staticmethod
+    def after_query(after: tuple, by_price: bool) -> dict:
+        if not by_price:
+            return {"_id": {"$gt": after[0]}}
+        last_price, last_id = after
+        return {
+            "$or": [
+                {"price_cents": {"$gt": last_price}},
+                {"price_cents": last_price, "_id": {"$gt": last_id}},
+            ]
+        }
+
+    async def _count_write(self) -> None:
+        # Sempre depois da escrita: quem ler o contador novo já vê o documento gravado
+        await self.stats_collection.update_one({"_id": WRITES_ID}, count_write(), upsert=True)
+
+    async def insert(self, document: dict) -> None:
+        await self.collection.insert_one(document)
+        await self._count_write()
+
+    async def get(self, id: ObjectId, projection: dict = None) -> dict | None:
+        return await self.collection.find_one({"_id": id}, projection)
+
+    async def get_many(self, ids: list[ObjectId], projection: dict = None) -> list[dict]:
+        return await to_list(self.collection.find({"_id": {"$in": ids}}, projection))
+
+    async def update(
+        self, id: ObjectId, fields: dict, expected_version: int = None, return_before: bool = False
+    ) -> dict | None:
+        document = await self.collection.find_one_and_update(
+            self.version_query(id, expected_version),
+            {"$set": fields, "$inc": {VERSION: 1}},
+            return_document=ReturnDocument.BEFORE if return_before else ReturnDocument.AFTER
+        )
+        if document is not None:
+            await self._count_write()
+        return document
+
+    async def delete(self, id: ObjectId, expected_version: int = None, return_before: bool = False) -> bool | dict | None:
+        query = self.version_query(id, expected_version)
+        if return_before:
+            deleted = await self.collection.find_one_and_delete(query, projection=dict.fromkeys(STATS_FIELDS, 1))
+        else:
+            deleted = (await self.collection.delete_one(query)).deleted_count > 0
+        if deleted:
+            await self._bury([id])
+            await self._count_write()
+        return deleted
+
+    async def reserve(self, id: ObjectId, quantity: int, updated_at: datetime) -> dict | None:
+        # A condição e o $inc vão juntos: duas reservas nunca leem o mesmo estoque
+        return await self._add_quantity({"_id": id, "quantity": {"$gte": quantity}}, -quantity, updated_at)
+
+    async def release(self, id: ObjectId, quantity: int, updated_at: datetime) -> dict | None:
+        return await self._add_quantity({"_id": id}, quantity, updated_at)
+
+    async def _add_quantity(self, query: dict, amount: int, updated_at: datetime) -> dict | None:
+        document = await self.collection.find_one_and_update(
+            query,
+            {"$inc": {"quantity": amount, VERSION: 1}, "$set": {"updated_at": updated_at}},
+            projection=dict.fromkeys((*STATS_FIELDS, VERSION), 1),
+            return_document=ReturnDocument.AFTER
+        )
+        if document is not None:
+            await self._count_write()
+        return document
+
+    async def _bury(self, ids: list[ObjectId]) -> None:
+        """
+        Grava as lápides; upsert para que repetir a operação seja inofensivo.
+        Lotes vão em um único insert_many; só os ids que já tinham lápide
+        (raro) recebem um update avulso com a nova data.
+        """
+        deleted_at = now()
+        if len(ids) == 1:
+            await self.tombstones.update_one({"_id": ids[0]}, {"$set": {"deleted_at": deleted_at}}, upsert=True)
+            return
+        try:
+            await self.tombstones.insert_many([{"_id": id, "deleted_at": deleted_at} for id in ids], ordered=False)
+        except BulkWriteError as e:
+            if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                raise
+            await asyncio.gather(*(
+                self.tombstones.update_one({"_id": ids[error["index"]]}, {"$set": {"deleted_at": deleted_at}})
+                for error in e.details["writeErrors"]
+            ))
+
+    async def changes(self, after: tuple = None, until: datetime = None, limit: int = None) -> list[dict]:
+        # As duas consultas usam índices (updated_at, _id) e (deleted_at, _id)
+        products = self.collection.find(self.changed_query("updated_at", after, until))
+        products = products.sort([("updated_at", 1), ("_id", 1)])
+        tombstones = self.tombstones.find(self.changed_query("deleted_at", after, until))
+        tombstones = tombstones.sort([("deleted_at", 1), ("_id", 1)])
+        if limit is not None:
+            products, tombstones = products.limit(limit), tombstones.limit(limit)
+        products, tombstones = await asyncio.gather(to_list(products, limit), to_list(tombstones, limit))
+        merged = heapq.merge(
+            products, tombstones,
+            key=lambda d: (d.get("updated_at") or d["deleted_at"], d["_id"])
+        )
+        return list(islice(merged, limit))
+
+    async def list_version(self) -> tuple:
+        counter = await self.stats_collection.find_one({"_id": WRITES_ID})
+        return (counter["epoch"], counter["count"]) if counter else (None, 0)
+
+    @staticmethod
+    def stats_pipeline(boundaries: tuple[int, ...]) -> list[dict]:
+        """Totais por status e faixas de preço em um único $facet: uma passada pela collection."""
+        return [{"$facet": {
+            "totals": [{"$group": {
+                "_id": "$status",
+                "count": {"$sum": 1},
+                "units": {"$sum": "$quantity"},
+                "value_cents": {"$sum": {"$multiply": [
+                    {"$ifNull": ["$quantity", 0]}, {"$ifNull": ["$price_cents", 0]}
+                ]}},
+                "min_cents": {"$min": "$price_cents"},
+                "max_cents": {"$max": "$price_cents"},
+            }}],
+            "prices": [{"$bucket": {
+                "groupBy": "$price_cents",
+                "boundaries": list(boundaries),
+                "default": "other",
+                "output": {"count": {"$sum": 1}, "active": {"$sum": {"$cond": ["$status", 1, 0]}}},
+            }}],
+        }}]
+
+    async def stats(self, boundaries: tuple[int, ...]) -> dict[bool, dict]:
+        facets = await self.collection.aggregate(self.stats_pipeline(boundaries)).next()
+        result = {
+            status: {"count": 0, "units": 0, "value_cents": 0, "min_cents": None, "max_cents": None,
+                     "buckets": [0] * len(boundaries)}
+            for status in (True, False)
+        }
+        for group in facets["totals"]:
+            totals = result[bool(group["_id"])]  # Status ausente conta como inativo
+            totals["count"] += group["count"]
+            totals["units"] += group["units"]
+            totals["value_cents"] += group["value_cents"]
+            for key, pick in (("min_cents", min), ("max_cents", max)):
+                if group[key] is not None:
+                    totals[key] = group[key] if totals[key] is None else pick(totals[key], group[key])
+        for bucket in facets["prices"]:
+            # _id é o limite inferior da faixa, ou "other" para a última
+            index = len(boundaries) - 1 if bucket["_id"] == "other" else boundaries.index(bucket["_id"])
+            result[True]["buckets"][index] += bucket["active"]
+            result[False]["buckets"][index] += bucket["count"] - bucket["active"]
+        return result
+
+    async def load_summary(self) -> dict | None:
+        return await self.stats_collection.find_one({"_id": SUMMARY_ID})
+
+    async def save_summary(self, summary: dict | None) -> None:
+        if summary is None:
+            await self.stats_collection.delete_one({"_id": SUMMARY_ID})
+        else:
+            await self.stats_collection.replace_one({"_id": SUMMARY_ID}, summary, upsert=True)
+
+    async def inc_summary(self, increments: dict[str, int]) -> None:
+        await self.stats_collection.update_one({"_id": SUMMARY_ID}, {"$inc": increments})
+
+    async def price_bounds(self, status: bool = None) -> tuple[int | None, int | None]:
+        # Consultas cobertas pelos índices (status, price_cents, _id) e (price_cents, _id)
+        query = {"price_cents": {"$ne": None}}
+        if status is not None:
+            query["status"] = status
+        lowest, highest = await asyncio.gather(*(
+            self.collection.find_one(query, {"_id": 0, "price_cents": 1}, sort=[("price_cents", direction)])
+            for direction in (1, -1)
+        ))
+        return (lowest and lowest["price_cents"], highest and highest["price_cents"])
+
+    async def list(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        after: tuple = None,
+        limit: int = None,
+        projection: dict = None,
+    ) -> list[dict]:
+        query = self.build_query(min_price, max_price, status)
+        by_price = is_price_sorted(min_price, max_price)
+        if after is not None:
+            query = {"$and": [query, self.after_query(after, by_price)]}
+        sort = [("price_cents", 1), ("_id", 1)] if by_price else [("_id", 1)]
+        cursor = self.collection.find(query, projection).sort(sort)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return await to_list(cursor, limit)
+
+    async def iterate(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        batch_size: int = None,
+    ) -> AsyncIterator[dict]:
+        query = self.build_query(min_price, max_price, status)
+        cursor = self.collection.find(query, batch_size=batch_size or 0)
+        try:
+            async for document in cursor:
+                yield document
+        finally:
+            await cursor.close()
+
+    async def existing_ids(self, ids: list[ObjectId]) -> set[ObjectId]:
+        documents = await to_list(self.collection.find({"_id": {"$in": ids}}, {"_id": 1}))
+        return {doc["_id"] for doc in documents}
+
+    async def bulk_write(self, operations: list[WriteOp], ordered: bool = True) -> dict[int, str]:
+        requests = []
+        for operation in operations:
+            if operation[0] == "insert":
+                requests.append(InsertOne(operation[1]))
+            elif operation[0] == "update":
+                requests.append(UpdateOne({"_id": operation[1]}, {"$set": operation[2], "$inc": {VERSION: 1}}))
+            else:
+                requests.append(DeleteOne({"_id": operation[1]}))
+        errors = {}
+        try:
+            await self.collection.bulk_write(requests, ordered=ordered)
+        except BulkWriteError as e:
+            errors = {error["index"]: error["errmsg"] for error in e.details["writeErrors"]}
+        # No modo ordenado nada depois da primeira falha foi aplicado
+        applied = len(operations) if not (ordered and errors) else min(errors)
+        deleted = [
+            operation[1] for position, operation in enumerate(operations[:applied])
+            if operation[0] == "delete" and position not in errors
+        ]
+        if deleted:
+            await self._bury(deleted)
+        if any(position not in errors for position in range(applied)):
+            await self._count_write()
+        return errors
@@ -0,0 +1,172 @@
+# store\db\monitoring.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bson import json_util
+from pymongo import monitoring
+from store.core.config import get_settings
+from store.core.metrics import (
+    MONGO_COMMAND_LATENCY,
+    MONGO_POOL_CHECKED_OUT,
+    MONGO_POOL_CHECKOUT_FAILURES,
+    MONGO_POOL_CHECKOUT_WAIT,
+    MONGO_SLOW_COMMANDS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Comandos com filtro: os únicos que entram no log de consultas lentas
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Campos de sessão/transação que o driver injeta e o explain não aceita
+_SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern"}
+_MAX_FILTER_CHARS = 1000
+
+
+def command_filter(command: dict):
+    """O filtro do comando, no campo em que cada comando o leva."""
+    for key in ("filter", "query", "pipeline"):
+        if key in command:
+            return command[key]
+    for key in ("updates", "deletes"):
+        if key in command:
+            return [statement.get("q") for statement in command[key]]
+    return None
+
+
+def plan_summary(explain: dict) -> str:
+    """Estágios do plano vencedor, do mais externo ao mais interno: "FETCH <- IXSCAN(price_cents_id)"."""
+    if "stages" in explain:  # aggregate: o plano fica no primeiro estágio ($cursor)
+        explain = explain["stages"][0].get("$cursor", {})
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)  # Formato do motor SBE
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage += f"({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or next(iter(plan.get("inputStages", [])), None)
+    return " <- ".join(stages) or "?"
+
+
+class SlowQueryLog:
+    """
+    Loga os comandos acima de SLOW_QUERY_MS com o filtro e, se
+    SLOW_QUERY_EXPLAIN, o resumo do explain() (só queryPlanner: nada é
+    executado de novo).
+
+    O explain roda em uma thread própria, fora do caminho da requisição, e com
+    no máximo MAX_PENDING de uma vez, para que um pico de lentidão não vire
+    uma rajada de explains no banco.
+    """
+
+    MAX_PENDING = 2
+
+    def __init__(self) -> None:
+        self.client = None  # pymongo.MongoClient usado no explain; ver MongoClient.connect
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def record(self, command_name: str, database: str, command: dict, seconds: float) -> None:
+        MONGO_SLOW_COMMANDS.inc(command_name)
+        if not get_settings().SLOW_QUERY_EXPLAIN or self.client is None or not self._reserve():
+            self._log(command_name, database, command, seconds, plan=None)
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        self._executor.submit(self._explain_and_log, self.client, command_name, database, command, seconds)
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self._pending >= self.MAX_PENDING:
+                return False
+            self._pending += 1
+            return True
+
+    def _explain_and_log(self, client, command_name: str, database: str, command: dict, seconds: float) -> None:
+        explainable = {
+            key: value for key, value in command.items()
+            if not key.startswith("$") and key not in _SESSION_FIELDS
+        }
+        try:
+            explain = client[database].command({"explain": explainable, "verbosity": "queryPlanner"})
+            plan = plan_summary(explain)
+        except Exception as e:  # O log nunca pode derrubar nada
+            plan = f"explain falhou: {e}"
+        finally:
+            with self._lock:
+                self._pending -= 1
+        self._log(command_name, database, command, seconds, plan)
+
+    @staticmethod
+    def _log(command_name: str, database: str, command: dict, seconds: float, plan: str | None) -> None:
+        logger.warning(
+            "Consulta lenta: %s em %s.%s levou %.1f ms | filtro: %s | plano: %s",
+            command_name,
+            database,
+            command.get(command_name),
+            seconds * 1000,
+            json_util.dumps(command_filter(command))[:_MAX_FILTER_CHARS],
+            plan or "-",
+        )
+
+
+slow_queries = SlowQueryLog()
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Duração de cada comando por nome e resultado; os lentos vão para o SlowQueryLog."""
+
+    def __init__(self, slow_query_ms: int, slow_log: SlowQueryLog = slow_queries) -> None:
+        self.slow_seconds = slow_query_ms / 1000
+        self.slow_log = slow_log
+        # Comandos em andamento, só dos que podem entrar no log lento
+        self._started: dict[tuple, tuple[str, dict]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        if self.slow_seconds and event.command_name in EXPLAINABLE:
+            self._started[(event.connection_id, event.request_id)] = (event.database_name, event.command)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, "succeeded")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "failed")
+
+    def _finish(self, event, outcome: str) -> None:
+        started = self._started.pop((event.connection_id, event.request_id), None)
+        seconds = event.duration_micros / 1_000_000
+        MONGO_COMMAND_LATENCY.observe(seconds, event.command_name, outcome)
+        if started is not None and seconds >= self.slow_seconds:
+            self.slow_log.record(event.command_name, *started, seconds)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Espera por conexão (checkout) e conexões em uso."""
+
+    def connection_checked_out(self, event: monitoring.ConnectionCheckedOutEvent) -> None:
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration or 0.0)
+        MONGO_POOL_CHECKED_OUT.inc()
+
+    def connection_check_out_failed(self, event: monitoring.ConnectionCheckOutFailedEvent) -> None:
+        MONGO_POOL_CHECKOUT_WAIT.observe(event.duration or 0.0)
+        MONGO_POOL_CHECKOUT_FAILURES.inc(event.reason)
+
+    def connection_checked_in(self, event: monitoring.ConnectionCheckedInEvent) -> None:
+        MONGO_POOL_CHECKED_OUT.dec()
+
+    # Os demais eventos do pool não viram métrica
+    def pool_created(self, event) -> None: ...
+    def pool_ready(self, event) -> None: ...
+    def pool_cleared(self, event) -> None: ...
+    def pool_closed(self, event) -> None: ...
+    def connection_created(self, event) -> None: ...
+    def connection_ready(self, event) -> None: ...
+    def connection_closed(self, event) -> None: ...
+    def connection_check_out_started(self, event) -> None: ...
+
+
+def event_listeners() -> list:
+    """Listeners registrados em cada cliente (Motor e PyMongo) via client_options()."""
+    return [CommandMetrics(get_settings().SLOW_QUERY_MS), PoolMetrics()]
@@ -0,0 +1,178 @@
+# store\db\repository.py
+from __future__ import annotations  # O método list() esconde o builtin nas anotações
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import AsyncIterator
+from bson import ObjectId
+
+# Operações do bulk_write, independentes do driver:
+#   ("insert", documento) | ("update", _id, campos) | ("delete", _id)
+WriteOp = tuple
+
+# Toda escrita incrementa "version"; documentos sem o campo estão na versão 0
+VERSION = "version"
+# Campos que entram no /products/stats
+STATS_FIELDS = ("status", "quantity", "price_cents")
+
+
+def now() -> datetime:
+    """datetime.now() truncado em milissegundos, a precisão que o BSON guarda."""
+    current = datetime.now()
+    return current.replace(microsecond=current.microsecond // 1000 * 1000)
+
+
+def is_price_sorted(min_price: float = None, max_price: float = None) -> bool:
+    """Com filtro de preço a listagem é ordenada por (price_cents, _id); sem, por _id."""
+    return min_price is not None or max_price is not None
+
+
+class ProductRepository(ABC):
+    """
+    Acesso aos documentos de produto. Os usecases falam só com esta interface;
+    o motor (Mongo ou em memória) é escolhido por STORAGE_ENGINE.
+
+    Documentos são dicts no formato gravado no banco (com "_id"). O preço fica
+    em "price_cents" (inteiro) e os filtros min_price/max_price chegam em
+    centavos; a conversão de/para reais é feita nos schemas.
+    """
+
+    @abstractmethod
+    async def insert(self, document: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, id: ObjectId, projection: dict = None) -> dict | None:
+        """"projection" segue o formato do Mongo ({campo: 1}, com "_id": 0 opcional)."""
+
+    @abstractmethod
+    async def get_many(self, ids: list[ObjectId], projection: dict = None) -> list[dict]:
+        """
+        Documentos dos ids que existem, em uma única consulta ($in) e em
+        qualquer ordem. "projection" precisa manter o _id, que identifica cada um.
+        """
+
+    @abstractmethod
+    async def update(
+        self, id: ObjectId, fields: dict, expected_version: int = None, return_before: bool = False
+    ) -> dict | None:
+        """
+        Aplica os campos, incrementa "version" e devolve o documento já
+        atualizado (com "return_before", como era antes da escrita). None se
+        não existir ou, com "expected_version", se a versão gravada for outra
+        (controle otimista de concorrência).
+        """
+
+    @abstractmethod
+    async def delete(self, id: ObjectId, expected_version: int = None, return_before: bool = False) -> bool | dict | None:
+        """
+        Remove o produto e deixa uma lápide (_id, deleted_at) para o feed de
+        alterações. Com "return_before", devolve o documento removido (ao
+        menos STATS_FIELDS) ou None, em vez de True/False.
+        """
+
+    @abstractmethod
+    async def reserve(self, id: ObjectId, quantity: int, updated_at: datetime) -> dict | None:
+        """
+        Tira "quantity" do estoque em uma única operação atômica, só se houver
+        pelo menos isso disponível. Devolve o documento atualizado (ao menos
+        _id, STATS_FIELDS e "version") ou None se não houver estoque ou o produto não existir.
+        Incrementa "version", como update().
+        """
+
+    @abstractmethod
+    async def release(self, id: ObjectId, quantity: int, updated_at: datetime) -> dict | None:
+        """Devolve ao estoque unidades reservadas; compensa um lote que falhou pela metade."""
+
+    @abstractmethod
+    async def list(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        after: tuple = None,
+        limit: int = None,
+        projection: dict = None,
+    ) -> list[dict]:
+        """
+        Documentos filtrados, ordenados conforme is_price_sorted(). "after" é a
+        chave de ordenação do último item já entregue: (price_cents, _id) ou (_id,).
+        """
+
+    @abstractmethod
+    def iterate(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        batch_size: int = None,
+    ) -> AsyncIterator[dict]:
+        """Percorre os documentos filtrados sem materializá-los (ordem não definida)."""
+
+    @abstractmethod
+    async def changes(self, after: tuple = None, until: datetime = None, limit: int = None) -> list[dict]:
+        """
+        Produtos alterados e lápides em ordem de (updated_at, _id), depois da
+        chave "after" e até "until". Lápides vêm como {"_id", "deleted_at"},
+        com deleted_at no papel de updated_at.
+        """
+
+    @abstractmethod
+    async def list_version(self) -> tuple:
+        """
+        Versão das listagens: um contador que toda escrita incrementa depois
+        de gravar. Ao contrário do maior updated_at, muda mesmo quando uma
+        escrita confirma depois de outra com horário mais novo.
+        """
+
+    @abstractmethod
+    async def stats(self, boundaries: tuple[int, ...]) -> dict[bool, dict]:
+        """
+        Agregados por status em uma passada pelo catálogo: {status: {"count",
+        "units", "value_cents", "min_cents", "max_cents", "buckets"}}.
+        "buckets" tem len(boundaries) contagens: [b0, b1), ..., [bn-2, bn-1) e
+        a última, >= bn-1, que também recebe preços fora da faixa.
+        """
+
+    @abstractmethod
+    async def load_summary(self) -> dict | None:
+        """Resumo materializado do /products/stats, ou None se não houver."""
+
+    @abstractmethod
+    async def save_summary(self, summary: dict | None) -> None:
+        """Grava o resumo inteiro; None o remove (será recalculado na próxima leitura)."""
+
+    @abstractmethod
+    async def inc_summary(self, increments: dict[str, int]) -> None:
+        """
+        Soma os incrementos ({"true.count": 1, "true.buckets.3": 1, ...}) ao
+        resumo, atomicamente. Sem resumo gravado, não faz nada.
+        """
+
+    @abstractmethod
+    async def price_bounds(self, status: bool = None) -> tuple[int | None, int | None]:
+        """Menor e maior price_cents (do status pedido), lidos das pontas do índice."""
+
+    @abstractmethod
+    async def existing_ids(self, ids: list[ObjectId]) -> set[ObjectId]:
+        ...
+
+    @abstractmethod
+    async def bulk_write(self, operations: list[WriteOp], ordered: bool = True) -> dict[int, str]:
+        """
+        Executa as operações em uma ida ao banco. Devolve {posição: erro} das
+        que falharam; no modo ordenado nada depois da primeira falha é aplicado.
+        Os updates incrementam "version", como em update().
+        """
+
+
+def build_product_repository() -> ProductRepository:
+    """Cria o repositório configurado em STORAGE_ENGINE."""
+    from store.core.config import get_settings
+
+    if get_settings().STORAGE_ENGINE == "memory":
+        from store.db.memory import InMemoryProductRepository
+
+        return InMemoryProductRepository()
+    from store.db.mongo import MongoProductRepository
+
+    return MongoProductRepository()
@@ -1,13 +1,53 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from store.core.config import settings
+from store.core.admission import AdmissionMiddleware
+from store.core.config import get_settings
+from store.core.deadline import DeadlineMiddleware
+from store.core.metrics import MetricsMiddleware
+from store.core.profiling import ProfilingMiddleware
+from store.db.mongo import db_client
+from store.routers import api_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Roda em cada worker, depois do fork: cada processo tem seu próprio pool.
+    # O sync de índices não fica aqui: roda uma vez, no processo principal do store.serve
+    settings = get_settings()
+    if settings.STORAGE_ENGINE != "mongo":
+        yield
+        return
+    db_client.connect()
+    if settings.MONGO_WARMUP:
+        await db_client.warm_up()
+    try:
+        yield
+    finally:
+        db_client.close()
+
 
 class App(FastAPI):
     def __init__(self, *args, **kwargs) -> None:
+        settings = get_settings()
         super().__init__(
             *args,
             **kwargs, 
             version = "0.1.0",
             title=settings.PROJECT_NAME, #"Store API" (do config.py)
-            root_path=settings.ROOT_PATH) # "/" (define path base da API)
+            root_path=settings.ROOT_PATH, # "/" (define path base da API)
+            lifespan=lifespan)
+        # Adicionado primeiro, fica por dentro: métricas e profiling também veem os 503
+        if settings.ADMISSION_ENABLED:
+            self.add_middleware(AdmissionMiddleware)
+        # Por fora da admissão: o prazo conta a espera na fila e quem desconecta sai dela
+        self.add_middleware(DeadlineMiddleware)
+        if settings.METRICS_ENABLED:
+            from store.controllers.metrics import router as metrics_router
+
+            self.add_middleware(MetricsMiddleware)
+            self.include_router(metrics_router)
+        if settings.PROFILING_ENABLED:
+            self.add_middleware(ProfilingMiddleware)
 
-app = App()
\ No newline at end of file
+app = App()
+app.include_router(api_router)
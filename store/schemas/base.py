@@ -1,9 +1,64 @@
 from datetime import datetime
-from decimal import Decimal
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
 from bson import Decimal128
 from pydantic import UUID4, BaseModel, Field, model_validator
 
 
+# Campos Decimal são gravados em centavos, como inteiro, no campo "<nome>_cents"
+# (ex.: price -> price_cents). Um único tipo BSON mantém $gte/$lte e os índices
+# corretos, ao contrário da mistura de double e Decimal128.
+CENTS_SUFFIX = "_cents"
+_CENT = Decimal("0.01")
+
+
+def to_cents(value, rounding: str = ROUND_HALF_UP) -> int:
+    """Valor em reais (Decimal, Decimal128, float, int ou str) -> centavos."""
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    elif not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return int(value.quantize(_CENT, rounding=rounding).scaleb(2))
+
+
+def from_cents(cents: int) -> Decimal:
+    """Centavos -> Decimal com duas casas (1050 -> Decimal("10.50"))."""
+    return Decimal(cents).scaleb(-2)
+
+
+def to_storage(data: dict) -> dict:
+    """Troca os valores Decimal de um dump do modelo pelo campo em centavos."""
+    for key in [key for key, value in data.items() if isinstance(value, Decimal)]:
+        data[key + CENTS_SUFFIX] = to_cents(data.pop(key))
+    return data
+
+
+@lru_cache(maxsize=None)
+def _field_names(model: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(model.model_fields)
+
+
+@lru_cache(maxsize=None)
+def _decimal_fields(model: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(
+        name for name, field in model.model_fields.items() if field.annotation is Decimal
+    )
+
+
+@lru_cache(maxsize=None)
+def _defaults(model: type[BaseModel]) -> dict[str, object]:
+    """Valores padrão constantes (sem default_factory) dos campos opcionais."""
+    return {
+        name: field.default for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+
+@lru_cache(maxsize=None)
+def _cents_keys(model: type[BaseModel]) -> dict[str, str]:
+    return {name: name + CENTS_SUFFIX for name in _decimal_fields(model)}
+
+
 class BaseSchemaMixin(BaseModel):
     class Config:
         from_attributes = True
@@ -22,7 +77,52 @@ class BaseSchemaMixin(BaseModel):
 
 #         return data
 
-class OutSchema(BaseModel):
+class DocumentSchema(BaseModel):
+    """Modelos de saída montados a partir de documentos do banco."""
+
+    @classmethod
+    def from_document(cls, document: dict):
+        """
+        Caminho rápido para documentos lidos do próprio banco: faz as mesmas
+        conversões do set_schema e preenche a instância direto, como o
+        model_construct faz, mas sem o custo dele e sem validação.
+        Use só com dados confiáveis.
+        """
+        fields, decimal_fields, cents_keys = _field_names(cls), _decimal_fields(cls), _cents_keys(cls)
+        defaults = _defaults(cls)
+        data = {}
+        for name in fields:
+            cents_key = cents_keys.get(name)
+            if cents_key is not None and cents_key in document:
+                data[name] = from_cents(document[cents_key])
+            elif name in document:
+                data[name] = document[name]
+            elif name == "id" and "_id" in document:
+                data["id"] = str(document["_id"])
+            elif name in defaults:
+                data[name] = defaults[name]
+        if "created_at" in fields and "created_at" not in data:
+            data["created_at"] = datetime.now()
+        if "updated_at" in fields and "updated_at" not in data:
+            data["updated_at"] = data.get("created_at") or datetime.now()
+        # Formatos anteriores à migração para centavos
+        for key in decimal_fields:
+            value = data.get(key)
+            if isinstance(value, float):
+                data[key] = Decimal(repr(value))
+            elif isinstance(value, Decimal128):
+                data[key] = value.to_decimal()
+            elif isinstance(value, int) and not isinstance(value, bool):
+                data[key] = Decimal(value)
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, "__dict__", data)
+        object.__setattr__(instance, "__pydantic_fields_set__", set(data))
+        object.__setattr__(instance, "__pydantic_extra__", None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
+
+
+class OutSchema(DocumentSchema):
     id: str = Field()  # ← Altere de UUID4 para str
     created_at: datetime = Field()
     updated_at: datetime = Field()
@@ -36,8 +136,12 @@ class OutSchema(BaseModel):
             data["created_at"] = datetime.now()
         if "updated_at" not in data:
             data["updated_at"] = datetime.now()
-        # Conversão de Decimal128 (já existente)
+        # Campos em centavos voltam a ser Decimal
+        for key in [key for key in data if key.endswith(CENTS_SUFFIX)]:
+            if key[:-len(CENTS_SUFFIX)] in cls.model_fields:
+                data[key[:-len(CENTS_SUFFIX)]] = from_cents(data.pop(key))
+        # Conversão de Decimal128 (documentos ainda não migrados)
         for key, value in data.items():
             if isinstance(value, Decimal128):
                 data[key] = Decimal(str(value))
-        return data
\ No newline at end of file
+        return data
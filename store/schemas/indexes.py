@@ -0,0 +1,45 @@
+# store\schemas\indexes.py
+from pymongo import ASCENDING, IndexModel
+from store.core.config import get_settings
+
+
+def product_indexes() -> list[IndexModel]:
+    """
+    Índices declarados da collection products.
+
+    - status_price_cents_id: filtros de status + faixa de preço do list/list_sync,
+      já na ordem (price_cents, _id) da paginação
+    - price_cents_id: faixa de preço sem status e a mesma ordenação
+    Os dois terminam em _id para que ?fields=price (e afins) seja uma consulta
+    coberta pelo índice.
+    - updated_at_id: feed de alterações, em ordem de (updated_at, _id)
+    - name_unique: só quando PRODUCT_NAME_UNIQUE estiver ligado
+    """
+    indexes = [
+        IndexModel(
+            [("status", ASCENDING), ("price_cents", ASCENDING), ("_id", ASCENDING)],
+            name="status_price_cents_id",
+        ),
+        IndexModel([("price_cents", ASCENDING), ("_id", ASCENDING)], name="price_cents_id"),
+        IndexModel([("updated_at", ASCENDING), ("_id", ASCENDING)], name="updated_at_id"),
+    ]
+    if get_settings().PRODUCT_NAME_UNIQUE:
+        indexes.append(IndexModel([("name", ASCENDING)], name="name_unique", unique=True))
+    return indexes
+
+
+def tombstone_indexes() -> list[IndexModel]:
+    """
+    Índices da collection product_tombstones.
+
+    - deleted_at_id: lápides do feed de alterações, em ordem de (deleted_at, _id)
+    - deleted_at_ttl: remove as lápides depois de TOMBSTONE_RETENTION_DAYS
+    """
+    return [
+        IndexModel([("deleted_at", ASCENDING), ("_id", ASCENDING)], name="deleted_at_id"),
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="deleted_at_ttl",
+            expireAfterSeconds=get_settings().TOMBSTONE_RETENTION_DAYS * 86_400,
+        ),
+    ]
@@ -1,10 +1,11 @@
 # store\schemas\product.py
 
+from datetime import datetime
 from decimal import Decimal
-from typing import Annotated, Optional
-from bson import Decimal128
-from pydantic import AfterValidator, Field
-from store.schemas.base import BaseSchemaMixin, OutSchema
+from functools import lru_cache
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, create_model
+from store.schemas.base import BaseSchemaMixin, DocumentSchema, OutSchema
 
 
 class ProductBase(BaseSchemaMixin):
@@ -19,21 +20,147 @@ class ProductIn(ProductBase, BaseSchemaMixin):
 
 
 class ProductOut(ProductIn, OutSchema):
-    pass
-
-
-def convert_decimal_128(v):
-    return Decimal128(str(v))
-
-
-Decimal_ = Annotated[Decimal, AfterValidator(convert_decimal_128)]
+    # Documentos anteriores ao controle de versão não têm o campo: valem 0
+    version: int = Field(0, description="Incremented on every write; used in the ETag")
 
 
 class ProductUpdate(BaseSchemaMixin):
     quantity: Optional[int] = Field(None, description="Product quantity")
-    price: Optional[Decimal_] = Field(None, description="Product price")
+    price: Optional[Decimal] = Field(None, description="Product price")
     status: Optional[bool] = Field(None, description="Product status")
 
 
 class ProductUpdateOut(ProductOut):
-    ...
\ No newline at end of file
+    ...
+
+
+class ProductPage(BaseModel):
+    items: list[ProductOut] = Field(..., description="Products in this page")
+    next_cursor: Optional[str] = Field(
+        None, description="Opaque token for the next page (null on the last page)"
+    )
+
+
+class ProductLookup(ProductPage):
+    missing: list[str] = Field(
+        default_factory=list, description="Requested ids with no product (unknown or malformed)"
+    )
+
+
+# Campos aceitos em ?fields=, na ordem da resposta completa
+PRODUCT_FIELDS = tuple(ProductOut.model_fields)
+# Colunas da exportação em CSV (rota /products/export e python -m store.catalog)
+EXPORT_FIELDS = ["id", "name", "quantity", "price", "status", "created_at", "updated_at"]
+# Campo da resposta -> campo gravado no banco, quando diferem
+STORAGE_FIELDS = {"id": "_id", "price": "price_cents"}
+
+
+@lru_cache(maxsize=None)
+def sparse_product_models(fields: tuple[str, ...]) -> tuple[type[DocumentSchema], type[ProductPage]]:
+    """
+    Modelo de produto só com os campos pedidos e a página correspondente.
+    "fields" chega validado e na ordem de PRODUCT_FIELDS, então há no máximo
+    um par de modelos por combinação.
+    """
+    definitions = {
+        name: (ProductOut.model_fields[name].annotation, ProductOut.model_fields[name])
+        for name in fields
+    }
+    name = "ProductOut_" + "_".join(fields)
+    item = create_model(name, __base__=DocumentSchema, **definitions)
+    page = create_model(name + "_Page", __base__=ProductPage, items=(list[item], ...))
+    return item, page
+
+
+@lru_cache(maxsize=None)
+def sparse_lookup_model(fields: tuple[str, ...]) -> type[ProductLookup]:
+    """Resposta da busca por ids com o modelo reduzido de sparse_product_models()."""
+    item = sparse_product_models(fields)[0]
+    return create_model(item.__name__ + "_Lookup", __base__=ProductLookup, items=(list[item], ...))
+
+
+def product_projection(fields: tuple[str, ...], *required: str) -> dict:
+    """
+    Projeção do Mongo para os campos pedidos mais os exigidos pela consulta
+    (chaves do cursor). _id só vem quando necessário: sem ele, uma projeção
+    dentro de um índice vira consulta coberta, sem ler os documentos.
+    """
+    projection = dict.fromkeys([STORAGE_FIELDS.get(name, name) for name in fields], 1)
+    projection.update(dict.fromkeys(required, 1))
+    projection.setdefault("_id", 0)
+    return projection
+
+
+class ProductChange(BaseModel):
+    id: str = Field(..., description="Product id")
+    deleted: bool = Field(False, description="Whether the product was deleted")
+    updated_at: datetime = Field(..., description="When the change happened (deletion time for deletes)")
+    product: Optional[ProductOut] = Field(None, description="Current product (null for deletes)")
+
+
+class ProductChanges(BaseModel):
+    changes: list[ProductChange] = Field(..., description="Changes in updated_at order")
+    next_token: Optional[str] = Field(
+        None, description="Token to send as since on the next call (null while the feed is empty)"
+    )
+    has_more: bool = Field(..., description="Whether more changes are available right now")
+
+
+class ProductBulkUpdate(ProductUpdate):
+    id: str = Field(..., description="Product id")
+
+
+class BulkItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    id: Optional[str] = Field(None, description="Product id")
+    ok: bool = Field(..., description="Whether the operation was applied")
+    error: Optional[str] = Field(None, description="Error message when ok is false")
+
+
+class BulkResult(BaseModel):
+    succeeded: int = Field(..., description="Number of applied operations")
+    failed: int = Field(..., description="Number of rejected operations")
+    results: list[BulkItemResult] = Field(..., description="Per-item results in request order")
+
+
+class ReservationIn(BaseModel):
+    quantity: int = Field(..., gt=0, description="Units to take from stock")
+
+
+class ReservationItemIn(ReservationIn):
+    id: str = Field(..., description="Product id")
+
+
+class Reservation(BaseModel):
+    id: str = Field(..., description="Product id")
+    requested: int = Field(..., description="Units requested")
+    ok: bool = Field(..., description="Whether the units were reserved")
+    quantity: Optional[int] = Field(
+        None, description="Stock left after the reservation, or the stock available when it failed"
+    )
+    error: Optional[str] = Field(None, description="Error message when ok is false")
+
+
+class ReservationResult(BaseModel):
+    ok: bool = Field(..., description="Whether every item was reserved")
+    items: list[Reservation] = Field(..., description="Per-product results in request order")
+
+
+class PriceBucket(BaseModel):
+    min: Decimal = Field(..., description="Lower bound (inclusive)")
+    max: Optional[Decimal] = Field(None, description="Upper bound (exclusive); null for the last bucket")
+    count: int = Field(..., description="Products in the bucket")
+
+
+class ProductStats(BaseModel):
+    total: int = Field(..., description="Products matching the status filter")
+    active: int = Field(..., description="Active products (ignores the status filter)")
+    inactive: int = Field(..., description="Inactive products (ignores the status filter)")
+    units: int = Field(..., description="Units in stock")
+    stock_value: Decimal = Field(..., description="Sum of quantity * price")
+    min_price: Optional[Decimal] = Field(None, description="Lowest price (null without products)")
+    max_price: Optional[Decimal] = Field(None, description="Highest price (null without products)")
+    price_buckets: list[PriceBucket] = Field(..., description="Product count per price bucket")
+    source: Literal["aggregation", "summary"] = Field(
+        ..., description="$facet over the catalog or the materialized summary"
+    )
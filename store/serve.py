@@ -0,0 +1,109 @@
+# store\serve.py
+"""
+Ponto de entrada de produção: python -m store.serve [--workers N] [--server gunicorn]
+
+Cada worker importa a aplicação no próprio processo e roda o lifespan, então o
+cliente do Mongo, o pool de conexões e os caches são criados depois do fork,
+nunca herdados do processo principal.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from store.core.config import get_settings
+
+APP = "store.main:app"
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count(requested: int = 0) -> int:
+    return requested or get_settings().WORKERS or os.cpu_count() or 1
+
+
+def warn_cache_fallback(workers: int) -> None:
+    """
+    CACHE_BACKEND=lru é um cache por processo: com mais de um worker o
+    build_cache() o troca por NullCache. Avisa uma vez, aqui, antes de subir.
+    """
+    if workers > 1 and get_settings().CACHE_BACKEND == "lru":
+        logger.warning(
+            "CACHE_BACKEND=lru com %s workers: cache desligado em todos eles; "
+            "use CACHE_BACKEND=redis ou WORKERS=1", workers
+        )
+
+
+def sync_indexes_once() -> None:
+    """SYNC_INDEXES_ON_STARTUP: uma vez aqui, não em cada worker a cada boot."""
+    settings = get_settings()
+    if settings.STORAGE_ENGINE == "mongo" and settings.SYNC_INDEXES_ON_STARTUP:
+        from store.db.indexes import sync_startup_indexes
+
+        asyncio.run(sync_startup_indexes())
+
+
+def run_uvicorn(workers: int) -> None:
+    import uvicorn
+
+    settings = get_settings()
+    uvicorn.run(
+        APP,
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=workers,
+        limit_concurrency=settings.LIMIT_CONCURRENCY,
+        backlog=settings.BACKLOG,
+        timeout_keep_alive=settings.TIMEOUT_KEEP_ALIVE,
+        proxy_headers=True,
+    )
+
+
+def run_gunicorn(workers: int) -> None:
+    try:
+        from gunicorn.app.base import BaseApplication
+        from uvicorn.workers import UvicornWorker
+    except ImportError as e:
+        raise SystemExit("SERVER=gunicorn exige o pacote 'gunicorn'") from e
+
+    settings = get_settings()
+
+    class Worker(UvicornWorker):
+        CONFIG_KWARGS = {
+            **UvicornWorker.CONFIG_KWARGS,
+            "limit_concurrency": settings.LIMIT_CONCURRENCY,
+            "proxy_headers": True,
+        }
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{settings.HOST}:{settings.PORT}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", Worker)
+            self.cfg.set("backlog", settings.BACKLOG)
+            self.cfg.set("keepalive", settings.TIMEOUT_KEEP_ALIVE)
+            self.cfg.set("preload_app", False)  # Importa a app só nos workers
+
+        def load(self):
+            from store.main import app
+
+            return app
+
+    Server().run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sobe a Store API com vários workers")
+    parser.add_argument("--workers", type=int, default=0, help="Padrão: WORKERS ou nº de núcleos")
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default=get_settings().SERVER)
+    args = parser.parse_args()
+
+    workers = worker_count(args.workers)
+    # Os workers herdam o ambiente: build_cache() desliga o LRU local com mais de um
+    os.environ["WORKERS"] = str(workers)
+    get_settings.cache_clear()
+    warn_cache_fallback(workers)
+    sync_indexes_once()  # Antes dos workers; o cliente usado aqui é fechado ao final
+    if args.server == "gunicorn":
+        run_gunicorn(workers)
+    else:
+        run_uvicorn(workers)
@@ -1,76 +1,771 @@
-from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from store.db.mongo import db_client
-from store.schemas.product import ProductIn, ProductOut, ProductUpdate
+from __future__ import annotations
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import math
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime, timedelta
+from decimal import ROUND_CEILING, ROUND_FLOOR, InvalidOperation
+from functools import lru_cache
+from typing import AsyncIterator
+from store.core.batchloader import BatchLoader
+from store.core.cache import Cache, build_cache
+from store.core.config import get_settings
+from store.core.singleflight import SingleFlight
+from store.db.repository import VERSION, ProductRepository, build_product_repository, is_price_sorted, now
+from store.schemas.base import from_cents, to_cents, to_storage
+from store.schemas.product import (
+    PRODUCT_FIELDS,
+    BulkItemResult,
+    BulkResult,
+    PriceBucket,
+    ProductBulkUpdate,
+    ProductChange,
+    ProductChanges,
+    ProductIn,
+    ProductLookup,
+    ProductOut,
+    ProductPage,
+    ProductStats,
+    ProductUpdate,
+    Reservation,
+    ReservationItemIn,
+    ReservationResult,
+    product_projection,
+    sparse_lookup_model,
+    sparse_product_models,
+)
 from bson import ObjectId
+from bson.errors import InvalidId
 from fastapi import HTTPException, status
 
+
+def price_range(min_price: float = None, max_price: float = None) -> tuple:
+    """
+    Filtros em reais -> faixa inteira em centavos, arredondada para dentro
+    (10.001 vira 1001 no mínimo e 1000 no máximo). Também normaliza a chave
+    do single-flight: 10 e 10.0 dão a mesma faixa. nan, inf ou valores
+    grandes demais para centavos viram 422.
+    """
+    try:
+        if not all(math.isfinite(price) for price in (min_price, max_price) if price is not None):
+            raise InvalidOperation
+        return (
+            None if min_price is None else to_cents(min_price, ROUND_CEILING),
+            None if max_price is None else to_cents(max_price, ROUND_FLOOR),
+        )
+    except InvalidOperation:
+        raise HTTPException(
+            status_code=422,
+            detail="Filtro de preço inválido"
+        ) from None
+
+
+def encode_cursor(document: dict, by_price: bool) -> str:
+    """Gera o token opaco de paginação a partir do último documento da página."""
+    payload = {"id": str(document["_id"])}
+    if by_price:
+        payload["price_cents"] = document["price_cents"]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, by_price: bool) -> tuple:
+    """Valida o token de paginação e devolve a chave do último item: (price_cents, _id) ou (_id,)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = ObjectId(payload["id"])
+        if not by_price:
+            return (last_id,)
+        return (int(payload["price_cents"]), last_id)
+    except (binascii.Error, ValueError, TypeError, KeyError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+
+def encode_change_token(at: datetime, id: ObjectId) -> str:
+    """Token opaco do feed de alterações: (updated_at, _id) da última alteração entregue."""
+    raw = json.dumps({"at": at.isoformat(), "id": str(id)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_change_token(token: str) -> tuple[datetime, ObjectId]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(payload["at"]), ObjectId(payload["id"]))
+    except (binascii.Error, ValueError, TypeError, KeyError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token inválido"
+        )
+
+
+def parse_fields(fields: str | None) -> tuple[str, ...] | None:
+    """
+    ?fields=name,price -> ("name", "price"), na ordem de PRODUCT_FIELDS.
+    None quando não informado ou quando pede todos: resposta completa.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(PRODUCT_FIELDS)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos inválidos: {', '.join(sorted(unknown)) or fields}"
+        )
+    if len(requested) == len(PRODUCT_FIELDS):
+        return None
+    return tuple(name for name in PRODUCT_FIELDS if name in requested)
+
+
+def parse_ids(ids: str | list[str]) -> list[str]:
+    """
+    ?ids=a,b,c (ou a lista do POST /products/lookup) -> ids sem repetição,
+    na ordem pedida. 400 se vier vazio ou acima de LOOKUP_MAX_IDS.
+    """
+    if isinstance(ids, str):
+        ids = ids.split(",")
+    requested = list(dict.fromkeys(id.strip() for id in ids if id.strip()))
+    limit = get_settings().LOOKUP_MAX_IDS
+    if not requested or len(requested) > limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Informe de 1 a {limit} ids"
+        )
+    return requested
+
+
+def price_boundaries() -> tuple[int, ...]:
+    """STATS_PRICE_BUCKETS em centavos, ordenados e sem repetição."""
+    return tuple(sorted({to_cents(value) for value in get_settings().STATS_PRICE_BUCKETS}))
+
+
+def bucket_index(price_cents: int | None, boundaries: tuple[int, ...]) -> int:
+    """Faixa de preço do produto, com a mesma regra do $bucket: fora das faixas vai para a última."""
+    if price_cents is not None:
+        index = bisect_right(boundaries, price_cents) - 1
+        if 0 <= index < len(boundaries) - 1:
+            return index
+    return len(boundaries) - 1
+
+
+def summary_increments(document: dict, sign: int, boundaries: tuple[int, ...]) -> dict[str, int]:
+    """O que um produto soma (sign=1) ou tira (sign=-1) do resumo materializado."""
+    key = "true" if document.get("status") else "false"
+    quantity = document.get("quantity") or 0
+    return {
+        f"{key}.count": sign,
+        f"{key}.units": sign * quantity,
+        f"{key}.value_cents": sign * quantity * (document.get("price_cents") or 0),
+        f"{key}.buckets.{bucket_index(document.get('price_cents'), boundaries)}": sign,
+    }
+
+
 class ProductUsecase:
-    def __init__(self) -> None:
-        self.client: AsyncIOMotorClient = db_client.get()
-        self.database: AsyncIOMotorDatabase = self.client.get_database()
-        self.collection = self.database.get_collection("products")
+    def __init__(self, repository: ProductRepository = None) -> None:
+        self.repository = build_product_repository() if repository is None else repository
+        self.cache: Cache = build_cache(
+            dumps=lambda product: product.model_dump_json(),
+            loads=ProductOut.model_validate_json
+        )
+        # Leituras idênticas simultâneas viram uma única consulta ao banco
+        self.get_flight = SingleFlight()
+        self.list_flight = SingleFlight()
+        # GETs por id que chegam juntos (itens de um carrinho) viram um único $in
+        self.get_loader = BatchLoader(self._load_documents, get_settings().GET_BATCH_MAX_SIZE)
+
+    @staticmethod
+    def _insert_document(product: ProductIn, timestamp: datetime) -> dict:
+        product_data = to_storage(product.model_dump())
+        product_data["_id"] = ObjectId()
+        product_data["created_at"] = timestamp
+        product_data["updated_at"] = timestamp
+        product_data["version"] = 1
+        return product_data
 
     async def create(self, product: ProductIn) -> ProductOut:
-        product_data = product.model_dump()
-        product_data["price"] = float(product_data["price"])
-        result = await self.collection.insert_one(product_data)
-        new_product = await self.collection.find_one({"_id": result.inserted_id})
-        return ProductOut(**new_product)
-
-    async def update(self, id: str, product: ProductUpdate) -> ProductOut:
-        update_data = product.model_dump(exclude_none=True)
-        
-        if "price" in update_data:
-            update_data["price"] = float(update_data["price"])
-        
-        update_data["updated_at"] = datetime.now()
+        # O documento enviado já é o que fica no banco: não precisa reler
+        product_data = self._insert_document(product, now())
+        await self.repository.insert(product_data)
+        await self._update_summary(None, product_data)
+        self._forget()
+        return ProductOut.from_document(product_data)
+
+    async def update(self, id: str, product: ProductUpdate, expected_version: int = None) -> ProductOut:
+        """
+        Com "expected_version" (vindo do If-Match), só grava se o produto ainda
+        estiver nessa versão; senão responde 412.
+        """
+        update_data = to_storage(product.model_dump(exclude_none=True))
+        update_data["updated_at"] = now()
         
-        result = await self.collection.update_one(
-            {"_id": ObjectId(id)},
-            {"$set": update_data}
+        # Com o resumo ligado, o documento de antes da escrita dá o que tirar dele
+        summary = get_settings().STATS_SUMMARY_ENABLED
+        updated_product = await self.repository.update(
+            ObjectId(id), update_data, expected_version, return_before=summary
         )
         
-        if result.matched_count == 0:
+        if updated_product is None:
+            await self._raise_not_found_or_stale(id, expected_version)
+        
+        if summary:
+            before = updated_product
+            updated_product = {**before, **update_data, VERSION: before.get(VERSION, 0) + 1}
+            await self._update_summary(before, updated_product)
+        product = ProductOut.from_document(updated_product)
+        # Grava a versão nova: leituras mais lentas que a escrita não a sobrescrevem
+        await self.cache.set(id, product, product.version)
+        self._forget(id)
+        return product
+
+    async def _raise_not_found_or_stale(self, id: str, expected_version: int | None) -> None:
+        """A escrita condicional não casou: o produto não existe ou mudou de versão."""
+        if expected_version is not None and await self.repository.existing_ids([ObjectId(id)]):
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Produto não encontrado"
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Produto alterado por outra requisição: releia e tente de novo"
             )
-        
-        updated_product = await self.collection.find_one({"_id": ObjectId(id)})
-        return ProductOut(**updated_product)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Produto não encontrado"
+        )
+
+    async def _invalidate(self, *ids: str) -> None:
+        """
+        Tira "ids" do cache sem saber a versão nova (remoções e lotes): até o
+        TTL, nenhuma leitura devolve esses produtos ao cache.
+        """
+        for id in ids:
+            await self.cache.invalidate(id)
+        self._forget(*ids)
+
+    def _forget(self, *ids: str) -> None:
+        """
+        Depois de uma escrita, leituras em andamento podem ter começado antes
+        dela: novas leituras não devem aproveitá-las.
+        """
+        for id in ids:
+            self.get_flight.forget(id)
+        self.list_flight.forget_all()
+
+    async def get(self, id: str, fields: tuple[str, ...] = None) -> ProductOut:
+        product, _ = await self.get_versioned(id, fields)
+        return product
 
-    async def get(self, id: str) -> ProductOut:
-        result = await self.collection.find_one({"_id": ObjectId(id)})
+    async def get_versioned(self, id: str, fields: tuple[str, ...] = None) -> tuple[ProductOut, int]:
+        """
+        Como get(), mais a versão do produto, que entra no ETag mesmo quando
+        "fields" não a inclui.
+        """
+        cached = await self.cache.get(id)
+        if cached is not None:
+            if fields is not None:
+                return sparse_product_models(fields)[0].from_document(cached.__dict__), cached.version
+            return cached, cached.version
+        if fields is not None:
+            return await self._fetch_fields(id, fields)
+        product = await self.get_flight.do(id, lambda: self._fetch(id))
+        return product, product.version
+
+    async def _fetch_fields(self, id: str, fields: tuple[str, ...]) -> tuple:
+        """Lê só os campos pedidos (e a versão). O cache guarda apenas o produto completo."""
+        result = await self.repository.get(ObjectId(id), projection=product_projection(fields, VERSION))
+        if not result:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return sparse_product_models(fields)[0].from_document(result), result.get(VERSION, 0)
+
+    async def _fetch(self, id: str) -> ProductOut:
+        result = await self.get_loader.load(ObjectId(id))
         if not result:
             raise HTTPException(status_code=404, detail="Product not found")
-        return ProductOut(**result)
+        product = ProductOut.from_document(result)
+        # Se houve escrita durante a leitura, o cache já tem versão mais nova e recusa esta
+        await self.cache.set(id, product, product.version)
+        return product
+
+    async def _load_documents(self, ids: list[ObjectId]) -> dict[ObjectId, dict]:
+        return {document["_id"]: document for document in await self.repository.get_many(ids)}
+
+    async def lookup(self, ids: list[str], fields: tuple[str, ...] = None) -> ProductLookup:
+        """
+        Vários produtos por id em uma única consulta ($in), na ordem pedida.
+        Ids inexistentes ou malformados vão para "missing" em vez de falhar
+        a requisição. "ids" chega de parse_ids(): sem repetição e dentro do teto.
+        """
+        object_ids = {}
+        for id in ids:
+            try:
+                object_ids[id] = ObjectId(id)
+            except (InvalidId, TypeError):
+                pass
+        item_model, lookup_model = ProductOut, ProductLookup
+        projection = None
+        if fields is not None:
+            item_model, lookup_model = sparse_product_models(fields)[0], sparse_lookup_model(fields)
+            projection = product_projection(fields, "_id")
+        documents = await self.repository.get_many(list(object_ids.values()), projection)
+        found = {document["_id"]: document for document in documents}
 
-    async def delete(self, id: str) -> bool:
-        result = await self.collection.delete_one({"_id": ObjectId(id)})
+        items, missing = [], []
+        for id in ids:
+            document = found.get(object_ids.get(id))
+            if document is None:
+                missing.append(id)
+            else:
+                items.append(item_model.from_document(document))
+        return lookup_model(items=items, missing=missing)
+
+    async def delete(self, id: str, expected_version: int = None) -> bool:
+        summary = get_settings().STATS_SUMMARY_ENABLED
+        deleted = await self.repository.delete(ObjectId(id), expected_version, return_before=summary)
         
-        if result.deleted_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Produto não encontrado"
-            )
+        if not deleted:
+            await self._raise_not_found_or_stale(id, expected_version)
         
+        if summary:
+            await self._update_summary(deleted, None)
+        await self._invalidate(id)
         return True
 
+    async def reserve(self, id: str, quantity: int) -> Reservation:
+        """
+        Reserva "quantity" unidades com um $inc condicional: uma ida ao banco e
+        nenhuma atualização perdida sob concorrência, ao contrário de ler,
+        subtrair e gravar com update(). Sem estoque suficiente: 409.
+        """
+        reservation = await self._reserve(ObjectId(id), quantity, now())
+        if not reservation.ok:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND if reservation.quantity is None else status.HTTP_409_CONFLICT,
+                detail=reservation.error
+            )
+        self._forget(id)
+        return reservation
+
+    async def _reserve(self, id: ObjectId, quantity: int, timestamp: datetime) -> Reservation:
+        document = await self.repository.reserve(id, quantity, timestamp)
+        if document is not None:
+            await self._update_summary({**document, "quantity": document["quantity"] + quantity}, document)
+            await self.cache.invalidate(str(id), document.get(VERSION))
+            return Reservation(id=str(id), requested=quantity, ok=True, quantity=document["quantity"])
+        # Só quando falha vale a leitura extra, para informar o estoque disponível
+        current = await self.repository.get(id, projection={"quantity": 1})
+        if current is None:
+            return Reservation(id=str(id), requested=quantity, ok=False, error="Produto não encontrado")
+        return Reservation(
+            id=str(id), requested=quantity, ok=False, quantity=current.get("quantity"),
+            error=f"Estoque insuficiente: {current.get('quantity')} disponível(is)"
+        )
+
+    async def reserve_many(self, items: list[ReservationItemIn], all_or_nothing: bool = True) -> ReservationResult:
+        """
+        Reserva os itens de um carrinho em paralelo, um $inc condicional por
+        produto (itens do mesmo produto são somados).
+
+        Com "all_or_nothing", se algum item falhar as reservas já feitas voltam
+        ao estoque. Não é uma transação: entre a reserva e a devolução, outras
+        requisições veem o estoque reduzido e podem receber 409.
+        """
+        timestamp = now()
+        requested: dict[str, int] = {}
+        for item in items:
+            requested[item.id] = requested.get(item.id, 0) + item.quantity
+
+        async def reserve_one(id: str, quantity: int) -> Reservation:
+            try:
+                object_id = ObjectId(id)
+            except (InvalidId, TypeError):
+                return Reservation(id=id, requested=quantity, ok=False, error="ID inválido")
+            return await self._reserve(object_id, quantity, timestamp)
+
+        results = await asyncio.gather(*(reserve_one(id, quantity) for id, quantity in requested.items()))
+        ok = all(result.ok for result in results)
+        reserved = [result for result in results if result.ok]
+        if not ok and all_or_nothing and reserved:
+            released = await asyncio.gather(*(
+                self.repository.release(ObjectId(result.id), result.requested, now()) for result in reserved
+            ))
+            for result, document in zip(reserved, released):
+                if document is not None:
+                    before = {**document, "quantity": document["quantity"] - result.requested}
+                    await self._update_summary(before, document)
+                    await self.cache.invalidate(result.id, document.get(VERSION))
+                result.ok = False
+                result.quantity = document["quantity"] if document else None
+                result.error = "Não reservado: outro item do pedido falhou"
+        self._forget(*(result.id for result in reserved))
+        return ReservationResult(ok=ok, items=results)
+
     async def list(self, min_price: float = None, max_price: float = None, status: bool = None) -> list[ProductOut]:
-        query = {}
-        
-        if min_price is not None or max_price is not None:
-            query["price"] = {}
-            if min_price is not None:
-                query["price"]["$gte"] = min_price
-            if max_price is not None:
-                query["price"]["$lte"] = max_price
-        
-        if status is not None:
-            query["status"] = status
-        
-        products = await self.collection.find(query).to_list(length=None)
-        return [ProductOut(**product) for product in products]
+        min_cents, max_cents = price_range(min_price, max_price)
+        key = ("list", min_cents, max_cents, status)
+        return await self.list_flight.do(key, lambda: self._list(min_cents, max_cents, status))
+
+    async def _list(self, min_cents: int = None, max_cents: int = None, status: bool = None) -> list[ProductOut]:
+        products = await self.repository.list(min_cents, max_cents, status)
+        return [ProductOut.from_document(product) for product in products]
+
+    def export(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        batch_size: int = None,
+    ) -> AsyncIterator[ProductOut]:
+        """
+        Percorre o cursor do repositório em lotes e entrega um produto por vez,
+        sem nunca montar a lista completa em memória. Os filtros são validados
+        aqui, antes do streaming começar: um erro ainda pode virar 422.
+        """
+        documents = self.repository.iterate(
+            *price_range(min_price, max_price), status, batch_size=batch_size or get_settings().EXPORT_BATCH_SIZE
+        )
+        return self._export(documents)
+
+    @staticmethod
+    async def _export(documents: AsyncIterator[dict]) -> AsyncIterator[ProductOut]:
+        async for product in documents:
+            yield ProductOut.from_document(product)
+
+    async def list_page(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        limit: int = None,
+        cursor: str = None,
+        fields: tuple[str, ...] = None,
+    ) -> ProductPage:
+        """
+        Lista produtos por keyset: ordena por _id (ou price_cents,_id quando há filtro
+        de preço) e continua a partir do último item da página anterior, então a
+        página N custa o mesmo que a primeira.
+
+        Com "fields", só esses campos (e as chaves do cursor) saem do banco e os
+        itens usam um modelo reduzido.
+        """
+        settings = get_settings()
+        limit = min(limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX)
+        min_cents, max_cents = price_range(min_price, max_price)
+        key = ("page", min_cents, max_cents, status, limit, cursor or None, fields)
+        return await self.list_flight.do(
+            key, lambda: self._list_page(min_cents, max_cents, status, limit, cursor, fields)
+        )
+
+    async def list_etag(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        limit: int = None,
+        cursor: str = None,
+        fields: tuple[str, ...] = None,
+    ) -> str:
+        """
+        ETag de uma página da listagem sem executar a consulta: combina os
+        parâmetros com a versão das listagens (repository.list_version), que
+        muda a cada escrita.
+
+        Leia o ETag antes da página: se uma escrita cair entre os dois, o ETag
+        fica mais velho que o conteúdo e a próxima revalidação só devolve 200.
+        """
+        settings = get_settings()
+        limit = min(limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX)
+        key = (*price_range(min_price, max_price), status, limit, cursor or None, fields)
+        # Revalidações simultâneas dividem a mesma leitura; escritas a descartam
+        version = await self.list_flight.do(("list_version",), self.repository.list_version)
+        digest = hashlib.blake2b(repr((version, key)).encode(), digest_size=16).hexdigest()
+        return f'"{digest}"'
+
+    async def _list_page(
+        self,
+        min_cents: int = None,
+        max_cents: int = None,
+        status: bool = None,
+        limit: int = None,
+        cursor: str = None,
+        fields: tuple[str, ...] = None,
+    ) -> ProductPage:
+        by_price = is_price_sorted(min_cents, max_cents)
+        after = decode_cursor(cursor, by_price) if cursor else None
+        item_model, page_model = ProductOut, ProductPage
+        projection = None
+        if fields is not None:
+            item_model, page_model = sparse_product_models(fields)
+            sort_keys = ("price_cents", "_id") if by_price else ("_id",)
+            projection = product_projection(fields, *sort_keys)
+        # Busca um item a mais só para saber se existe próxima página
+        products = await self.repository.list(
+            min_cents, max_cents, status, after=after, limit=limit + 1, projection=projection
+        )
+
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            next_cursor = encode_cursor(products[-1], by_price)
+
+        return page_model(
+            items=[item_model.from_document(product) for product in products],
+            next_cursor=next_cursor
+        )
+
+    async def changes(self, since: str = None, limit: int = None) -> ProductChanges:
+        """
+        Feed de alterações: produtos criados/alterados e excluídos depois do
+        token "since", em ordem de updated_at. Sem "since", começa do início
+        (carga completa, paginada pelo mesmo token).
+
+        Alterações mais novas que CHANGES_LAG_MS ficam para a próxima chamada:
+        uma escrita com timestamp anterior ainda pode estar a caminho do banco.
+        """
+        settings = get_settings()
+        limit = min(limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX)
+        after = decode_change_token(since) if since else None
+        current = now()
+        if after is not None and after[0] < current - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS):
+            # As lápides desse período já expiraram: exclusões seriam perdidas
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Token expirado: refaça a carga completa sem since"
+            )
+        # Pelo menos 1 ms: uma escrita no mesmo milissegundo do "until" ficaria
+        # com o timestamp já entregue e nunca apareceria no feed
+        until = current - timedelta(milliseconds=max(settings.CHANGES_LAG_MS, 1))
+        documents = await self.repository.changes(after, until, limit + 1)
+
+        has_more = len(documents) > limit
+        changes = []
+        for document in documents[:limit]:
+            if "deleted_at" in document:
+                changes.append(ProductChange(
+                    id=str(document["_id"]), deleted=True, updated_at=document["deleted_at"]
+                ))
+            else:
+                changes.append(ProductChange(
+                    id=str(document["_id"]),
+                    updated_at=document["updated_at"],
+                    product=ProductOut.from_document(document)
+                ))
+        next_token = since
+        if changes:
+            last = documents[len(changes) - 1]
+            next_token = encode_change_token(last.get("deleted_at") or last["updated_at"], last["_id"])
+        return ProductChanges(changes=changes, next_token=next_token, has_more=has_more)
+
+    async def stats(self, status: bool = None) -> ProductStats:
+        """
+        Facetas da vitrine: contagem por status, faixas de preço, menor e
+        maior preço, unidades e valor do estoque.
+
+        Sem STATS_SUMMARY_ENABLED, é um $facet sobre o catálogo inteiro (uma
+        ida ao banco, mas varre tudo). Com ele, lê o resumo materializado que
+        as escritas mantêm com $inc, mais as pontas do índice de preço: O(1).
+        """
+        boundaries = price_boundaries()
+        bounds = None
+        if get_settings().STATS_SUMMARY_ENABLED:
+            summary, bounds = await asyncio.gather(
+                self._summary(boundaries), self.repository.price_bounds(status)
+            )
+            groups, source = {True: summary["true"], False: summary["false"]}, "summary"
+        else:
+            groups = await self.list_flight.do(("stats",), lambda: self.repository.stats(boundaries))
+            source = "aggregation"
+
+        selected = [groups[s] for s in ((True, False) if status is None else (status,))]
+        if bounds is None:
+            lows = [group["min_cents"] for group in selected if group["min_cents"] is not None]
+            highs = [group["max_cents"] for group in selected if group["max_cents"] is not None]
+            bounds = (min(lows, default=None), max(highs, default=None))
+        counts = [sum(group["buckets"][i] for group in selected) for i in range(len(boundaries))]
+        return ProductStats(
+            total=sum(group["count"] for group in selected),
+            active=groups[True]["count"],
+            inactive=groups[False]["count"],
+            units=sum(group["units"] for group in selected),
+            stock_value=from_cents(sum(group["value_cents"] for group in selected)),
+            min_price=None if bounds[0] is None else from_cents(bounds[0]),
+            max_price=None if bounds[1] is None else from_cents(bounds[1]),
+            price_buckets=[
+                PriceBucket(min=from_cents(low), max=None if high is None else from_cents(high), count=count)
+                for low, high, count in zip(boundaries, boundaries[1:] + (None,), counts)
+            ],
+            source=source,
+        )
+
+    async def _summary(self, boundaries: tuple[int, ...]) -> dict:
+        """
+        Resumo materializado, recalculado se não existir, se as faixas mudaram
+        ou se passou de STATS_SUMMARY_MAX_AGE_S. A idade máxima limita a
+        diferença deixada por escritas de fora deste usecase (ProductUsecaseSync,
+        outro worker durante um recálculo).
+        """
+        summary = await self.repository.load_summary()
+        max_age = timedelta(seconds=get_settings().STATS_SUMMARY_MAX_AGE_S)
+        if summary is None or summary.get("boundaries") != list(boundaries) or summary["built_at"] < now() - max_age:
+            summary = await self.list_flight.do(("stats-summary",), lambda: self._rebuild_summary(boundaries))
+        return summary
+
+    async def _rebuild_summary(self, boundaries: tuple[int, ...]) -> dict:
+        groups = await self.repository.stats(boundaries)
+        summary = {"boundaries": list(boundaries), "built_at": now()}
+        for status, key in ((True, "true"), (False, "false")):
+            summary[key] = {
+                name: value for name, value in groups[status].items() if name not in ("min_cents", "max_cents")
+            }
+        await self.repository.save_summary(summary)
+        return summary
+
+    async def _update_summary(self, before: dict | None, after: dict | None) -> None:
+        """Aplica ao resumo a troca de "before" por "after" (None = produto novo ou removido)."""
+        if not get_settings().STATS_SUMMARY_ENABLED:
+            return
+        boundaries = price_boundaries()
+        increments = Counter()
+        if before is not None:
+            increments.update(summary_increments(before, -1, boundaries))
+        if after is not None:
+            increments.update(summary_increments(after, 1, boundaries))
+        increments = {path: amount for path, amount in increments.items() if amount}
+        if increments:
+            await self.repository.inc_summary(increments)
+
+    async def _drop_summary(self) -> None:
+        """Lotes grandes: mais barato recalcular o resumo na próxima leitura do que somar item a item."""
+        if get_settings().STATS_SUMMARY_ENABLED:
+            await self.repository.save_summary(None)
+
+    async def bulk_create(self, products: list[ProductIn], ordered: bool = True, chunk_size: int = None) -> BulkResult:
+        operations = []
+        for index, product in enumerate(products):
+            product_data = self._insert_document(product, None)  # Datas gravadas por lote em _bulk_write
+            operations.append((index, product_data["_id"], ("insert", product_data)))
+        result = await self._bulk_write(operations, {}, len(products), ordered, chunk_size)
+        await self._drop_summary()
+        self._forget()
+        return result
+
+    async def bulk_update(self, products: list[ProductBulkUpdate], ordered: bool = True, chunk_size: int = None) -> BulkResult:
+        operations, errors = [], {}
+        for index, product in enumerate(products):
+            object_id = self._parse_bulk_id(product.id, index, errors)
+            if object_id is None:
+                continue
+            update_data = to_storage(product.model_dump(exclude_none=True, exclude={"id"}))
+            operations.append((index, object_id, ("update", object_id, update_data)))
+        await self._reject_missing(operations, errors)
+        result = await self._bulk_write(operations, errors, len(products), ordered, chunk_size)
+        await self._drop_summary()
+        await self._invalidate(*(item.id for item in result.results if item.ok))
+        return result
+
+    async def bulk_delete(self, ids: list[str], ordered: bool = True, chunk_size: int = None) -> BulkResult:
+        operations, errors = [], {}
+        for index, id in enumerate(ids):
+            object_id = self._parse_bulk_id(id, index, errors)
+            if object_id is not None:
+                operations.append((index, object_id, ("delete", object_id)))
+        await self._reject_missing(operations, errors)
+        result = await self._bulk_write(operations, errors, len(ids), ordered, chunk_size)
+        await self._drop_summary()
+        await self._invalidate(*(item.id for item in result.results if item.ok))
+        return result
+
+    @staticmethod
+    def _parse_bulk_id(id: str, index: int, errors: dict) -> ObjectId | None:
+        try:
+            return ObjectId(id)
+        except (InvalidId, TypeError):
+            errors[index] = (id, "ID inválido")
+            return None
+
+    async def _reject_missing(self, operations: list, errors: dict) -> None:
+        """Marca como erro os ids inexistentes, já que bulk_write não informa isso por item."""
+        if not operations:
+            return
+        found = await self.repository.existing_ids([object_id for _, object_id, _ in operations])
+        for index, object_id, _ in operations:
+            if object_id not in found:
+                errors[index] = (str(object_id), "Produto não encontrado")
+        operations[:] = [op for op in operations if op[1] in found]
+
+    @staticmethod
+    def _stamp(operations: list, timestamp: datetime) -> None:
+        for operation in operations:
+            if operation[0] == "insert":
+                operation[1]["created_at"] = operation[1]["updated_at"] = timestamp
+            elif operation[0] == "update":
+                operation[2]["updated_at"] = timestamp
+
+    async def _bulk_write(
+        self,
+        operations: list,
+        errors: dict,
+        total: int,
+        ordered: bool,
+        chunk_size: int = None,
+    ) -> BulkResult:
+        """
+        Executa as operações em lotes de bulk_write e monta o resultado por item.
+
+        Em modo ordenado, o primeiro erro (de validação ou do banco) interrompe
+        tudo o que vem depois dele, como faria uma sequência de chamadas avulsas.
+
+        Cada lote recebe created_at/updated_at na hora em que é gravado: com
+        um só horário para tudo, os lotes finais de uma carga longa entrariam
+        com data no passado e escapariam de quem já leu /products/changes
+        depois dela.
+        """
+        chunk_size = chunk_size or get_settings().BULK_CHUNK_SIZE
+        if ordered and errors:
+            # Nada depois do primeiro item inválido pode ser executado
+            first_error = min(errors)
+            operations = [op for op in operations if op[0] < first_error]
+
+        applied = {}
+        for start in range(0, len(operations), chunk_size):
+            chunk = operations[start:start + chunk_size]
+            self._stamp([op for _, _, op in chunk], now())
+            failed = await self.repository.bulk_write([op for _, _, op in chunk], ordered=ordered)
+            for position, (index, object_id, _) in enumerate(chunk):
+                if position in failed:
+                    errors[index] = (str(object_id), failed[position])
+                elif ordered and failed and position > min(failed):
+                    errors[index] = (str(object_id), "Não executado: operação anterior falhou")
+                else:
+                    applied[index] = str(object_id)
+            if ordered and failed:
+                for index, object_id, _ in operations[start + chunk_size:]:
+                    errors[index] = (str(object_id), "Não executado: operação anterior falhou")
+                break
+
+        results = []
+        for index in range(total):
+            if index in applied:
+                results.append(BulkItemResult(index=index, id=applied[index], ok=True))
+            elif index in errors:
+                id, error = errors[index]
+                results.append(BulkItemResult(index=index, id=id, ok=False, error=error))
+            else:
+                # Só acontece no modo ordenado, após o primeiro erro
+                results.append(BulkItemResult(
+                    index=index, ok=False, error="Não executado: operação anterior falhou"
+                ))
+        return BulkResult(succeeded=len(applied), failed=total - len(applied), results=results)
+
 
-product_usecase = ProductUsecase()
\ No newline at end of file
+@lru_cache
+def get_product_usecase() -> ProductUsecase:
+    """
+    Dependência do FastAPI. Criada no primeiro uso dentro do worker, então o
+    import do módulo não lê configuração nem abre conexões.
+    """
+    return ProductUsecase()
\ No newline at end of file
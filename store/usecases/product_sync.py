@@ -1,59 +1,128 @@
-from datetime import datetime
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Iterator
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from store.core.config import get_settings
+from store.db.mongo import STATS, SUMMARY_ID, TOMBSTONES, WRITES_ID, client_options, count_write
+from store.db.repository import now
+from store.schemas.base import to_storage
 from store.schemas.product import ProductIn, ProductUpdate
-from bson import ObjectId, Decimal128
-
-load_dotenv('.env.local')
+from store.usecases.product import price_range
+from bson import ObjectId
 
 class ProductUsecaseSync:
-    def __init__(self) -> None:
-        uri = os.getenv("DATABASE_URL")
-        self.client = MongoClient(uri, ssl=True)
-        self.db = self.client.get_database()
-        self.collection = self.db.products
+    def __init__(self, uri: str = None) -> None:
+        self.uri = uri
+        self._client: MongoClient | None = None
+
+    @property
+    def client(self) -> MongoClient:
+        # Conecta só no primeiro uso (o construtor do MongoClient já resolve DNS/SRV)
+        if self._client is None:
+            self._client = MongoClient(
+                self.uri or get_settings().DATABASE_URL, ssl=True, **client_options()
+            )
+        return self._client
+
+    @property
+    def collection(self):
+        return self.client.get_database().products
+
+    def _count_write(self) -> None:
+        """Como no repositório assíncrono: muda o ETag das listagens depois de cada escrita."""
+        self.client.get_database()[STATS].update_one({"_id": WRITES_ID}, count_write(), upsert=True)
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
 
     def create_sync(self, product: ProductIn) -> dict:
-        product_dict = product.model_dump()
-        product_dict["price"] = Decimal128(str(product_dict["price"]))
-        result = self.collection.insert_one(product_dict)
-        return self.collection.find_one({"_id": result.inserted_id})
+        product_dict = to_storage(product.model_dump())
+        product_dict["created_at"] = product_dict["updated_at"] = now()
+        product_dict["version"] = 1
+        # insert_one preenche o _id no próprio dict: não precisa reler
+        self.collection.insert_one(product_dict)
+        self._count_write()
+        return product_dict
+
+    def insert_many_sync(self, documents: list[dict]) -> tuple[int, dict[int, str]]:
+        """
+        Insere um lote em uma ida ao banco, sem ordem. Devolve quantos foram
+        inseridos e {posição: erro} dos rejeitados. _id já existente (lote
+        repetido ao retomar uma importação) não é erro: só não conta.
+        """
+        if not documents:
+            return 0, {}
+        try:
+            inserted, errors = len(self.collection.insert_many(documents, ordered=False).inserted_ids), {}
+        except BulkWriteError as e:
+            errors = {
+                error["index"]: error["errmsg"] for error in e.details["writeErrors"]
+                if not (error["code"] == 11000 and error.get("keyPattern", {"_id": 1}) == {"_id": 1})
+            }
+            inserted = e.details["nInserted"]
+        if inserted:
+            self._count_write()
+        return inserted, errors
+
+    def drop_stats_summary_sync(self) -> None:
+        """Descarta o resumo do /products/stats; a próxima leitura o recalcula."""
+        self.client.get_database()[STATS].delete_one({"_id": SUMMARY_ID})
 
     def list_sync(self, min_price: float = None, max_price: float = None, status: bool = None) -> list:
+        return list(self.iterate_sync(min_price, max_price, status))
+
+    def iterate_sync(
+        self,
+        min_price: float = None,
+        max_price: float = None,
+        status: bool = None,
+        batch_size: int = None,
+    ) -> Iterator[dict]:
+        """Percorre os produtos filtrados em lotes do cursor, sem materializar a lista."""
         query = {}
-        if min_price is not None or max_price is not None:
-            query["price"] = {}
-            if min_price is not None:
-                query["price"]["$gte"] = min_price
-            if max_price is not None:
-                query["price"]["$lte"] = max_price
+        min_cents, max_cents = price_range(min_price, max_price)
+        if min_cents is not None or max_cents is not None:
+            query["price_cents"] = {}
+            if min_cents is not None:
+                query["price_cents"]["$gte"] = min_cents
+            if max_cents is not None:
+                query["price_cents"]["$lte"] = max_cents
         if status is not None:
             query["status"] = status
-        return list(self.collection.find(query))
+        with self.collection.find(query, batch_size=batch_size or 0) as cursor:
+            yield from cursor
 
     def delete_sync(self, id: str) -> bool:
         """Versão síncrona do delete."""
         result = self.collection.delete_one({"_id": ObjectId(id)})
-        return result.deleted_count > 0
+        if result.deleted_count == 0:
+            return False
+        # Lápide para o feed /products/changes, como no caminho assíncrono
+        self.client.get_database()[TOMBSTONES].update_one(
+            {"_id": ObjectId(id)}, {"$set": {"deleted_at": now()}}, upsert=True
+        )
+        self._count_write()
+        return True
     
     def update_sync(self, id: str, product: ProductUpdate) -> dict:
         """Versão síncrona do update."""
-        update_data = product.model_dump(exclude_unset=True)
-        
-        if "price" in update_data:
-            update_data["price"] = Decimal128(str(update_data["price"]))
-        
-        update_data["updated_at"] = datetime.now()
+        update_data = to_storage(product.model_dump(exclude_unset=True))
+        update_data["updated_at"] = now()
         
         result = self.collection.update_one(
             {"_id": ObjectId(id)},
-            {"$set": update_data}
+            {"$set": update_data, "$inc": {"version": 1}}
         )
         
         if result.matched_count == 0:
             return None
+        self._count_write()
         
         return self.collection.find_one({"_id": ObjectId(id)})
     
-product_usecase_sync = ProductUsecaseSync()
\ No newline at end of file
+
+@lru_cache
+def get_product_usecase_sync() -> ProductUsecaseSync:
+    return ProductUsecaseSync()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from fastapi import HTTPException
+from store.controllers.product import _csv_lines, _expected_version, _ndjson_lines, _not_modified, _product_etag
+from store.schemas.product import ProductOut
+
+
+async def _products():
+    for i in range(3):
+        yield ProductOut(
+            _id=f"id{i}",
+            name=f"Product {i}",
+            quantity=i,
+            price=Decimal("10.50"),
+            status=True,
+            created_at=datetime(2024, 1, 1),
+            updated_at=datetime(2024, 1, 1),
+        )
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_one_line_per_product():
+    """Teste unitário - exportação NDJSON gera uma linha JSON por produto"""
+    lines = [line async for line in _ndjson_lines(_products())]
+
+    assert len(lines) == 3
+    assert all(line.endswith("\n") for line in lines)
+    assert json.loads(lines[0])["name"] == "Product 0"
+
+
+@pytest.mark.asyncio
+async def test_export_csv_header_then_rows():
+    """Teste unitário - exportação CSV envia cabeçalho junto da primeira linha"""
+    chunks = [chunk async for chunk in _csv_lines(_products())]
+
+    assert len(chunks) == 3
+    assert chunks[0].startswith("id,name,quantity,price,status,created_at,updated_at")
+    assert chunks[1].startswith("id1,Product 1,1,10.50,True")
+
+
+def test_not_modified_uses_weak_comparison():
+    """Teste unitário - If-None-Match casa o ETag (também na forma W/) ou "*" e responde 304"""
+    etag = _product_etag("abc", 3)
+
+    assert _not_modified(None, etag) is None
+    assert _not_modified('"abc-2"', etag) is None
+    assert _not_modified(f'"x", W/{etag}', etag).status_code == 304
+    assert _not_modified("*", etag).headers["etag"] == etag
+    assert _product_etag("abc", 3, ("name",)) != etag
+
+
+def test_expected_version_from_if_match():
+    """Teste unitário - If-Match vira a versão esperada; ETag de outro produto ou fraco dá 412"""
+    assert _expected_version(None, "abc") is None
+    assert _expected_version("*", "abc") is None
+    assert _expected_version(_product_etag("abc", 7), "abc") == 7
+    assert _expected_version(_product_etag("abc", 7, ("name",)), "abc") == 7
+
+    for header in (_product_etag("other", 7), 'W/"abc-7"', '"abc"', "abc-7"):
+        with pytest.raises(HTTPException) as error:
+            _expected_version(header, "abc")
+        assert error.value.status_code == 412
+
+
+@pytest.mark.asyncio
+async def test_create_returns_etag():
+    """Teste unitário - POST devolve o ETag do produto criado, o mesmo que o If-Match aceita"""
+    from store.controllers.product import criar_produto
+    from store.db.memory import InMemoryProductRepository
+    from store.schemas.product import ProductIn
+    from store.usecases.product import ProductUsecase
+
+    usecase = ProductUsecase(InMemoryProductRepository())
+    product_in = ProductIn(name="P", quantity=1, price="9.90", status=True)
+
+    response = await criar_produto(product_in, usecase)
+
+    created = json.loads(response.body)
+    assert response.status_code == 201
+    assert response.headers["etag"] == _product_etag(created["id"], created["version"])
+    assert _expected_version(response.headers["etag"], created["id"]) == created["version"]
+
+
+@pytest.mark.asyncio
+async def test_deadline_errors_map_to_504_and_database_errors_to_503():
+    """Teste unitário - prazo esgotado (inclusive esperando leitura compartilhada) dá 504; banco fora, 503"""
+    from pymongo.errors import ServerSelectionTimeoutError
+    from store.controllers.product import handle_usecase_exceptions
+    from store.core.deadline import DeadlineExceeded
+
+    async def fails_with(error):
+        raise error
+
+    for error, status_code in ((DeadlineExceeded(), 504), (ServerSelectionTimeoutError("fora"), 503)):
+        with pytest.raises(HTTPException) as exc:
+            await handle_usecase_exceptions(fails_with)(error)
+        assert exc.value.status_code == status_code
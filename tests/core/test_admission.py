@@ -0,0 +1,96 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from store.core.admission import AdmissionLimiter, AdmissionMiddleware, Overloaded, route_class
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_then_sheds_when_queue_is_full():
+    """Teste unitário - acima do limite espera na fila; com a fila cheia recusa na hora"""
+    limiter = AdmissionLimiter("test", limit=1, queue_size=1)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as error:
+        await limiter.acquire()
+    assert error.value.reason == "queue_full"
+    assert limiter.stats()["queued"] == 1
+
+    limiter.release()  # A vaga passa direto para quem esperava
+    await waiter
+    limiter.release()
+    assert limiter.stats() == {
+        "limit": 1, "active": 0, "queued": 0, "queue_size": 1,
+        "admitted": 2, "rejected": {"queue_full": 1, "timeout": 0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_limiter_times_out_and_cancelled_waiters_leave_the_queue():
+    """Teste unitário - espera esgotada vira recusa; cancelado sai da fila sem levar a vaga"""
+    limiter = AdmissionLimiter("test", limit=1, queue_size=5, queue_timeout=0.01)
+    await limiter.acquire()
+    with pytest.raises(Overloaded) as error:
+        await limiter.acquire()
+    assert error.value.reason == "timeout"
+
+    limiter.queue_timeout = None
+    cancelled = asyncio.ensure_future(limiter.acquire())
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    limiter.release()
+
+    await waiter
+    assert limiter.stats()["active"] == 1 and limiter.stats()["queued"] == 0
+
+
+def test_route_class_by_method():
+    """Teste unitário - GET e o POST de busca por ids são leituras; o resto, escritas"""
+    assert route_class("GET", "/products/{id}") == "read"
+    assert route_class("POST", "/products/lookup") == "read"
+    assert route_class("POST", "/products/{id}/reserve") == "write"
+    assert route_class("DELETE", "/products/{id}") == "write"
+
+
+@pytest.mark.asyncio
+async def test_middleware_sheds_with_503_and_keeps_classes_apart():
+    """Teste unitário - leituras saturadas recebem 503 com Retry-After; escritas seguem"""
+    release = asyncio.Event()
+    app = FastAPI()
+    limiters = {
+        "read": AdmissionLimiter("read", limit=1, queue_size=0),
+        "write": AdmissionLimiter("write", limit=1, queue_size=0),
+    }
+    app.add_middleware(AdmissionMiddleware, limiters=limiters)
+
+    @app.get("/slow")
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @app.post("/write")
+    async def write():
+        return {"ok": True}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.ensure_future(client.get("/slow"))
+        await asyncio.sleep(0.01)
+
+        shed = await client.get("/slow")
+        assert shed.status_code == 503 and shed.headers["Retry-After"] == "1"
+        assert (await client.post("/write")).status_code == 200
+        assert (await client.get("/metrics")).status_code == 200
+
+        release.set()
+        assert (await first).status_code == 200
+    assert limiters["read"].stats()["rejected"]["queue_full"] == 1
+    assert limiters["read"].stats()["active"] == 0
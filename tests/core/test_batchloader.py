@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from store.core.batchloader import BatchLoader
+from store.core.deadline import DeadlineExceeded, deadline, remaining
+
+
+@pytest.mark.asyncio
+async def test_loads_in_the_same_tick_share_one_fetch():
+    """Teste unitário - chamadas do mesmo ciclo viram um lote, sem chaves repetidas"""
+    batches = []
+
+    async def fetch(keys):
+        batches.append(keys)
+        return {key: key.upper() for key in keys if key != "x"}
+
+    loader = BatchLoader(fetch)
+    results = await asyncio.gather(*(loader.load(key) for key in ["a", "b", "a", "x"]))
+
+    assert results == ["A", "B", "A", None]
+    assert batches == [["a", "b", "x"]]
+    assert loader.stats() == {"loads": 4, "batches": 1, "pending": 0}
+
+    assert await loader.load("c") == "C"
+    assert len(batches) == 2
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_batches():
+    """Teste unitário - lote cheio é despachado sem esperar o fim do ciclo"""
+    batches = []
+
+    async def fetch(keys):
+        batches.append(keys)
+        return dict.fromkeys(keys, 1)
+
+    loader = BatchLoader(fetch, max_batch_size=2)
+    await asyncio.gather(*(loader.load(i) for i in range(5)))
+
+    assert batches == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_cancellation_is_isolated():
+    """Teste unitário - erro do lote chega a todos; cancelar um não afeta os outros"""
+    async def failing(keys):
+        raise ConnectionError("banco fora")
+
+    loader = BatchLoader(failing)
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+    async def slow(keys):
+        await asyncio.sleep(0.01)
+        return dict.fromkeys(keys, "ok")
+
+    loader = BatchLoader(slow)
+    first = asyncio.ensure_future(loader.load(1))
+    second = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "ok"
+
+
+@pytest.mark.asyncio
+async def test_batch_outlives_the_deadline_of_who_dispatched_it():
+    """Teste unitário - o lote não herda o prazo de quem o disparou; cada chamada espera até o próprio"""
+    seen = []
+
+    async def fetch(keys):
+        seen.append(remaining())
+        await asyncio.sleep(0.1)
+        return {key: key.upper() for key in keys}
+
+    loader = BatchLoader(fetch)
+
+    async def load(key, seconds):
+        with deadline(seconds):
+            return await loader.load(key)
+
+    results = await asyncio.gather(load("a", 0.02), load("b", 1.0), return_exceptions=True)
+
+    assert isinstance(results[0], DeadlineExceeded)
+    assert results[1] == "B"
+    assert loader.stats()["loads"] == 2 and loader.stats()["batches"] == 1
+    assert seen[0] > 1.0
+
+
+@pytest.mark.asyncio
+async def test_batch_is_cancelled_when_every_caller_gives_up():
+    """Teste unitário - se todos os que esperavam o lote esgotam o prazo, a busca é cancelada"""
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def fetch(keys):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    loader = BatchLoader(fetch)
+
+    async def load(key):
+        with deadline(0.02):
+            return await loader.load(key)
+
+    results = await asyncio.gather(load("a"), load("b"), load("a"), return_exceptions=True)
+
+    assert all(isinstance(result, DeadlineExceeded) for result in results)
+    assert started.is_set()
+    await asyncio.wait_for(cancelled.wait(), timeout=0.5)
+    assert not loader._running
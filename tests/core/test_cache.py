@@ -0,0 +1,100 @@
+import json
+import pytest
+from store.core.cache import LocalSharedClient, LRUCache, NullCache, SharedCache, build_cache
+from store.core.config import get_settings
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used():
+    """Teste unitário - LRU descarta a entrada menos usada ao passar do limite"""
+    cache = LRUCache(max_size=2, ttl=60)
+    await cache.set("a", 1, 1)
+    await cache.set("b", 2, 1)
+    await cache.get("a")
+    await cache.set("c", 3, 1)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == 1
+    assert await cache.get("c") == 3
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_expires_after_ttl_and_invalidate():
+    """Teste unitário - entradas expiram pelo TTL e somem no invalidate"""
+    clock = _Clock()
+    cache = LRUCache(max_size=10, ttl=5, clock=clock)
+    await cache.set("a", 1, 1)
+    await cache.set("b", 2, 1)
+
+    clock.now = 6
+    assert await cache.get("a") is None
+
+    await cache.set("b", 2, 1)
+    await cache.invalidate("b")
+    assert await cache.get("b") is None
+    clock.now = 12
+    assert await cache.get("b") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_with_local_stand_in():
+    """Teste unitário - cache compartilhado serializa valores e respeita o TTL"""
+    clock = _Clock()
+    cache = SharedCache(LocalSharedClient(clock=clock), ttl=10, dumps=json.dumps, loads=json.loads)
+    await cache.set("1", {"name": "Iphone"}, 1)
+
+    assert await cache.get("1") == {"name": "Iphone"}
+    clock.now = 11
+    assert await cache.get("1") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["lru", "shared"])
+async def test_stale_fill_does_not_overwrite_newer_version(backend):
+    """Teste unitário - leitura que termina depois da escrita não devolve a versão antiga ao cache"""
+    if backend == "lru":
+        cache = LRUCache(max_size=10, ttl=60)
+    else:
+        cache = SharedCache(LocalSharedClient(), ttl=60, dumps=json.dumps, loads=json.loads)
+
+    await cache.set("1", {"v": 2}, 2)
+    await cache.set("1", {"v": 1}, 1)
+    assert await cache.get("1") == {"v": 2}
+
+    # Escrita sem o documento novo (reserva): só versões a partir da 3 entram
+    await cache.invalidate("1", 3)
+    await cache.set("1", {"v": 2}, 2)
+    assert await cache.get("1") is None
+    await cache.set("1", {"v": 3}, 3)
+    assert await cache.get("1") == {"v": 3}
+
+    # Remoção: nenhuma versão volta até o TTL
+    await cache.invalidate("1")
+    await cache.set("1", {"v": 4}, 4)
+    assert await cache.get("1") is None
+
+
+def test_lru_backend_is_disabled_with_multiple_workers(monkeypatch):
+    """Teste unitário - com mais de um worker, o LRU local (que não vê as escritas dos outros) fica desligado"""
+    monkeypatch.setenv("CACHE_BACKEND", "lru")
+    get_settings.cache_clear()
+    try:
+        monkeypatch.setenv("WORKERS", "1")
+        assert isinstance(build_cache(str, str), LRUCache)
+        monkeypatch.setenv("WORKERS", "4")
+        get_settings.cache_clear()
+        assert isinstance(build_cache(str, str), NullCache)
+    finally:
+        get_settings.cache_clear()
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from store.core.config import get_settings
+from store.core.deadline import DeadlineMiddleware, deadline, expired, remaining, request_timeout
+from store.core.metrics import REQUESTS_DISCONNECTED
+
+
+def test_request_timeout_from_header_capped_or_default(monkeypatch):
+    """Teste unitário - prazo do header (limitado ao teto) ou o padrão da configuração"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_MS", 2000)
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_MAX_MS", 5000)
+    header = settings.REQUEST_DEADLINE_HEADER.lower().encode()
+
+    assert request_timeout([]) == 2.0
+    assert request_timeout([(header, b"300")]) == 0.3
+    assert request_timeout([(header, b"90000")]) == 5.0
+    assert request_timeout([(header, b"abc")]) == 2.0
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_MS", 0)
+    assert request_timeout([]) is None
+
+
+@pytest.mark.asyncio
+async def test_deadline_is_visible_in_tasks_and_expires():
+    """Teste unitário - o prazo vale nas tasks criadas no bloco e some ao sair dele"""
+    assert remaining() is None
+    with deadline(0.01):
+        child = asyncio.ensure_future(asyncio.sleep(0.02, result=None))
+        assert 0 < await asyncio.ensure_future(_remaining()) <= 0.01
+        await child
+        assert expired()
+    assert remaining() is None
+
+
+async def _remaining():
+    return remaining()
+
+
+def _scope(path: str) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("test", 1), "server": ("test", 80),
+    }
+
+
+@pytest.mark.asyncio
+async def test_middleware_cancels_handler_when_client_disconnects():
+    """Teste unitário - cliente que desconecta cancela o handler; resposta completa não conta"""
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware)
+    cancelled = asyncio.Event()
+
+    @app.get("/slow")
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    @app.get("/fast")
+    async def fast():
+        return {"ok": True}
+
+    def receive_then_disconnect(delay: float):
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.sleep(delay)
+            return {"type": "http.disconnect"}
+        return receive
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    before = REQUESTS_DISCONNECTED.value("GET", "/slow")
+    await asyncio.wait_for(app(_scope("/slow"), receive_then_disconnect(0.01), send), timeout=1)
+    assert cancelled.is_set() and sent == []
+    assert REQUESTS_DISCONNECTED.value("GET", "/slow") == before + 1
+
+    await app(_scope("/fast"), receive_then_disconnect(0), send)
+    assert sent[0]["status"] == 200
+    assert REQUESTS_DISCONNECTED.value("GET", "/fast") == 0
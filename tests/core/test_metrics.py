@@ -0,0 +1,50 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from store.core.metrics import Gauge, Histogram, MetricsMiddleware, REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Teste unitário - buckets acumulados, +Inf, soma e contagem no formato do Prometheus"""
+    histogram = Histogram("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ["# HELP demo_seconds Demo", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{route="/a"} 5.55' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+
+
+def test_gauge_escapes_label_values():
+    """Teste unitário - aspas e barras nos rótulos são escapadas"""
+    gauge = Gauge("demo", "Demo", ("name",))
+    gauge.inc('a"b\\c')
+
+    assert 'demo{name="a\\"b\\\\c"} 1' in gauge.render()
+
+
+def test_middleware_labels_by_route_template_and_status():
+    """Teste unitário - a rota é o caminho declarado, não a URL com o id"""
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{id}")
+    async def item(id: str):
+        if id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": id}
+
+    before_ok = REQUEST_LATENCY.count("GET", "/items/{id}", "200")
+    before_missing = REQUEST_LATENCY.count("GET", "/items/{id}", "404")
+    with TestClient(app) as client:
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/items/missing")
+
+    assert REQUEST_LATENCY.count("GET", "/items/{id}", "200") == before_ok + 2
+    assert REQUEST_LATENCY.count("GET", "/items/{id}", "404") == before_missing + 1
+    assert REQUESTS_IN_FLIGHT.value("GET", "/items/{id}") == 0
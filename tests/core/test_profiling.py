@@ -0,0 +1,62 @@
+import json
+import pstats
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from store.core.config import get_settings
+from store.core.profiling import ProfilingMiddleware
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/items/{id}")
+    async def item(id: str):
+        return {"id": id, "total": sum(range(50_000))}
+
+    return app
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    return settings
+
+
+def test_header_writes_folded_stacks_and_metadata(profiling, tmp_path):
+    """Teste unitário - com o header, grava .folded e .json com rota e tempo"""
+    with TestClient(_app()) as client:
+        client.get("/items/1")
+        assert list(tmp_path.iterdir()) == []  # Sem header e sem sorteio: nada
+
+        client.get("/items/2", headers={"X-Profile": "1"})
+
+    folded = next(tmp_path.glob("*-GET-items_id-*.folded"))
+    metadata = json.loads(next(tmp_path.glob("*.json")).read_text())
+    assert metadata["route"] == "/items/{id}" and metadata["status"] == 200
+    assert metadata["profile"] == folded.name
+    for line in folded.read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+
+
+def test_cprofile_mode_and_sample_rate(profiling, monkeypatch, tmp_path):
+    """Teste unitário - modo cprofile gera um .prof legível pelo pstats; taxa 1.0 perfila tudo"""
+    monkeypatch.setattr(profiling, "PROFILING_MODE", "cprofile")
+    monkeypatch.setattr(profiling, "PROFILING_SAMPLE_RATE", 1.0)
+    with TestClient(_app()) as client:
+        client.get("/items/1")
+
+    stats = pstats.Stats(str(next(tmp_path.glob("*.prof"))))
+    assert any(name == "item" for _, _, name in stats.stats)
+
+
+def test_disabled_app_has_no_profiling_middleware():
+    """Teste unitário - desligado, o middleware nem é instalado"""
+    from store.main import app
+
+    assert get_settings().PROFILING_ENABLED is False
+    assert all(m.cls is not ProfilingMiddleware for m in app.user_middleware)
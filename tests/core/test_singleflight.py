@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from pymongo import _csot
+from store.core.deadline import DeadlineExceeded, deadline, remaining
+from store.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    """Teste unitário - chamadas simultâneas da mesma chave executam uma vez"""
+    flight = SingleFlight()
+    executions = 0
+
+    async def query():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.01)
+        return {"name": "Iphone"}
+
+    results = await asyncio.gather(*(flight.do("id1", query) for _ in range(50)))
+
+    assert executions == 1
+    assert all(result == {"name": "Iphone"} for result in results)
+    assert flight.stats() == {"calls": 1, "coalesced": 49, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_and_nothing_is_kept():
+    """Teste unitário - erro chega a todos e a próxima chamada executa de novo"""
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise LookupError("not found")
+
+    results = await asyncio.gather(
+        flight.do("x", failing), flight.do("x", failing), return_exceptions=True
+    )
+    assert all(isinstance(result, LookupError) for result in results)
+
+    async def ok():
+        return 1
+
+    assert await flight.do("x", ok) == 1
+    assert flight.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_leader_cancellation_does_not_cancel_waiters():
+    """Teste unitário - cancelar quem iniciou não afeta quem está esperando"""
+    flight = SingleFlight()
+
+    async def query():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    leader = asyncio.ensure_future(flight.do("k", query))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(flight.do("k", query))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await waiter == "ok"
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_a_new_flight():
+    """Teste unitário - após forget, nova chamada não reaproveita a anterior"""
+    flight = SingleFlight()
+    values = iter([1, 2])
+
+    async def query():
+        await asyncio.sleep(0.01)
+        return next(values)
+
+    first = asyncio.ensure_future(flight.do("k", query))
+    await asyncio.sleep(0)
+    flight.forget("k")
+    second = await flight.do("k", query)
+
+    assert await first == 1
+    assert second == 2
+
+
+@pytest.mark.asyncio
+async def test_call_is_cancelled_when_every_waiter_gives_up():
+    """Teste unitário - se todos os que esperavam cancelam, a consulta também é cancelada"""
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def query():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiters = [asyncio.ensure_future(flight.do("k", query)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for waiter in waiters:
+        waiter.cancel()
+
+    await asyncio.wait_for(cancelled.wait(), timeout=0.5)
+    assert flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_call_does_not_inherit_first_callers_deadline():
+    """Teste unitário - dois que esperam com prazos diferentes: o curto dá DeadlineExceeded, o longo recebe o resultado"""
+    flight = SingleFlight()
+    seen = {}
+
+    async def query():
+        seen["remaining"], seen["mongo_timeout"] = remaining(), _csot.get_timeout()
+        await asyncio.sleep(0.1)
+        return "ok"
+
+    async def call(seconds):
+        with deadline(seconds):
+            return await flight.do("k", query)
+
+    short = asyncio.ensure_future(call(0.02))
+    await asyncio.sleep(0)
+    long = asyncio.ensure_future(call(1.0))
+
+    with pytest.raises(DeadlineExceeded):
+        await short
+    assert await long == "ok"
+    assert flight.stats()["calls"] == 1
+    # A consulta roda com o teto de prazo, não com os 20 ms de quem a iniciou
+    assert seen["remaining"] > 1.0 and seen["mongo_timeout"] > 1.0
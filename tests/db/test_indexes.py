@@ -0,0 +1,96 @@
+import pytest
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from store.db import indexes
+from store.db.indexes import UNAUTHORIZED, sync_indexes
+
+
+class _FakeIndexCollection:
+    name = "products"
+
+    def __init__(self, existing, stats):
+        self.existing = existing
+        self.stats = stats
+        self.created = []
+
+    async def index_information(self):
+        return self.existing
+
+    async def create_indexes(self, indexes):
+        self.created.extend(index.document["name"] for index in indexes)
+
+    async def aggregate(self, pipeline):
+        if isinstance(self.stats, Exception):
+            raise self.stats
+        for stats in self.stats:
+            yield stats
+
+
+DECLARED = [
+    IndexModel([("status", ASCENDING), ("price", ASCENDING)], name="status_price"),
+    IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+]
+
+
+@pytest.mark.asyncio
+async def test_sync_indexes_creates_missing_and_reports_drift():
+    """Teste unitário - cria índices ausentes e reporta os não declarados/sem uso"""
+    collection = _FakeIndexCollection(
+        existing={
+            "_id_": {"key": [("_id", 1)]},
+            "status_price": {"key": [("status", 1), ("price", 1)]},
+            "legacy_name": {"key": [("name", 1)]},
+        },
+        stats=[
+            {"name": "_id_", "accesses": {"ops": 0}},
+            {"name": "status_price", "accesses": {"ops": 42}},
+            {"name": "legacy_name", "accesses": {"ops": 0}},
+        ],
+    )
+
+    report = await sync_indexes(collection, DECLARED)
+
+    assert collection.created == ["updated_at"]
+    assert report.created == ["updated_at"]
+    assert report.missing == []
+    assert report.undeclared == ["legacy_name"]
+    assert report.unused == ["legacy_name"]
+
+
+@pytest.mark.asyncio
+async def test_sync_indexes_check_only_and_divergent():
+    """Teste unitário - modo check não cria nada e detecta definição divergente"""
+    collection = _FakeIndexCollection(
+        existing={"status_price": {"key": [("price", 1), ("status", 1)]}},
+        stats=[],
+    )
+
+    report = await sync_indexes(collection, DECLARED, check_only=True)
+
+    assert collection.created == []
+    assert report.missing == ["updated_at"]
+    assert report.divergent == ["status_price"]
+
+
+@pytest.mark.asyncio
+async def test_missing_privileges_only_warn(monkeypatch, caplog):
+    """Teste unitário - sem permissão para $indexStats ou para o sync, a aplicação sobe com aviso"""
+    unauthorized = OperationFailure("not authorized", code=UNAUTHORIZED)
+    collection = _FakeIndexCollection(existing={}, stats=unauthorized)
+
+    report = await sync_indexes(collection, DECLARED)
+    assert report.created == ["status_price", "updated_at"] and report.unused == []
+
+    async def denied(check_only=False):
+        raise unauthorized
+
+    monkeypatch.setattr(indexes, "_sync_all", denied)
+    await indexes.sync_startup_indexes()
+    assert "make indexes" in caplog.text
+
+    async def broken(check_only=False):
+        raise OperationFailure("outro erro", code=2)
+
+    monkeypatch.setattr(indexes, "_sync_all", broken)
+    with pytest.raises(OperationFailure):
+        await indexes.sync_startup_indexes()
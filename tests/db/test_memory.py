@@ -0,0 +1,333 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from bson import ObjectId
+from fastapi import HTTPException
+from store.db.memory import InMemoryProductRepository
+from store.usecases.product import ProductUsecase, parse_ids
+from store.schemas.product import ProductBulkUpdate, ProductIn, ProductUpdate, ReservationItemIn
+from tests.factories import make_products
+
+
+def _document(price, status, name="P"):
+    now = datetime(2024, 1, 1)
+    return {
+        "_id": ObjectId(), "name": name, "quantity": 1, "price_cents": price,
+        "status": status, "created_at": now, "updated_at": now,
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_price_range_and_status_in_order():
+    """Teste unitário - faixa de preço + status, ordenado por (price, _id)"""
+    repository = InMemoryProductRepository()
+    documents = [_document(price, i % 2 == 0) for i, price in enumerate([50, 10, 30, 30, 70, 20])]
+    for document in documents:
+        await repository.insert(dict(document))
+
+    result = await repository.list(min_price=20, max_price=50)
+    assert [d["price_cents"] for d in result] == [20, 30, 30, 50]
+
+    active = await repository.list(min_price=20, max_price=50, status=True)
+    assert [(d["price_cents"], d["status"]) for d in active] == [(30, True), (50, True)]
+
+    page = await repository.list(min_price=20, after=(result[1]["price_cents"], result[1]["_id"]), limit=2)
+    assert [d["_id"] for d in page] == [result[2]["_id"], result[3]["_id"]]
+
+
+@pytest.mark.asyncio
+async def test_list_by_id_merges_statuses():
+    """Teste unitário - sem filtro de preço a ordem é por _id, com os dois status"""
+    repository = InMemoryProductRepository()
+    documents = [_document(10, i % 3 == 0) for i in range(6)]
+    for document in documents:
+        await repository.insert(dict(document))
+
+    ids = [d["_id"] for d in await repository.list()]
+    assert ids == sorted(d["_id"] for d in documents)
+    assert [d["_id"] for d in await repository.list(after=(ids[3],))] == ids[4:]
+    assert repository.count(True) == 2
+    assert repository.count(False) == 4
+
+
+@pytest.mark.asyncio
+async def test_update_reindexes_and_delete_forgets_status():
+    """Teste unitário - update move o produto nos índices e delete apaga o status"""
+    repository = InMemoryProductRepository()
+    document = _document(1000, True)
+    await repository.insert(document)
+
+    updated = await repository.update(document["_id"], {"price_cents": 9900, "status": False})
+    assert updated["price_cents"] == 9900 and updated["status"] is False
+    assert await repository.list(status=True) == []
+    assert [d["_id"] for d in await repository.list(min_price=9000, status=False)] == [document["_id"]]
+
+    assert await repository.delete(document["_id"]) is True
+    assert await repository.delete(document["_id"]) is False
+    assert len(repository) == 0 and repository.count(True) == 0
+    assert repository._statuses == {}
+
+
+@pytest.mark.asyncio
+async def test_bulk_chunks_are_stamped_when_written(monkeypatch):
+    """Teste unitário - cada lote do bulk recebe a data da própria gravação, não a do início"""
+    import store.usecases.product as product_module
+
+    clock = iter(datetime(2024, 1, 1) + timedelta(minutes=i) for i in range(100))
+    monkeypatch.setattr(product_module, "now", lambda: next(clock))
+    repository = InMemoryProductRepository()
+    usecase = ProductUsecase(repository)
+    products = [ProductIn(name=f"P{i}", quantity=1, price="1", status=True) for i in range(4)]
+
+    created = await usecase.bulk_create(products, chunk_size=2)
+    ids = [ObjectId(item.id) for item in created.results]
+    stamps = [(await repository.get(id))["created_at"] for id in ids]
+    assert stamps[0] == stamps[1] < stamps[2] == stamps[3]
+
+    updates = [ProductBulkUpdate(id=str(id), quantity=2) for id in ids]
+    await usecase.bulk_update(updates, chunk_size=3)
+    stamps = [(await repository.get(id))["updated_at"] for id in ids]
+    assert stamps[0] == stamps[2] < stamps[3]
+    assert stamps[0] > (await repository.get(ids[3]))["created_at"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_write_ordered_stops_on_duplicate():
+    """Teste unitário - bulk ordenado para na chave duplicada"""
+    repository = InMemoryProductRepository()
+    first = _document(1, True)
+    errors = await repository.bulk_write(
+        [("insert", first), ("insert", dict(first)), ("insert", _document(2, True))], ordered=True
+    )
+
+    assert list(errors) == [1]
+    assert len(repository) == 1
+
+
+@pytest.mark.asyncio
+async def test_usecase_runs_on_memory_engine():
+    """Teste de integração - usecase completo sobre o motor em memória"""
+    usecase = ProductUsecase(InMemoryProductRepository())
+    for data in make_products(30, seed=1):
+        await usecase.create(ProductIn(**data))
+
+    page = await usecase.list_page(min_price=5_000, limit=5)
+    prices = [p.price for p in page.items]
+    assert prices == sorted(prices) and len(prices) == 5
+    following = await usecase.list_page(min_price=5_000, limit=5, cursor=page.next_cursor)
+    assert following.items[0].price >= prices[-1]
+
+    product = page.items[0]
+    updated = await usecase.update(product.id, ProductUpdate(quantity=1))
+    assert updated.quantity == 1
+    assert (await usecase.get(product.id)).quantity == 1
+    await usecase.delete(product.id)
+    with pytest.raises(Exception):
+        await usecase.get(product.id)
+
+
+@pytest.mark.asyncio
+async def test_usecase_sparse_fields_on_memory_engine():
+    """Teste de integração - ?fields= reduz o documento lido e o modelo da resposta"""
+    usecase = ProductUsecase(InMemoryProductRepository())
+    for data in make_products(6, seed=2):
+        await usecase.create(ProductIn(**data))
+
+    page = await usecase.list_page(min_price=1, limit=4, fields=("price",))
+    assert [set(item.model_dump()) for item in page.items] == [{"price"}] * 4
+    following = await usecase.list_page(min_price=1, limit=4, cursor=page.next_cursor, fields=("price",))
+    assert len(following.items) == 2 and following.items[0].price >= page.items[-1].price
+
+    full = (await usecase.list_page(limit=1)).items[0]
+    product = await usecase.get(full.id, fields=("name", "quantity"))
+    assert product.model_dump() == {"name": full.name, "quantity": full.quantity}
+
+
+@pytest.mark.asyncio
+async def test_changes_feed_with_tombstones(monkeypatch):
+    """Teste de integração - feed entrega alterações e exclusões desde o token"""
+    from fastapi import HTTPException
+    from store.core.config import get_settings
+    from store.usecases.product import encode_change_token
+
+    monkeypatch.setattr(get_settings(), "CHANGES_LAG_MS", 1)
+    usecase = ProductUsecase(InMemoryProductRepository())
+    created = [await usecase.create(ProductIn(**data)) for data in make_products(3, seed=3)]
+    await asyncio.sleep(0.005)  # Passa do atraso mínimo do feed
+
+    bootstrap = await usecase.changes(limit=2)
+    assert [c.id for c in bootstrap.changes] == [p.id for p in created[:2]] and bootstrap.has_more
+    rest = await usecase.changes(since=bootstrap.next_token)
+    assert [c.id for c in rest.changes] == [created[2].id] and not rest.has_more
+
+    await usecase.update(created[0].id, ProductUpdate(quantity=7))
+    await usecase.delete(created[1].id)
+    await asyncio.sleep(0.005)
+    delta = await usecase.changes(since=rest.next_token)
+    assert [(c.id, c.deleted) for c in delta.changes] == [(created[0].id, False), (created[1].id, True)]
+    assert delta.changes[0].product.quantity == 7 and delta.changes[1].product is None
+
+    empty = await usecase.changes(since=delta.next_token)
+    assert empty.changes == [] and empty.next_token == delta.next_token
+
+    expired = encode_change_token(datetime(2000, 1, 1), ObjectId())
+    with pytest.raises(HTTPException) as exc:
+        await usecase.changes(since=expired)
+    assert exc.value.status_code == 410
+
+
+@pytest.mark.asyncio
+async def test_versioned_writes_and_list_version():
+    """Teste unitário - update incrementa version, If-Match velho dá 412 e o ETag da listagem muda a cada escrita"""
+    usecase = ProductUsecase(InMemoryProductRepository())
+    created = await usecase.create(ProductIn(name="A", quantity=1, price="1.00", status=True))
+    assert created.version == 1
+    etag = await usecase.list_etag()
+    assert await usecase.list_etag() == etag
+
+    updated = await usecase.update(created.id, ProductUpdate(quantity=2), expected_version=1)
+    assert updated.version == 2
+    product, version = await usecase.get_versioned(created.id, ("name",))
+    assert (product.name, version) == ("A", 2)
+    assert await usecase.list_etag() != etag
+
+    with pytest.raises(HTTPException) as error:
+        await usecase.update(created.id, ProductUpdate(quantity=3), expected_version=1)
+    assert error.value.status_code == 412
+    with pytest.raises(HTTPException) as error:
+        await usecase.delete(created.id, expected_version=1)
+    assert error.value.status_code == 412
+
+    etag = await usecase.list_etag()
+    assert await usecase.delete(created.id, expected_version=2)
+    assert await usecase.list_etag() != etag
+
+
+@pytest.mark.asyncio
+async def test_legacy_document_without_version():
+    """Teste unitário - documento sem "version" está na versão 0 e passa a 1 na primeira escrita"""
+    repository = InMemoryProductRepository()
+    document = _document(100, True)
+    await repository.insert(dict(document))
+
+    assert "version" not in await repository.get(document["_id"])
+    assert await repository.update(document["_id"], {"quantity": 2}, expected_version=1) is None
+    assert (await repository.update(document["_id"], {"quantity": 2}, expected_version=0))["version"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_never_oversell():
+    """Teste unitário - reservas concorrentes aceitam exatamente o estoque e o resto recebe 409"""
+    usecase = ProductUsecase(InMemoryProductRepository())
+    product = await usecase.create(ProductIn(name="A", quantity=10, price="1.00", status=True))
+
+    async def reserve():
+        try:
+            return (await usecase.reserve(product.id, 1)).ok
+        except HTTPException as error:
+            assert error.status_code == 409
+            return False
+
+    results = await asyncio.gather(*(reserve() for _ in range(25)))
+
+    assert sum(results) == 10
+    current = await usecase.get(product.id)
+    assert (current.quantity, current.version) == (0, 11)
+
+
+@pytest.mark.asyncio
+async def test_reserve_many_all_or_nothing_releases_reserved_items():
+    """Teste unitário - lote de reservas: uma falha devolve ao estoque o que já tinha sido reservado"""
+    usecase = ProductUsecase(InMemoryProductRepository())
+    a = await usecase.create(ProductIn(name="A", quantity=5, price="1.00", status=True))
+    b = await usecase.create(ProductIn(name="B", quantity=1, price="1.00", status=True))
+
+    result = await usecase.reserve_many([
+        ReservationItemIn(id=a.id, quantity=2),
+        ReservationItemIn(id=b.id, quantity=2),
+    ])
+    assert not result.ok
+    assert [(item.ok, item.quantity) for item in result.items] == [(False, 5), (False, 1)]
+    assert (await usecase.get(a.id)).quantity == 5
+
+    result = await usecase.reserve_many([
+        ReservationItemIn(id=a.id, quantity=2),
+        ReservationItemIn(id=b.id, quantity=2),
+        ReservationItemIn(id=a.id, quantity=1),
+    ], all_or_nothing=False)
+    assert [(item.id, item.requested, item.ok, item.quantity) for item in result.items] == [
+        (a.id, 3, True, 2), (b.id, 2, False, 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stats_summary_follows_writes(monkeypatch):
+    """Teste unitário - resumo materializado acompanha create/update/delete/reserva e bate com o $facet"""
+    from store.core.config import get_settings
+
+    repository = InMemoryProductRepository()
+    usecase = ProductUsecase(repository)
+    monkeypatch.setattr(get_settings(), "STATS_SUMMARY_ENABLED", True)
+    created = [
+        await usecase.create(ProductIn(name=f"P{i}", quantity=i + 1, price=price, status=i % 2 == 0))
+        for i, price in enumerate(["5", "12.50", "30", "1500"])
+    ]
+    assert (await usecase.stats()).source == "summary"
+
+    await usecase.update(created[0].id, ProductUpdate(price="60", status=False))
+    await usecase.delete(created[1].id)
+    await usecase.reserve(created[2].id, 2)
+    await usecase.create(ProductIn(name="P4", quantity=7, price="0.99", status=True))
+    summary = await usecase.stats()
+
+    monkeypatch.setattr(get_settings(), "STATS_SUMMARY_ENABLED", False)
+    aggregation = await usecase.stats()
+    assert aggregation.source == "aggregation"
+    assert summary.model_dump(exclude={"source"}) == aggregation.model_dump(exclude={"source"})
+    assert (summary.total, summary.units, summary.stock_value) == (4, 1 + 1 + 4 + 7, Decimal("6096.93"))
+
+
+@pytest.mark.asyncio
+async def test_lookup_keeps_request_order_and_reports_missing():
+    """Teste unitário - busca por ids em uma consulta, na ordem pedida, com os ausentes"""
+    repository = InMemoryProductRepository()
+    usecase = ProductUsecase(repository)
+    created = [await usecase.create(ProductIn(name=f"P{i}", quantity=i, price="1", status=True)) for i in range(3)]
+    unknown = str(ObjectId())
+
+    ids = parse_ids(f"{created[2].id}, {unknown},{created[0].id},nao-e-id,{created[2].id}")
+    result = await usecase.lookup(ids)
+    assert [item.name for item in result.items] == ["P2", "P0"]
+    assert result.missing == [unknown, "nao-e-id"]
+    assert result.next_cursor is None
+
+    sparse = await usecase.lookup([created[1].id], fields=("name",))
+    assert sparse.model_dump() == {"items": [{"name": "P1"}], "next_cursor": None, "missing": []}
+
+    with pytest.raises(HTTPException) as error:
+        parse_ids(" , ")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_are_batched_into_one_query(monkeypatch):
+    """Teste unitário - GETs simultâneos de ids diferentes viram um único get_many"""
+    repository = InMemoryProductRepository()
+    usecase = ProductUsecase(repository)
+    created = [await usecase.create(ProductIn(name=f"P{i}", quantity=i, price="1", status=True)) for i in range(5)]
+    calls = []
+    get_many = repository.get_many
+
+    async def counting_get_many(ids, projection=None):
+        calls.append(list(ids))
+        return await get_many(ids, projection)
+
+    monkeypatch.setattr(repository, "get_many", counting_get_many)
+    products = await asyncio.gather(*(usecase.get(product.id) for product in created))
+
+    assert [product.name for product in products] == [f"P{i}" for i in range(5)]
+    assert len(calls) == 1 and len(calls[0]) == 5
+    with pytest.raises(HTTPException) as error:
+        await usecase.get(str(ObjectId()))
+    assert error.value.status_code == 404
@@ -0,0 +1,148 @@
+import pytest
+from types import SimpleNamespace
+from bson import Decimal128, ObjectId
+from store.db.migrations import migrate_prices
+
+
+class _FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, key, direction):
+        self.documents.sort(key=lambda d: d[key])
+        return self
+
+    def limit(self, n):
+        self.documents = self.documents[:n]
+        return self
+
+    async def to_list(self, length):
+        return [dict(d) for d in self.documents]
+
+
+class _FakePriceCollection:
+    """Collection mínima: só os filtros usados pela migração."""
+
+    def __init__(self, documents):
+        self.docs = {d["_id"]: dict(d) for d in documents}
+
+    @staticmethod
+    def _matches(document, query):
+        for key, condition in query.items():
+            if "$exists" in condition:
+                if (key in document) != condition["$exists"]:
+                    return False
+            elif not document[key] > condition["$gt"]:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        return _FakeCursor([d for d in self.docs.values() if self._matches(d, query)])
+
+    async def count_documents(self, query):
+        return sum(self._matches(d, query) for d in self.docs.values())
+
+    async def bulk_write(self, operations, ordered=True):
+        modified = 0
+        for operation in operations:
+            query, update = dict(operation._filter), operation._doc
+            document = self.docs[query.pop("_id")]
+            if self._matches(document, query):
+                document.update(update.get("$set", {}))
+                for key, step in update.get("$inc", {}).items():
+                    document[key] = document.get(key, 0) + step
+                for key in update.get("$unset", {}):
+                    document.pop(key, None)
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+
+class _FakeStatsCollection:
+    def __init__(self):
+        self.writes = 0
+
+    async def update_one(self, query, update, upsert=False):
+        self.writes += update["$inc"]["count"]
+
+
+@pytest.mark.asyncio
+async def test_migrate_prices_converts_legacy_formats_in_batches():
+    """Teste unitário - double e Decimal128 viram price_cents, em lotes e de forma idempotente"""
+    legacy = [{"_id": ObjectId(), "price": 10.5}, {"_id": ObjectId(), "price": Decimal128("99.99")}]
+    # Já regravado pela aplicação depois do deploy: mantém o price_cents novo
+    rewritten = {"_id": ObjectId(), "price": 1.0, "price_cents": 250}
+    migrated = {"_id": ObjectId(), "price_cents": 700}
+    collection = _FakePriceCollection([*legacy, rewritten, migrated])
+
+    report = await migrate_prices(collection, batch_size=2)
+
+    assert report.scanned == 3 and report.migrated == 3 and report.remaining == 0
+    prices = collection.docs
+    assert prices[legacy[0]["_id"]] == {"_id": legacy[0]["_id"], "price_cents": 1050}
+    assert prices[legacy[1]["_id"]]["price_cents"] == 9999
+    assert prices[rewritten["_id"]] == {"_id": rewritten["_id"], "price_cents": 250}
+
+    again = await migrate_prices(collection)
+    assert again.scanned == 0 and again.remaining == 0
+
+
+@pytest.mark.asyncio
+async def test_migrate_prices_check_and_invalid():
+    """Teste unitário - modo check não altera nada e preços inválidos são reportados"""
+    bad = {"_id": ObjectId(), "price": "abc"}
+    collection = _FakePriceCollection([bad, {"_id": ObjectId(), "price": 3.0}])
+
+    check = await migrate_prices(collection, check_only=True)
+    assert check.scanned == 0 and check.remaining == 2
+
+    report = await migrate_prices(collection)
+    assert report.invalid == [str(bad["_id"])]
+    assert report.remaining == 1
+
+
+@pytest.mark.asyncio
+async def test_backfill_timestamps_uses_created_at_or_object_id():
+    """Teste unitário - documentos sem updated_at ganham datas reais"""
+    from datetime import datetime
+    from store.db.migrations import backfill_timestamps
+
+    created = datetime(2024, 5, 1, 12, 0)
+    with_created = {"_id": ObjectId(), "created_at": created}
+    without = {"_id": ObjectId.from_datetime(datetime(2023, 1, 1))}
+    collection = _FakePriceCollection([with_created, without])
+    stats = _FakeStatsCollection()
+
+    report = await backfill_timestamps(collection, batch_size=1, stats=stats)
+
+    assert report.migrated == 2 and report.remaining == 0
+    assert stats.writes == 2  # Uma escrita por lote
+    assert all(document["version"] == 1 for document in collection.docs.values())
+    assert collection.docs[with_created["_id"]]["updated_at"] == created
+    generated = collection.docs[without["_id"]]["updated_at"]
+    assert generated == collection.docs[without["_id"]]["created_at"]
+    assert generated.tzinfo is None
+
+
+@pytest.mark.asyncio
+async def test_backfill_timestamps_changes_item_and_list_etags():
+    """Teste unitário - o backfill muda o ETag do produto e o das listagens"""
+    from mongomock_motor import AsyncMongoMockClient
+    from store.controllers.product import _product_etag
+    from store.db.migrations import backfill_timestamps
+    from store.db.mongo import MongoProductRepository
+    from store.usecases.product import ProductUsecase
+
+    database = AsyncMongoMockClient()["store"]
+    repository = MongoProductRepository(database["products"])
+    usecase = ProductUsecase(repository)
+    id = ObjectId()
+    await repository.insert({"_id": id, "name": "P", "quantity": 1, "price_cents": 100, "status": True, "version": 1})
+    # O mongomock não aceita o UpdateOne do PyMongo atual no bulk_write
+    collection = _FakePriceCollection([await repository.get(id)])
+    item_before = _product_etag(str(id), collection.docs[id]["version"])
+    list_before = await usecase.list_etag()
+
+    await backfill_timestamps(collection, stats=repository.stats_collection)
+
+    assert _product_etag(str(id), collection.docs[id]["version"]) != item_before
+    assert await usecase.list_etag() != list_before
@@ -0,0 +1,131 @@
+import pytest
+from store.core.config import get_settings
+from store.db import mongo
+from store.db.mongo import MongoClient, client_options
+
+
+def test_client_options_map_pool_settings(monkeypatch):
+    """Teste unitário - opções de pool vêm do Settings com os nomes do PyMongo"""
+    monkeypatch.setattr(get_settings(), "MONGO_MAX_POOL_SIZE", 50)
+    monkeypatch.setattr(get_settings(), "MONGO_WAIT_QUEUE_TIMEOUT_MS", 2_000)
+    monkeypatch.setattr(get_settings(), "MONGO_MAX_IDLE_TIME_MS", None)
+
+    options = client_options()
+
+    assert options["maxPoolSize"] == 50
+    assert options["waitQueueTimeoutMS"] == 2_000
+    assert "maxIdleTimeMS" not in options
+
+
+def test_client_is_lazy_and_recreated_after_fork(monkeypatch):
+    """Teste unitário - nada conecta no import e um fork ganha cliente novo"""
+    created = []
+    monkeypatch.setattr(mongo, "AsyncIOMotorClient", lambda *a, **kw: created.append(kw) or object())
+    client = MongoClient()
+    assert created == []
+
+    first = client.get()
+    assert client.get() is first
+
+    monkeypatch.setattr(mongo.os, "getpid", lambda: -1)
+    assert client.get() is not first
+    assert len(created) == 2
+
+
+def test_changed_query_is_keyset_on_timestamp_and_id():
+    """Teste unitário - feed continua depois de (updated_at, _id) e para no limite de atraso"""
+    from datetime import datetime
+    from bson import ObjectId
+    from store.db.mongo import MongoProductRepository
+
+    at, last_id, until = datetime(2024, 1, 1), ObjectId(), datetime(2024, 1, 2)
+    query = MongoProductRepository.changed_query("updated_at", (at, last_id), until)
+
+    assert query == {
+        "updated_at": {"$lte": until},
+        "$or": [
+            {"updated_at": {"$gt": at}},
+            {"updated_at": at, "_id": {"$gt": last_id}},
+        ],
+    }
+
+
+def test_version_query_matches_legacy_documents_on_version_zero():
+    """Teste unitário - If-Match vira filtro por version; versão 0 casa documentos sem o campo"""
+    from bson import ObjectId
+    from store.db.mongo import MongoProductRepository
+
+    id = ObjectId()
+    assert MongoProductRepository.version_query(id, None) == {"_id": id}
+    assert MongoProductRepository.version_query(id, 4) == {"_id": id, "version": 4}
+    assert MongoProductRepository.version_query(id, 0) == {"_id": id, "version": {"$in": [0, None]}}
+
+
+@pytest.mark.asyncio
+async def test_stats_facet_matches_memory_engine():
+    """Teste unitário - o $facet de /products/stats dá os mesmos agregados do motor em memória"""
+    from bson import ObjectId
+    from mongomock_motor import AsyncMongoMockClient
+    from store.db.memory import InMemoryProductRepository
+    from store.db.mongo import MongoProductRepository
+
+    repository = MongoProductRepository(collection=AsyncMongoMockClient()["store"]["products"])
+    memory = InMemoryProductRepository()
+    for i, price in enumerate([500, 1250, 3000, 9999, 150000, 50]):
+        document = {"_id": ObjectId(), "name": f"P{i}", "quantity": i, "price_cents": price, "status": i % 2 == 0}
+        await repository.insert(dict(document))
+        await memory.insert(dict(document))
+    boundaries = (0, 1000, 2500, 5000, 10000)
+
+    stats = await repository.stats(boundaries)
+
+    assert stats == await memory.stats(boundaries)
+    assert stats[True]["buckets"] == [1, 0, 1, 0, 1]  # 150000 cai na última faixa
+    assert await repository.price_bounds(False) == (50, 9999)
+
+
+@pytest.mark.asyncio
+async def test_deletes_write_tombstones():
+    """Teste unitário - DELETE avulso e em lote gravam lápides, inclusive para ids que já tinham uma"""
+    from bson import ObjectId
+    from mongomock_motor import AsyncMongoMockClient
+    from store.db.mongo import MongoProductRepository
+
+    repository = MongoProductRepository(collection=AsyncMongoMockClient()["store"]["products"])
+    ids = [ObjectId() for _ in range(3)]
+    for id in ids:
+        await repository.insert({"_id": id, "name": "P", "quantity": 1, "price_cents": 100, "status": True})
+
+    assert await repository.delete(ids[0]) is True
+    await repository.tombstones.update_one({"_id": ids[0]}, {"$set": {"deleted_at": None}})
+    await repository._bury([ids[0]])
+    assert await repository.bulk_write([("delete", ids[1]), ("delete", ids[2])]) == {}
+    await repository._bury(ids)  # Repetir o lote só atualiza a data
+
+    tombstones = await repository.tombstones.find({}).to_list(None)
+    assert sorted(t["_id"] for t in tombstones) == sorted(ids)
+    assert all(t["deleted_at"] is not None for t in tombstones)
+
+
+@pytest.mark.asyncio
+async def test_list_version_changes_even_for_older_timestamps():
+    """Teste unitário - escrita que confirma depois com updated_at mais antigo ainda muda a versão das listagens"""
+    from datetime import datetime
+    from bson import ObjectId
+    from mongomock_motor import AsyncMongoMockClient
+    from store.db.mongo import MongoProductRepository
+
+    repository = MongoProductRepository(collection=AsyncMongoMockClient()["store"]["products"])
+    assert await repository.list_version() == (None, 0)
+    late, early = datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 11)
+    first, second = ObjectId(), ObjectId()
+    await repository.insert({"_id": first, "name": "A", "price_cents": 1, "status": True, "updated_at": late})
+    await repository.insert({"_id": second, "name": "B", "price_cents": 1, "status": True, "updated_at": late})
+    before = await repository.list_version()
+
+    await repository.update(second, {"name": "B2", "updated_at": early})
+    after = await repository.list_version()
+
+    assert after[0] == before[0] and after[1] == before[1] + 1 == 3
+    await repository.update(ObjectId(), {"name": "C"})  # Nada gravado: versão igual
+    assert await repository.list_version() == after
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+from store.core.metrics import MONGO_COMMAND_LATENCY
+from store.db.monitoring import CommandMetrics, SlowQueryLog, command_filter, plan_summary
+
+
+class _RecordingSlowLog(SlowQueryLog):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def record(self, command_name, database, command, seconds):
+        self.records.append((command_name, database, command, seconds))
+
+
+def _event(name, request_id, micros=0, command=None):
+    return SimpleNamespace(
+        command_name=name, request_id=request_id, connection_id=("db", 27017),
+        database_name="store", command=command, duration_micros=micros,
+    )
+
+
+def test_command_metrics_times_commands_and_flags_slow_ones():
+    """Teste unitário - duração por comando e só os filtráveis lentos vão para o log"""
+    slow_log = _RecordingSlowLog()
+    listener = CommandMetrics(slow_query_ms=100, slow_log=slow_log)
+    before = MONGO_COMMAND_LATENCY.count("find", "succeeded")
+    find = {"find": "products", "filter": {"price_cents": {"$gte": 1000}}}
+
+    listener.started(_event("find", 1, command=find))
+    listener.succeeded(_event("find", 1, micros=5_000))
+    listener.started(_event("find", 2, command=find))
+    listener.succeeded(_event("find", 2, micros=250_000))
+    listener.started(_event("ping", 3, command={"ping": 1}))
+    listener.failed(_event("ping", 3, micros=900_000))
+
+    assert MONGO_COMMAND_LATENCY.count("find", "succeeded") == before + 2
+    assert MONGO_COMMAND_LATENCY.count("ping", "failed") >= 1
+    assert slow_log.records == [("find", "store", find, 0.25)]
+    assert listener._started == {}
+
+
+def test_slow_query_log_explains_without_session_fields(caplog):
+    """Teste unitário - o explain recebe o comando sem $db/lsid e o plano vai para o log"""
+    commands = []
+
+    class _Database:
+        def command(self, command):
+            commands.append(command)
+            return {"queryPlanner": {"winningPlan": {
+                "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "price_cents_id"},
+            }}}
+
+    slow_log = SlowQueryLog()
+    slow_log.client = {"store": _Database()}
+    command = {"find": "products", "filter": {"status": True}, "$db": "store", "lsid": {"id": 1}}
+    slow_log.record("find", "store", command, 0.3)
+    slow_log._executor.shutdown(wait=True)
+
+    assert commands == [{"explain": {"find": "products", "filter": {"status": True}}, "verbosity": "queryPlanner"}]
+    assert "FETCH <- IXSCAN(price_cents_id)" in caplog.text
+    assert '"status": true' in caplog.text
+
+
+def test_command_filter_and_plan_summary_shapes():
+    """Teste unitário - filtro e plano nos formatos de find, update e aggregate"""
+    assert command_filter({"update": "products", "updates": [{"q": {"_id": 1}, "u": {}}]}) == [{"_id": 1}]
+    assert command_filter({"findAndModify": "products", "query": {"_id": 1}}) == {"_id": 1}
+    aggregate = {"stages": [{"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}}]}
+    assert plan_summary(aggregate) == "COLLSCAN"
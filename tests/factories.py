@@ -20,4 +20,24 @@ def products_data():
             "price": "10.500",
             "status": False,
         },
-    ]
\ No newline at end of file
+    ]
+
+def make_products(n, seed=0):
+    """
+    Gera n produtos variando os de products_data(): nomes únicos, preços
+    espalhados por algumas faixas e ~1/4 inativos. Determinístico por seed.
+    """
+    import random
+
+    rng = random.Random(seed)
+    base = products_data()
+    products = []
+    for i in range(n):
+        template = base[i % len(base)]
+        products.append({
+            "name": f"{template['name']} #{i}",
+            "quantity": rng.randint(0, 500),
+            "price": f"{rng.uniform(1, 20_000):.2f}",
+            "status": template["status"] if i % 4 else not template["status"],
+        })
+    return products
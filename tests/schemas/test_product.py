@@ -0,0 +1,54 @@
+from datetime import datetime
+from decimal import Decimal
+from bson import Decimal128, ObjectId
+from store.schemas.product import ProductOut
+
+
+def _documents(n):
+    now = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "name": f"Product {i}",
+            "quantity": i,
+            "price": 10.5 if i % 2 else Decimal128("10.50"),
+            "status": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n)
+    ]
+
+
+def test_from_document_matches_validated_model():
+    """Teste unitário - caminho rápido gera o mesmo modelo que a validação"""
+    for document in _documents(2):
+        fast = ProductOut.from_document(document)
+        validated = ProductOut(**document)
+
+        assert fast == validated
+        assert fast.price == Decimal("10.5")
+        assert isinstance(fast.id, str)
+        assert "_id" in document  # O documento original não é alterado
+
+
+def test_from_document_reads_price_cents():
+    """Teste unitário - price_cents volta a ser Decimal nos dois caminhos de leitura"""
+    document = {**_documents(1)[0], "price_cents": 1050}
+    del document["price"]
+
+    fast = ProductOut.from_document(document)
+    assert fast.price == Decimal("10.50")
+    assert fast == ProductOut(**dict(document))
+    assert '"price":"10.50"' in fast.model_dump_json()
+
+
+def test_from_document_fills_missing_timestamps():
+    """Teste unitário - documentos antigos sem datas continuam serializáveis"""
+    product = ProductOut.from_document(
+        {"_id": ObjectId(), "name": "Legacy", "quantity": 1, "price": 1.0, "status": False}
+    )
+
+    assert product.created_at == product.updated_at
+    assert '"name":"Legacy"' in product.model_dump_json()
+
@@ -0,0 +1,12 @@
+from store.schemas.product import ProductIn
+from tests.factories import make_products
+
+
+def test_make_products_is_valid_and_deterministic():
+    """Teste unitário - factory escalável gera produtos válidos e reprodutíveis"""
+    products = make_products(100, seed=7)
+
+    assert products == make_products(100, seed=7)
+    assert len({product["name"] for product in products}) == 100
+    assert any(not product["status"] for product in products)
+    assert all(ProductIn(**product) for product in products)
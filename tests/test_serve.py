@@ -0,0 +1,57 @@
+from store import serve
+
+
+def test_worker_count_precedence(monkeypatch):
+    """Teste unitário - argumento > WORKERS > núcleos da máquina"""
+    monkeypatch.setattr(serve.get_settings(), "WORKERS", 0)
+    monkeypatch.setattr(serve.os, "cpu_count", lambda: 8)
+
+    assert serve.worker_count() == 8
+    assert serve.worker_count(2) == 2
+
+    monkeypatch.setattr(serve.get_settings(), "WORKERS", 4)
+    assert serve.worker_count() == 4
+
+
+def test_lru_cache_fallback_is_warned_at_startup(monkeypatch, caplog):
+    """Teste unitário - com LRU e mais de um worker, o aviso de cache desligado sai no processo principal"""
+    monkeypatch.setattr(serve.get_settings(), "CACHE_BACKEND", "lru")
+
+    serve.warn_cache_fallback(1)
+    assert not caplog.records
+
+    serve.warn_cache_fallback(4)
+    assert "cache desligado" in caplog.text
+
+    caplog.clear()
+    monkeypatch.setattr(serve.get_settings(), "CACHE_BACKEND", "redis")
+    serve.warn_cache_fallback(4)
+    assert not caplog.records
+
+
+def test_app_mounts_product_routes():
+    """Teste unitário - a aplicação expõe as rotas de produtos"""
+    from store.main import app
+
+    paths = {route.path for route in app.routes}
+    assert "/products/" in paths
+    assert "/products/{id}" in paths
+
+
+def test_index_sync_runs_once_in_the_main_process(monkeypatch):
+    """Teste unitário - o sync de índices roda no processo principal, só com o Mongo"""
+    from store.db import indexes
+
+    calls = []
+
+    async def sync():
+        calls.append(1)
+
+    monkeypatch.setattr(indexes, "sync_startup_indexes", sync)
+    monkeypatch.setattr(serve.get_settings(), "STORAGE_ENGINE", "mongo")
+    monkeypatch.setattr(serve.get_settings(), "SYNC_INDEXES_ON_STARTUP", True)
+    serve.sync_indexes_once()
+    monkeypatch.setattr(serve.get_settings(), "STORAGE_ENGINE", "memory")
+    serve.sync_indexes_once()
+
+    assert calls == [1]
@@ -1,7 +1,9 @@
 import pytest
 from decimal import Decimal
 from store.schemas.product import ProductIn, ProductOut
-from store.usecases.product import product_usecase
+from store.usecases.product import get_product_usecase
+
+product_usecase = get_product_usecase()
 
 @pytest.mark.asyncio
 async def test_create_product_integration(products_collection):
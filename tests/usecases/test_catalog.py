@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+import os
+import pytest
+from store.catalog import export_catalog, import_catalog, row_id
+
+
+class _FakeUsecase:
+    """Substituto do ProductUsecaseSync: _id repetido é ignorado, como no Mongo."""
+
+    def __init__(self, fail_after: int = None) -> None:
+        self.documents = {}
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def insert_many_sync(self, documents):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise ConnectionError("conexão perdida")
+        inserted = 0
+        for document in documents:
+            if document["_id"] not in self.documents:
+                self.documents[document["_id"]] = dict(document)
+                inserted += 1
+        return inserted, {}
+
+    def iterate_sync(self, min_price=None, max_price=None, status=None, batch_size=None):
+        yield from self.documents.values()
+
+
+def _write_csv(path, rows: int, invalid_every: int = 0) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["name", "quantity", "price", "status"])
+        for i in range(rows):
+            price = "abc" if invalid_every and i % invalid_every == 0 else "10.50"
+            writer.writerow([f"Product {i}", i, price, "true"])
+
+
+def test_import_csv_validates_and_reports(tmp_path):
+    """Teste unitário - importação CSV grava os válidos em centavos e relata os rejeitados"""
+    path = str(tmp_path / "products.csv")
+    _write_csv(path, 25, invalid_every=10)
+    usecase = _FakeUsecase()
+
+    report = import_catalog(usecase, path, batch_size=4, workers=0, writers=2)
+
+    assert (report.rows, report.inserted, report.invalid) == (25, 22, 3)
+    assert report.errors[0].startswith("registro 1: price")
+    document = next(iter(usecase.documents.values()))
+    assert document["price_cents"] == 1050 and document["version"] == 1
+    assert not os.path.exists(path + ".checkpoint.json")
+
+
+def test_import_resumes_from_checkpoint_without_duplicates(tmp_path):
+    """Teste unitário - importação interrompida retoma do checkpoint e não duplica produtos"""
+    path = str(tmp_path / "products.csv")
+    _write_csv(path, 50)
+    usecase = _FakeUsecase(fail_after=3)
+
+    with pytest.raises(ConnectionError):
+        import_catalog(usecase, path, batch_size=5, workers=0, writers=2)
+    checkpoint = json.loads(open(path + ".checkpoint.json").read())
+    assert 0 < checkpoint["rows"] < 50
+
+    usecase.fail_after = None
+    report = import_catalog(usecase, path, batch_size=5, workers=0, writers=2)
+
+    assert report.resumed_from == checkpoint["rows"]
+    assert report.inserted == len(usecase.documents) == 50
+    assert {row_id(checkpoint["run"], i) for i in range(50)} == set(usecase.documents)
+
+
+def test_import_ndjson_rejects_bad_lines_and_export_round_trip(tmp_path):
+    """Teste unitário - linha NDJSON inválida é rejeitada e a exportação devolve o que foi importado"""
+    path = str(tmp_path / "products.ndjson")
+    with open(path, "w") as file:
+        file.write(json.dumps({"name": "A", "quantity": 1, "price": "1.99", "status": True}) + "\n")
+        file.write("{quebrado\n\n")
+        file.write(json.dumps({"name": "B", "quantity": 2, "price": 3, "status": False}) + "\n")
+    usecase = _FakeUsecase()
+    rejects = io.StringIO()
+
+    report = import_catalog(usecase, path, workers=0, rejects=rejects)
+    assert (report.inserted, report.invalid) == (2, 1)
+    assert json.loads(rejects.getvalue())["row"] == 2
+
+    output = io.StringIO()
+    exported = export_catalog(usecase, output, "ndjson")
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert exported.rows == 2
+    assert [(line["name"], line["price"]) for line in lines] == [("A", "1.99"), ("B", "3.00")]
+
+
+def test_import_stamps_each_batch_when_written(tmp_path, monkeypatch):
+    """Teste unitário - cada lote importado recebe a data da própria gravação"""
+    from datetime import datetime, timedelta
+    import store.catalog as catalog
+
+    clock = iter(datetime(2024, 1, 1) + timedelta(minutes=i) for i in range(100))
+    monkeypatch.setattr(catalog, "now", lambda: next(clock))
+    path = str(tmp_path / "products.csv")
+    _write_csv(path, 6)
+    usecase = _FakeUsecase()
+
+    import_catalog(usecase, path, batch_size=3, workers=0, writers=1)
+
+    stamps = [(d["created_at"], d["updated_at"]) for d in usecase.documents.values()]
+    assert stamps[0] == stamps[2] == (datetime(2024, 1, 1),) * 2
+    assert stamps[3] == stamps[5] == (datetime(2024, 1, 1, 0, 1),) * 2
+
+
+def test_imports_started_together_get_distinct_ids(tmp_path):
+    """Teste unitário - duas importações no mesmo segundo não colidem no _id"""
+    from store.catalog import new_run
+
+    paths = []
+    for name in ("a.csv", "b.csv"):
+        paths.append(str(tmp_path / name))
+        _write_csv(paths[-1], 5)
+    usecase = _FakeUsecase()
+
+    reports = [import_catalog(usecase, path, workers=0) for path in paths]
+
+    assert [report.inserted for report in reports] == [5, 5]
+    assert len(usecase.documents) == 10
+    run = new_run()
+    assert row_id(run, 7).binary[:8] == bytes.fromhex(run)
@@ -1,8 +1,10 @@
 import pytest
 from decimal import Decimal
-from bson import Decimal128
+from store.schemas.base import to_storage
 from store.schemas.product import ProductIn, ProductUpdate
-from store.usecases.product import product_usecase
+from store.db.mongo import MongoProductRepository
+from store.usecases.product import ProductUsecase
+
 
 def test_usecases_update_schema_validation():
     """Teste unitário - valida schema ProductUpdate"""
@@ -13,19 +15,22 @@ def test_usecases_update_schema_validation():
     )
     
     assert update_data.quantity == 20
-    assert isinstance(update_data.price, Decimal128)
-    assert str(update_data.price) == "99.99"
+    assert update_data.price == Decimal("99.99")
     assert update_data.status is True
+    assert to_storage(update_data.model_dump(exclude_none=True))["price_cents"] == 9999
+
 
 def test_usecases_delete_schema_validation():
     """Teste unitário - valida assinatura do método delete"""
-    assert hasattr(product_usecase, 'delete')
-    assert callable(product_usecase.delete)
+    assert hasattr(ProductUsecase, 'delete')
+    assert callable(ProductUsecase.delete)
+
 
 def test_usecases_list_schema_validation():
     """Teste unitário - valida assinatura do método list"""
-    assert hasattr(product_usecase, 'list')
-    assert callable(product_usecase.list)
+    assert hasattr(ProductUsecase, 'list')
+    assert callable(ProductUsecase.list)
+
 
 def test_usecases_product_in_schema():
     """Teste unitário - valida schema ProductIn"""
@@ -42,11 +47,12 @@ def test_usecases_product_in_schema():
     assert product_in.price == Decimal("100.50")
     assert product_in.status is True
 
+
 def test_usecases_list_method_signature():
     """Teste unitário - valida assinatura dos parâmetros do list"""
     import inspect
     
-    sig = inspect.signature(product_usecase.list)
+    sig = inspect.signature(ProductUsecase.list)
     params = sig.parameters
     
     assert 'min_price' in params
@@ -56,10 +62,11 @@ def test_usecases_list_method_signature():
     assert params['max_price'].default is None
     assert params['status'].default is None
 
+
 def test_usecases_list_query_builder():
     """Teste unitário - valida lógica de construção de query"""
     # Testa a lógica de construção da query sem banco
-    usecase = product_usecase.__class__()
+    usecase = ProductUsecase()
     
     test_cases = [
         ({}, {}),
@@ -83,4 +90,123 @@ def test_usecases_list_query_builder():
         if filters.get('status') is not None:
             query['status'] = filters['status']
             
-        assert query == expected_query
\ No newline at end of file
+        assert query == expected_query
+
+
+def test_usecases_cursor_round_trip():
+    """Teste unitário - cursor de paginação codifica e decodifica o último item"""
+    from bson import ObjectId
+    from store.usecases.product import decode_cursor, encode_cursor
+
+    last_id = ObjectId()
+    cursor = encode_cursor({"_id": last_id, "price_cents": 9950}, by_price=True)
+
+    assert decode_cursor(cursor, by_price=True) == (9950, last_id)
+    assert decode_cursor(encode_cursor({"_id": last_id}, by_price=False), by_price=False) == (last_id,)
+
+
+def test_usecases_price_range_rounds_inwards():
+    """Teste unitário - filtros em reais viram uma faixa inteira de centavos"""
+    from store.usecases.product import price_range
+
+    assert price_range(10.001, 20.999) == (1001, 2099)
+    assert price_range(10, None) == price_range(10.0, None) == (1000, None)
+
+
+def test_usecases_price_range_rejects_non_finite():
+    """Teste unitário - nan, inf e valores fora da precisão viram 422 em vez de 500"""
+    from fastapi import HTTPException
+    from store.usecases.product import price_range
+
+    for bounds in ((float("nan"), None), (None, float("inf")), (1e300, None)):
+        with pytest.raises(HTTPException) as error:
+            price_range(*bounds)
+        assert error.value.status_code == 422
+
+
+def test_usecases_cursor_invalid():
+    """Teste unitário - cursor adulterado vira 400"""
+    from fastapi import HTTPException
+    from store.usecases.product import decode_cursor
+
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("nao-e-um-cursor", by_price=False)
+    assert exc.value.status_code == 400
+
+
+class _FakeBulkCollection:
+    """Collection mínima: falha no bulk_write nas posições informadas e conta as escritas do contador."""
+
+    def __init__(self, failing_positions):
+        self.failing_positions = failing_positions
+        self.calls = []
+        self.writes_counted = 0
+
+    async def bulk_write(self, requests, ordered=True):
+        from pymongo.errors import BulkWriteError
+
+        self.calls.append(len(requests))
+        errors = [
+            {"index": position, "errmsg": "duplicate key"}
+            for position in self.failing_positions.pop(0) if position < len(requests)
+        ] if self.failing_positions else []
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "writeConcernErrors": [], "nInserted": 0})
+
+    async def update_one(self, query, update, upsert=False):
+        self.writes_counted += 1
+
+
+@pytest.mark.asyncio
+async def test_usecases_bulk_create_unordered_reports_per_item():
+    """Teste unitário - bulk não ordenado segue após erro e informa cada item"""
+    collection = _FakeBulkCollection([[1], []])
+    usecase = ProductUsecase(MongoProductRepository(collection, stats=collection))
+    products = [
+        ProductIn(name=f"P{i}", quantity=1, price=Decimal("1.00"), status=True)
+        for i in range(4)
+    ]
+
+    result = await usecase.bulk_create(products, ordered=False, chunk_size=2)
+
+    assert collection.calls == [2, 2]
+    assert result.succeeded == 3
+    assert [item.ok for item in result.results] == [True, False, True, True]
+    assert result.results[1].error == "duplicate key"
+    assert collection.writes_counted == 2
+
+
+@pytest.mark.asyncio
+async def test_usecases_bulk_create_ordered_stops_on_first_error():
+    """Teste unitário - bulk ordenado não executa nada após o primeiro erro"""
+    collection = _FakeBulkCollection([[0]])
+    usecase = ProductUsecase(MongoProductRepository(collection, stats=collection))
+    products = [
+        ProductIn(name=f"P{i}", quantity=1, price=Decimal("1.00"), status=True)
+        for i in range(4)
+    ]
+
+    result = await usecase.bulk_create(products, ordered=True, chunk_size=2)
+
+    assert collection.calls == [2]
+    assert result.succeeded == 0
+    assert result.failed == 4
+    assert collection.writes_counted == 0  # Nada gravado: o ETag das listagens não muda
+
+
+def test_usecases_parse_fields_and_projection():
+    """Teste unitário - ?fields= vira tupla ordenada e projeção com os nomes do banco"""
+    from fastapi import HTTPException
+    from store.schemas.product import PRODUCT_FIELDS, product_projection
+    from store.usecases.product import parse_fields
+
+    assert parse_fields(None) is None
+    assert parse_fields("price, name") == ("name", "price")
+    assert parse_fields(",".join(PRODUCT_FIELDS)) is None
+    with pytest.raises(HTTPException) as exc:
+        parse_fields("name,senha")
+    assert exc.value.status_code == 400
+
+    assert product_projection(("name", "price")) == {"name": 1, "price_cents": 1, "_id": 0}
+    # Só chaves de índice: a consulta pode ser coberta pelo price_cents_id
+    assert product_projection(("price",), "price_cents", "_id") == {"price_cents": 1, "_id": 1}
@@ -1,8 +1,9 @@
 import pytest
 from decimal import Decimal
-from bson import Decimal128
 from store.schemas.product import ProductIn, ProductUpdate
-from store.usecases.product_sync import product_usecase_sync
+from store.usecases.product_sync import get_product_usecase_sync
+
+product_usecase_sync = get_product_usecase_sync()
 
 def test_create_product_sync(products_collection):
     """Teste síncrono para criar produto."""
@@ -15,7 +16,7 @@ def test_create_product_sync(products_collection):
     
     result = product_usecase_sync.create_sync(product=product_data)
     assert result["name"] == "Test Product"
-    assert result["price"] == Decimal128('99.99')  # ← Corrigido: Decimal128
+    assert result["price_cents"] == 9999  # Gravado em centavos
 
 def test_list_products_sync(products_collection):
     """Teste síncrono para listar produtos."""
@@ -62,7 +63,7 @@ def test_update_product_sync(products_collection):
     
     assert updated is not None
     assert updated["quantity"] == 20
-    assert updated["price"] == Decimal128("150.00")
+    assert updated["price_cents"] == 15000
     assert updated["status"] == False
     assert "updated_at" in updated
 
@@ -95,4 +96,14 @@ def test_delete_product_sync(products_collection):
 def test_delete_nonexistent_product_sync(products_collection):
     """Teste de deleção de produto inexistente."""
     delete_result = product_usecase_sync.delete_sync("000000000000000000000000")
-    assert delete_result is False
\ No newline at end of file
+    assert delete_result is False
+
+
+def test_usecase_sync_connects_lazily():
+    """Teste unitário - criar o usecase não abre conexão com o banco"""
+    from store.usecases.product_sync import ProductUsecaseSync
+
+    usecase = ProductUsecaseSync(uri="mongodb://localhost:1/store")
+    assert usecase._client is None
+    usecase.close()
+    assert usecase._client is None
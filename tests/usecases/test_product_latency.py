@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from decimal import Decimal
+from bson import ObjectId
+from store.schemas.product import ProductIn, ProductUpdate
+from store.db.mongo import MongoProductRepository
+from store.usecases.product import ProductUsecase
+
+
+class _CountingCollection:
+    """Collection em memória que conta as idas ao banco."""
+
+    def __init__(self):
+        self.docs = {}
+        self.round_trips = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(0)
+
+    async def insert_one(self, document):
+        await self._round_trip()
+        document.setdefault("_id", ObjectId())
+        self.docs[document["_id"]] = dict(document)
+
+    async def find_one(self, query):
+        await self._round_trip()
+        document = self.docs.get(query["_id"])
+        return dict(document) if document else None
+
+    async def update_one(self, query, update, upsert=False):
+        await self._round_trip()
+        if upsert and query["_id"] not in self.docs:
+            self.docs[query["_id"]] = {**query, **update.get("$setOnInsert", {})}
+        document = self.docs[query["_id"]]
+        document.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + amount
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        await self._round_trip()
+        document = self.docs.get(query["_id"])
+        if document is None:
+            return None
+        document.update(update.get("$set", {}))
+        for field, amount in update.get("$inc", {}).items():
+            document[field] = document.get(field, 0) + amount
+        return dict(document)
+
+
+@pytest.mark.asyncio
+async def test_create_and_update_single_round_trip():
+    """Teste unitário - create/update fazem uma única ida à collection de produtos, sem reler o documento"""
+    collection, stats = _CountingCollection(), _CountingCollection()
+    usecase = ProductUsecase(MongoProductRepository(collection, stats=stats))
+    product = ProductIn(name="Bench", quantity=1, price=Decimal("10.00"), status=True)
+    runs = 10
+
+    for _ in range(runs):
+        created = await usecase.create(product)
+
+    assert collection.round_trips == runs
+    assert stats.docs["writes"]["count"] == runs  # Versão das listagens, depois de cada escrita
+    assert created.created_at == created.updated_at
+
+    collection.round_trips = 0
+    updated = await usecase.update(created.id, ProductUpdate(quantity=5))
+    assert collection.round_trips == 1
+    assert updated.quantity == 5
+    assert updated.updated_at >= created.updated_at
+    assert updated.version == created.version + 1